@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# benchmarks/bench.py
+"""Simulator throughput benchmarks.
+
+Each kernel in benchmarks/kernels is assembled, loaded at 0x1000 and run
+for a fixed budget of instructions (functional engines) or cycles (cycle
+Core; "cycle-l1" adds 32 KiB L1I/L1D caches, "cycle-trace" writes an
+uncompressed binary trace of every instruction). Plain "cycle" is the
+untraced commit path, which allocates nothing per instruction; comparing
+it with "cycle-trace" shows what tracing costs. The kernels loop forever,
+so every engine does the same amount of work. Each (kernel, engine) pair
+runs in a fresh interpreter, so peak RSS and startup time (import +
+simulator construction + program load) belong to that run alone.
+
+    python benchmarks/bench.py run -o results.json
+    python benchmarks/bench.py compare baseline.json results.json
+
+compare exits with status 1 if any metric is worse than the baseline by
+more than --threshold.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import click
+
+BENCH_DIR = Path(__file__).resolve().parent
+KERNEL_DIR = BENCH_DIR / "kernels"
+SRC_DIR = BENCH_DIR.parent / "src"
+KERNELS = sorted(p.stem for p in KERNEL_DIR.glob("*.asm"))
+ENGINES = ("fast", "jit", "cycle", "cycle-l1", "cycle-trace")
+DEFAULT_ENGINES = ("fast", "cycle")
+BASE = 0x1000
+
+# metric -> True if higher is better
+METRICS = {
+    "inst_per_sec": True,
+    "cycles_per_sec": True,
+    "peak_rss_kb": False,
+    "startup_s": False,
+}
+
+
+def _peak_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB elsewhere
+
+
+def measure(kernel: str, engine: str, budget: int) -> Dict[str, object]:
+    """Run one kernel on one engine in this process and return its metrics."""
+    t0 = time.perf_counter()
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+    from dspsim.assembler import assemble
+
+    words = assemble((KERNEL_DIR / f"{kernel}.asm").read_text().splitlines())
+    if engine.startswith("cycle"):
+        from dspsim.cache import Cache
+        from dspsim.core_cycle import Core, Memory
+        from dspsim.trace import BinaryTraceSink
+
+        mem = Memory()
+        mem.load_blob(BASE, b"".join(w.to_bytes(4, "little") for w in words))
+        caches = {"icache": Cache("L1I"), "dcache": Cache("L1D")} if engine == "cycle-l1" else {}
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = BinaryTraceSink(os.path.join(tmp, "bench.trace")) if engine == "cycle-trace" else None
+            core = Core(mem=mem, trace=sink, **caches)
+            core.pc = BASE
+            startup = time.perf_counter() - t0
+
+            t1 = time.perf_counter()
+            stats = core.run(max_cycles=budget)
+            if sink is not None:
+                sink.close()
+            elapsed = time.perf_counter() - t1
+        instructions, cycles = stats.instructions, stats.cycles
+    else:
+        from dspsim import FunctionalSimulator, JitSimulator
+
+        sim = (JitSimulator if engine == "jit" else FunctionalSimulator)()
+        sim.load_words(BASE, words)
+        startup = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        try:
+            sim.run(entry=BASE, max_cycles=budget)
+        except RuntimeError as e:
+            if "Max cycles" not in str(e):
+                raise
+        elapsed = time.perf_counter() - t1
+        instructions = cycles = sim.cycle_count
+
+    return {
+        "kernel": kernel,
+        "engine": engine,
+        "budget": budget,
+        "instructions": instructions,
+        "cycles": cycles,
+        "elapsed_s": elapsed,
+        "inst_per_sec": instructions / elapsed if elapsed else 0.0,
+        "cycles_per_sec": cycles / elapsed if elapsed else 0.0,
+        "peak_rss_kb": _peak_rss_kb(),
+        "startup_s": startup,
+    }
+
+
+def run_isolated(kernel: str, engine: str, budget: int) -> Dict[str, object]:
+    """measure() in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, __file__, "one", kernel, engine, str(budget)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise click.ClickException(f"{kernel}/{engine} failed:\n{proc.stderr.strip()}")
+    return json.loads(proc.stdout)
+
+
+def best_of(samples: List[Dict[str, object]]) -> Dict[str, object]:
+    """Combine repeats: best value of every metric, plus the raw throughput samples."""
+    out = dict(samples[0])
+    for name, higher in METRICS.items():
+        values = [s[name] for s in samples]
+        out[name] = max(values) if higher else min(values)
+    out["samples"] = [s["inst_per_sec"] for s in samples]
+    return out
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True)
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> List[Dict[str, object]]:
+    """One row per (kernel, engine, metric) found in both files; regressed rows have "regressed": True."""
+    base_rows = {(r["kernel"], r["engine"]): r for r in baseline["results"]}
+    rows = []
+    for cur in current["results"]:
+        base = base_rows.get((cur["kernel"], cur["engine"]))
+        if base is None:
+            continue
+        for name, higher in METRICS.items():
+            old, new = base.get(name), cur.get(name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher else change
+            rows.append({"kernel": cur["kernel"], "engine": cur["engine"], "metric": name,
+                         "baseline": old, "current": new, "change": change,
+                         "regressed": worse > threshold})
+    return rows
+
+
+@click.group(context_settings=dict(help_option_names=["-h", "--help"]))
+def cli():
+    """dspsim benchmark suite."""
+
+
+@cli.command()
+@click.option("-k", "--kernel", "kernels", multiple=True, type=click.Choice(KERNELS),
+              help="Kernel to run (repeatable; default: all).")
+@click.option("-e", "--engine", "engines", multiple=True, type=click.Choice(ENGINES),
+              help="Engine to run (repeatable; default: fast and cycle).")
+@click.option("--budget", default=200_000, show_default=True, type=click.IntRange(min=1),
+              help="Instructions (fast/jit) or cycles (cycle) per run.")
+@click.option("--repeat", default=3, show_default=True, type=click.IntRange(min=1),
+              help="Fresh-process runs per pair; the best of each metric is kept.")
+@click.option("-o", "--output", type=click.Path(dir_okay=False, path_type=Path),
+              help="Result file (default: benchmarks/results/<timestamp>.json).")
+def run(kernels, engines, budget, repeat, output):
+    """Run the suite and write a JSON result file."""
+    results = []
+    for kernel in kernels or KERNELS:
+        for engine in engines or DEFAULT_ENGINES:
+            res = best_of([run_isolated(kernel, engine, budget) for _ in range(repeat)])
+            results.append(res)
+            click.echo(f"{kernel:10} {engine:11} {res['inst_per_sec'] / 1e6:8.3f} Minst/s "
+                       f"{res['cycles_per_sec'] / 1e6:8.3f} Mcyc/s {res['peak_rss_kb'] / 1024:7.1f} MiB "
+                       f"{res['startup_s'] * 1e3:7.1f} ms startup")
+    doc = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "budget": budget,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    if output is None:
+        output = BENCH_DIR / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(doc, indent=2) + "\n")
+    click.echo(f"Wrote {output}")
+
+
+@cli.command()
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--threshold", default=0.10, show_default=True, type=click.FloatRange(min=0),
+              help="Relative change counted as a regression (0.10 = 10%).")
+def compare(baseline, current, threshold):
+    """Compare CURRENT against BASELINE; exit 1 on any regression."""
+    rows = compare_results(json.loads(baseline.read_text()), json.loads(current.read_text()), threshold)
+    for r in rows:
+        flag = "REGRESSION" if r["regressed"] else ""
+        click.echo(f"{r['kernel']:10} {r['engine']:11} {r['metric']:15} {r['baseline']:14.4g} "
+                   f"{r['current']:14.4g} {r['change']:+8.1%} {flag}".rstrip())
+    regressions = sum(r["regressed"] for r in rows)
+    if regressions:
+        click.echo(f"{regressions} regression(s) beyond {threshold:.0%}", err=True)
+        sys.exit(1)
+
+
+@cli.command("one", hidden=True)
+@click.argument("kernel", type=click.Choice(KERNELS))
+@click.argument("engine", type=click.Choice(ENGINES))
+@click.argument("budget", type=int)
+def one(kernel, engine, budget):
+    """Measure a single pair and print the JSON (used by run)."""
+    click.echo(json.dumps(measure(kernel, engine, budget)))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,21 @@
+; Control-heavy loop: short blocks that jump forwards and backwards, the
+; shape of a state machine or interpreter dispatch.
+        ADDI r1, r0, #0          ; iteration counter
+        ADDI r9, r0, #0xFF
+branch_loop:
+        ADDI r1, r1, #1
+        J    state_a
+state_c:
+        ADDI r4, r4, #3
+        OR   r5, r4, r2
+        J    state_d
+state_a:
+        ADDI r2, r2, #1
+        J    state_b
+state_d:
+        AND  r6, r1, r9
+        SUB  r7, r6, r3
+        J    branch_loop
+state_b:
+        ADD  r3, r3, r2
+        J    state_c
@@ -0,0 +1,22 @@
+; Dot-product style accumulate over two 32-word vectors at 0x1800 and 0x1900.
+; Without MUL in the assembled subset, each lane is a load-load-add-accumulate
+; (the same dependence shape as a MAC loop), unrolled by two.
+        ADDI r1, r0, #0          ; offset (bytes)
+        ADDI r9, r0, #0x7C       ; offset mask: 32 words
+        ADDI r10, r0, #0x1800    ; vector a
+        ADDI r11, r0, #0x1900    ; vector b
+        ADDI r20, r0, #0         ; accumulator
+dot_loop:
+        ADD  r2, r10, r1
+        ADD  r3, r11, r1
+        LD   r4, [r2+0]
+        LD   r5, [r3+0]
+        ADD  r6, r4, r5
+        ADD  r20, r20, r6
+        LD   r4, [r2+4]
+        LD   r5, [r3+4]
+        ADD  r6, r4, r5
+        ADD  r20, r20, r6
+        ADDI r1, r1, #8
+        AND  r1, r1, r9
+        J    dot_loop
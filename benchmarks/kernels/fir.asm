@@ -0,0 +1,26 @@
+; 4-tap FIR over the samples at 0x2000: 64 outputs (taps read 3 words past the
+; 64th sample), written round and round to a 64-word ring at 0x3000. Both
+; buffers are on pages of their own, away from the code at 0x1000.
+; The ISA subset the assembler accepts has no MUL, so the taps (1, 2, 2, 1)
+; are applied with adds: y = x0 + 2*x1 + 2*x2 + x3.
+        ADDI r1, r0, #0          ; sample index (bytes)
+        ADDI r9, r0, #0xFC       ; index mask: 64 words
+        ADDI r10, r0, #0x1000
+        ADD  r10, r10, r10       ; input 0x2000 (imm14 tops out at 0x1FFF)
+        ADDI r11, r0, #0x1800
+        ADD  r11, r11, r11       ; output ring 0x3000
+fir_loop:
+        ADD  r2, r10, r1
+        LD   r3, [r2+0]
+        LD   r4, [r2+4]
+        LD   r5, [r2+8]
+        LD   r6, [r2+12]
+        ADD  r7, r3, r6
+        ADD  r8, r4, r5
+        ADD  r7, r7, r8
+        ADD  r7, r7, r8
+        ADD  r2, r11, r1
+        ST   [r2+0], r7
+        ADDI r1, r1, #4
+        AND  r1, r1, r9
+        J    fir_loop
@@ -0,0 +1,19 @@
+; Copy a 256-byte block from 0x2000 to 0x3000 two words at a time, forever.
+; Both buffers are on pages of their own, away from the code at 0x1000, so
+; the stores never touch a page the engines have cached code for.
+        ADDI r1, r0, #0          ; offset (bytes)
+        ADDI r9, r0, #0xF8       ; offset mask: 256-byte block, 8-byte steps
+        ADDI r10, r0, #0x1000
+        ADD  r10, r10, r10       ; source 0x2000 (imm14 tops out at 0x1FFF)
+        ADDI r11, r0, #0x1800
+        ADD  r11, r11, r11       ; destination 0x3000
+copy_loop:
+        ADD  r2, r10, r1
+        ADD  r3, r11, r1
+        LD   r4, [r2+0]
+        LD   r5, [r2+4]
+        ST   [r3+0], r4
+        ST   [r3+4], r5
+        ADDI r1, r1, #8
+        AND  r1, r1, r9
+        J    copy_loop
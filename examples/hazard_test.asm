@@ -1,5 +1,5 @@
-# Future test for Read-After-Write hazards.
-# LD should cause a stall before the ADD can use R1.
-LD r1, r10, #0
+; Read-after-write hazard on the cycle engine (dspsim run --engine cycle).
+; LD has a 3-cycle latency, so the ADD waits 2 cycles for R1 (reported as "raw" stalls).
+LD r1, [r10+0]
 ADD r2, r1, r3
 HALT
@@ -1,6 +1,27 @@
 # src/dspsim/__init__.py
-from .core import FunctionalSimulator
-from .core_cycle import Core as CycleSimulator
-
-__all__ = ["FunctionalSimulator", "CycleSimulator"]
+__all__ = ["FunctionalSimulator", "CycleSimulator", "JitSimulator"]
 __version__ = "0.2.1"
+
+# The engines are imported on first use, so that `import dspsim` (and with it
+# every CLI start-up) stays cheap.
+_LAZY = {
+    "FunctionalSimulator": ("core", "FunctionalSimulator"),
+    "CycleSimulator": ("core_cycle", "Core"),
+    "JitSimulator": ("jit", "JitSimulator"),
+}
+
+
+def __getattr__(name):
+    try:
+        module, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module 'dspsim' has no attribute '{name}'") from None
+    from importlib import import_module
+
+    value = getattr(import_module("." + module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,199 @@
+# src/dspsim/asmcache.py
+"""On-disk cache of assembled programs, keyed by content.
+
+An entry's key is the SHA-256 of the source text together with the
+assembler version and a fingerprint of the ISA table, so editing either
+the source or the toolchain invalidates it. Each entry is one file,
+<key>.dspa, holding the word image and the label table. A hit reads that
+file instead of assembling.
+
+The cache lives in $DSPSIM_CACHE_DIR, else $XDG_CACHE_HOME/dspsim, else
+~/.cache/dspsim. Its total size is capped. Once over the cap, the entries
+least recently used are deleted; a hit refreshes the entry's mtime, and
+that mtime is the LRU clock. Entries are written to a temporary file and
+renamed into place, so concurrent runs (e.g. parallel CI jobs) never see
+a partial entry. An unusable cache directory only disables caching.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from . import __version__
+from .assembler import ASSEMBLER_VERSION, assemble_with_labels
+from .isa import INSTRUCTION_SET
+
+log = logging.getLogger("dspsim.asmcache")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SUFFIX = ".dspa"
+
+# magic, word count, label JSON length
+_HEADER = struct.Struct("<4sII")
+_MAGIC = b"DSPA"
+
+
+def _toolchain_id() -> bytes:
+    isa = sorted((m, maj, list(args)) for m, (_, args, maj) in INSTRUCTION_SET.items())
+    return json.dumps([__version__, ASSEMBLER_VERSION, isa]).encode()
+
+
+_TOOLCHAIN = _toolchain_id()
+
+
+def default_dir() -> Path:
+    env = os.environ.get("DSPSIM_CACHE_DIR")
+    if env:
+        return Path(env)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    return (Path(xdg) if xdg else Path.home() / ".cache") / "dspsim"
+
+
+class AsmCache:
+    def __init__(self, root: Optional[Union[str, os.PathLike]] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root is not None else default_dir()
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+
+    # -------------------------
+    # Keys and entries
+    # -------------------------
+    @staticmethod
+    def key(source: Union[str, bytes]) -> str:
+        """Hex key for source text under the current assembler and ISA."""
+        h = hashlib.sha256(_TOOLCHAIN)
+        h.update(b"\0")
+        h.update(source.encode("utf-8") if isinstance(source, str) else source)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / (key + SUFFIX)
+
+    def get(self, key: str) -> Optional[Tuple[List[int], Dict[str, int]]]:
+        """(words, labels) for key, or None on a miss or an unreadable entry."""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            magic, n, label_len = _HEADER.unpack_from(data)
+            if magic != _MAGIC or len(data) != _HEADER.size + 4 * n + label_len:
+                raise ValueError("truncated or foreign entry")
+            words = array("I")
+            words.frombytes(data[_HEADER.size : _HEADER.size + 4 * n])
+            if sys.byteorder == "big":
+                words.byteswap()
+            labels = json.loads(data[_HEADER.size + 4 * n :])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            log.debug("dropping cache entry %s: %s", path, e)
+            self._unlink(path)
+            return None
+        try:
+            os.utime(path)  # LRU: a hit makes the entry the newest
+        except OSError:
+            pass  # a read-only or shared cache still serves hits
+        return words.tolist(), labels
+
+    def put(self, key: str, words: List[int], labels: Dict[str, int]) -> None:
+        """Store an entry (atomically), then evict down to max_bytes.
+
+        Failures are logged, not raised.
+        """
+        body = array("I", words)
+        if sys.byteorder == "big":
+            body.byteswap()
+        label_bytes = json.dumps(labels, separators=(",", ":")).encode()
+        blob = _HEADER.pack(_MAGIC, len(body), len(label_bytes)) + body.tobytes() + label_bytes
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                self._unlink(Path(tmp))
+                raise
+            self.evict()
+        except OSError as e:
+            log.debug("assembly cache disabled (%s): %s", self.root, e)
+
+    # -------------------------
+    # Assembling through the cache
+    # -------------------------
+    def assemble(self, source: Union[str, Iterable[str]]) -> Tuple[List[int], Dict[str, int]]:
+        """assemble_with_labels() with the cache in front; source is text or a list of lines."""
+        text = source if isinstance(source, str) else "\n".join(source)
+        key = self.key(text)
+        hit = self.get(key)
+        if hit is not None:
+            self.hits += 1
+            return hit
+        self.misses += 1
+        words, labels = assemble_with_labels(text.splitlines())
+        self.put(key, words, labels)
+        return words, labels
+
+    def assemble_file(self, path: Union[str, os.PathLike]) -> Tuple[List[int], Dict[str, int]]:
+        return self.assemble(Path(path).read_text(encoding="utf-8"))
+
+    # -------------------------
+    # Housekeeping
+    # -------------------------
+    def entries(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every entry, oldest first."""
+        out = []
+        try:
+            paths = list(self.root.glob("*" + SUFFIX))
+        except OSError:
+            return out
+        for p in paths:
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue  # evicted by another process
+            out.append((st.st_mtime, st.st_size, p))
+        out.sort()
+        return out
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the total fits max_bytes; returns how many."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._unlink(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for _, _, path in self.entries():
+            self._unlink(path)
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def assemble_cached(source: Union[str, Iterable[str]],
+                    cache: Optional[AsmCache] = None) -> Tuple[List[int], Dict[str, int]]:
+    """(words, labels) for source via the default (or given) cache."""
+    return (cache if cache is not None else AsmCache()).assemble(source)
@@ -1,15 +1,36 @@
 # src/dspsim/assembler.py
 from __future__ import annotations
-import re, struct
-from typing import Dict, List
+import os, re, struct, sys
+from array import array
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
 from .encoder import (
     enc_3r, enc_ri, enc_i, enc_cmpi
 )
 from .isa import * # Import all MAJ_ opcodes
 
+# Bump whenever the words produced for some source change; it is part of the
+# asmcache key, so cached images from older assemblers are not reused.
+ASSEMBLER_VERSION = 3
+
 _reg_re = re.compile(r'^R(\d+)$', re.IGNORECASE)
 _label_re = re.compile(r'^[A-Za-z_]\w*$')
 
+# One line of source, split into all of its tokens at once: a label
+# definition, or a mnemonic with up to three comma-separated operands and an
+# optional @P# guard; either may be followed by a ';' comment.
+_operand = r'[^\s,;@](?:[^,;@]*[^\s,;@])?'
+_line_re = re.compile(rf'''[ \t]*(?:
+        (?P<label>[^\s;:@,]+)[ \t]*:                     # label:
+      | (?P<op>[^\s;@,]+)                                # OP
+        (?:[ \t]+(?P<a>{_operand}))?                     # operands
+        (?:[ \t]*,[ \t]*(?P<b>{_operand}))?
+        (?:[ \t]*,[ \t]*(?P<c>{_operand}))?
+        [ \t]*(?:@[ \t]*(?P<pred>[^\s;]*))?              # @P#
+    )?\s*(?:;.*)?$''', re.VERBOSE | re.DOTALL)
+
+_CMPI_CODES = {'EQ':0, 'NE':1, 'LT':2, 'GE':3, 'LE':4, 'GT':5}
+_THREE_REG = {'ADD': MAJ_ADD, 'SUB': MAJ_SUB, 'AND': MAJ_AND, 'OR': MAJ_OR}
+
 class AsmError(Exception):
     pass
 
@@ -22,6 +43,13 @@ def parse_reg(tok: str) -> int:
         raise AsmError(f"Register out of range: '{tok}'")
     return val
 
+_REGS = {f"{p}{i}": i for p in "rR" for i in range(32)}
+
+def _reg(tok: str) -> int:
+    # fast path for the common "r12" form; parse_reg reports anything else
+    r = _REGS.get(tok)
+    return parse_reg(tok) if r is None else r
+
 # In src/dspsim/assembler.py
 
 def parse_imm(tok: str, labels: Dict[str,int], pc: int) -> int:
@@ -37,19 +65,24 @@ def parse_imm(tok: str, labels: Dict[str,int], pc: int) -> int:
     except Exception:
         raise AsmError(f"Bad immediate: '{tok}'")
 
-def parse_mem(tok: str, labels: Dict[str,int], pc: int):
-    # forms: [R1+16], [R1-8], [R2]
+def split_mem(tok: str) -> Tuple[int, int, Optional[str]]:
+    """[R1+16] -> (1, 1, '16'), [R1-8] -> (1, -1, '8'), [R2] -> (2, 1, None)."""
     t = tok.strip()
     if not (t.startswith('[') and t.endswith(']')):
         raise AsmError(f"Bad mem syntax: '{tok}'")
     inner = t[1:-1].strip()
     if '+' in inner:
         base, off = inner.split('+',1)
-        return parse_reg(base.strip()), parse_imm(off.strip(), labels, pc)
+        return _reg(base.strip()), 1, off.strip()
     if '-' in inner:
         base, off = inner.split('-',1)
-        return parse_reg(base.strip()), -parse_imm(off.strip(), labels, pc)
-    return parse_reg(inner), 0
+        return _reg(base.strip()), -1, off.strip()
+    return _reg(inner), 1, None
+
+def parse_mem(tok: str, labels: Dict[str,int], pc: int):
+    # forms: [R1+16], [R1-8], [R2]
+    base, sign, off = split_mem(tok)
+    return base, (sign * parse_imm(off, labels, pc) if off is not None else 0)
 
 def first_pass(lines: List[str]) -> Dict[str,int]:
     labels = {}
@@ -73,99 +106,214 @@ def tokenize_args(s: str) -> List[str]:
     # split by commas but allow spaces
     return [p.strip() for p in s.split(',') if p.strip()]
 
-def assemble(lines: List[str]) -> List[int]:
+def assemble(lines: Iterable[str]) -> List[int]:
     """Assembles lines of text into a list of 32-bit instruction words."""
-    src = "\n".join(lines)
-    labels = first_pass(lines)
+    return assemble_with_labels(lines)[0]
+
+def assemble_with_labels(lines: Iterable[str]) -> Tuple[List[int], Dict[str,int]]:
+    """Like assemble, but also returns the labels (byte offsets from the first word)."""
+    words, labels = assemble_stream(lines)
+    return words.tolist(), labels
+
+# -------------------------
+# Streaming assembler
+# -------------------------
+class _ArrayOutput:
+    """Words kept in an array('I'); patched in place."""
+    def __init__(self, words: array):
+        self.words = words
+        self.start = len(words)
+        self.append = words.append
+
+    def patch(self, index: int, word: int) -> None:
+        self.words[self.start + index] = word
+
+    def close(self) -> None:
+        pass
+
+class _FileOutput:
+    """Little-endian words written to a seekable binary file in chunks."""
+    CHUNK = 1 << 16  # words
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.start = f.tell()
+        self.flushed = 0  # words already written to f
+        self.chunk = array('I')
+
+    def append(self, word: int) -> None:
+        self.chunk.append(word)
+        if len(self.chunk) >= self.CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        if sys.byteorder == 'big':
+            self.chunk.byteswap()
+        self.f.write(self.chunk.tobytes())
+        self.flushed += len(self.chunk)
+        self.chunk = array('I')
+
+    def patch(self, index: int, word: int) -> None:
+        if index >= self.flushed:
+            self.chunk[index - self.flushed] = word
+            return
+        self.f.seek(self.start + 4 * index)
+        self.f.write(struct.pack('<I', word))
+        self.f.seek(self.start + 4 * self.flushed)
+
+    def close(self) -> None:
+        self.flush()
+
+def _resolve(tok: str, labels: Dict[str,int]) -> Union[int, str]:
+    """Value of an immediate token, or the label name if it is not defined yet."""
+    t = tok[1:] if tok[:1] == '#' else tok
+    v = labels.get(t)
+    if v is not None:
+        return v
+    try:
+        return int(t, 0)
+    except ValueError:
+        pass
+    if _label_re.match(t):
+        return t
+    raise AsmError(f"Bad immediate: '{tok}'")
+
+def _jump_field(target: int, pc: int, tok: str) -> int:
+    # Offset is from the instruction *after* the jump, in words
+    offset = target - (pc + 4)
+    if offset % 4 != 0:
+        raise AsmError(f"Jump target {tok} is not word-aligned")
+    return (offset >> 2) & 0x3FFF
+
+def assemble_stream(source: Union[str, os.PathLike, Iterable[str]],
+                    out: Optional[Union[array, BinaryIO]] = None,
+                    ) -> Tuple[Union[array, BinaryIO], Dict[str, int]]:
+    """Assemble in one pass, without holding the source in memory.
+
+    source is a path or any iterable of lines (a file, a generator). Words go
+    to out: an array('I') (default: a new one) or a seekable binary file,
+    written little-endian. An operand that names a label not defined yet is
+    encoded as 0 and remembered, and all of those are patched once the
+    input ends. Memory therefore grows with the labels and pending forward
+    references, not with the number of lines. Returns (out, labels).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as f:
+            return assemble_stream(f, out)
+    if out is None:
+        out = array('I')
+    sink = _ArrayOutput(out) if isinstance(out, array) else _FileOutput(out)
+    labels: Dict[str,int] = {}
+    # (word index, partial word, label, kind, pc, sign, line number, token); kind is
+    # 'imm' for a 14-bit immediate or 'jump' for a J offset
+    fixups: List[tuple] = []
+    match = _line_re.match
+    emit = sink.append
     pc = 0
-    out_words: List[int] = []
-    for ln in lines:
-        s = ln.split(';',1)[0].strip()
-        if not s or s.endswith(':'):
-            continue
+    lineno = 0
+    try:
+        for lineno, ln in enumerate(source, 1):
+            m = match(ln)
+            if m is None:
+                raise AsmError(f"Cannot parse: '{ln.strip()}'")
+            label, op, a, b, c, pred = m.groups()
+            if label is not None:
+                if not _label_re.match(label):
+                    raise AsmError(f"Bad label name: '{label}'")
+                if label in labels:
+                    raise AsmError(f"Label multiply defined: '{label}'")
+                labels[label] = pc
+                continue
+            if op is None:
+                continue
+            args = (a, b, c) if c is not None else (a, b) if b is not None else (a,) if a else ()
+            emit(_encode_line(op.upper(), args, pred, pc, labels, fixups, lineno))
+            pc += 4
+        lineno = 0
+        for index, word, name, kind, at, sign, lineno, tok in fixups:
+            if name not in labels:
+                raise AsmError(f"Undefined label '{name}'")
+            value = labels[name]
+            field = _jump_field(value, at, tok) if kind == 'jump' else (sign * value) & 0x3FFF
+            sink.patch(index, word | field)
+    except AsmError as e:
+        raise AsmError(f"line {lineno}: {e}" if lineno else str(e)) from None
+    finally:
+        sink.close()
+    return out, labels
+
+def _imm14(word: int, tok: str, sign: int, pc: int, labels: Dict[str,int],
+           fixups: List[tuple], lineno: int) -> int:
+    """word with tok's value (times sign) in bits [13:0], or a fixup if tok is a forward label."""
+    v = _resolve(tok, labels)
+    if v.__class__ is str:
+        fixups.append((pc >> 2, word, v, 'imm', pc, sign, lineno, tok))
+        return word
+    return word | ((sign * v) & 0x3FFF)
 
-        pred = None
-        if '@P' in s:
-            parts = s.split('@',1)
-            s = parts[0].strip()
-            ptxt = parts[1].strip()
-            if not ptxt.upper().startswith('P'):
-                raise AsmError(f"Bad predicate: '{ptxt}'")
+def _encode_line(op: str, args: Tuple[str, ...], ptxt: Optional[str], pc: int,
+                 labels: Dict[str,int], fixups: List[tuple], lineno: int) -> int:
+    """Encode one instruction; forward label operands are added to fixups."""
+    if op == '.WORD':
+        # a raw word, as the disassembler prints words it cannot decode
+        if len(args) != 1 or ptxt is not None: raise AsmError(".word needs one value")
+        try:
+            value = int(args[0], 0)
+        except ValueError:
+            raise AsmError(f"Bad .word value: '{args[0]}'") from None
+        if not -(1 << 31) <= value <= 0xFFFFFFFF:
+            raise AsmError(f".word value out of range: {args[0]}")
+        return value & 0xFFFFFFFF
+    pred = None
+    if ptxt is not None:
+        if not ptxt.upper().startswith('P'):
+            raise AsmError(f"Bad predicate: '{ptxt}'")
+        try:
             pred = int(ptxt[1:])
-            if not (0 <= pred <= 3):
-                raise AsmError(f"Predicate out of range: {pred}")
+        except ValueError:
+            raise AsmError(f"Bad predicate: '{ptxt}'") from None
+        if not (0 <= pred <= 3):
+            raise AsmError(f"Predicate out of range: {pred}")
 
-        if ' ' in s:
-            op, args_text = s.split(None,1)
-        else:
-            op, args_text = s, ''
-        op = op.strip().upper()
-        args = tokenize_args(args_text) if args_text else []
-        word = None
-
-        if op in ('ADD', 'SUB', 'AND', 'OR'):
-            if len(args) != 3: raise AsmError(f"{op} needs rd,rs1,rs2")
-            rd, rs1, rs2 = parse_reg(args[0]), parse_reg(args[1]), parse_reg(args[2])
-            if op == 'ADD':
-                maj = MAJ_ADD
-            elif op == 'SUB':
-                maj = MAJ_SUB
-            elif op == 'AND':
-                maj = MAJ_AND
-            elif op == 'OR':
-                maj = MAJ_OR
-            word = enc_3r(maj, rd, rs1, rs2, pred, True)
-        elif op == 'ADDI':
-            if len(args) != 3: raise AsmError("ADDI needs rd,rs1,imm")
-            rd, rs1 = parse_reg(args[0]), parse_reg(args[1])
-            imm = parse_imm(args[2], labels, pc)
-            word = enc_ri(MAJ_ADDI, rd, rs1, imm & 0x3FFF, pred, True)
-        elif op == 'LD':
-            if len(args) != 2: raise AsmError("LD needs rd, [mem]")
-            rd = parse_reg(args[0])
-            base, off = parse_mem(args[1], labels, pc)
-            word = enc_ri(MAJ_LD32, rd, base, off & 0x3FFF, pred, True)
-        elif op == 'ST':
-            if len(args) != 2: raise AsmError("ST needs [mem], rs")
-            base, off = parse_mem(args[0], labels, pc)
-            rs = parse_reg(args[1])
-            w = enc_ri(MAJ_ST32, 0, base, off & 0x3FFF, pred, True)
-            w |= (rs & 0x1F) << 9
-            word = w
-        elif op == 'J':
-            if len(args) != 1: raise AsmError("J needs an immediate or a label")
-            # Jumps are PC-relative. The immediate is a signed word offset.
-            target_addr = parse_imm(args[0], labels, pc)
-            # Offset is from the instruction *after* the jump
-            offset = target_addr - (pc + 4)
-            if offset % 4 != 0:
-                raise AsmError(f"Jump target {args[0]} is not word-aligned")
-            imm = (offset >> 2) & 0x3FFF # Scale offset and fit into 14 bits
-            word = enc_i(MAJ_J, imm, pred, True)
-        elif op.startswith('CMPI.'):
-            _, spec = op.split('.',1)
-            mapping = {'EQ':0, 'NE':1, 'LT':2, 'GE':3, 'LE':4, 'GT':5}
-            if spec not in mapping: raise AsmError(f"Unknown CMPI spec {spec}")
-            code = mapping[spec]
-            if len(args) != 3: raise AsmError("CMPI.<X> needs Pdst, Rs1, imm")
-            pdst = int(args[0].upper().replace('P',''))
-            rs1 = parse_reg(args[1])
-            imm = parse_imm(args[2], labels, pc)
-            word = enc_cmpi(pdst, rs1, imm & 0x3FFF, code, pred, True)
-        elif op == 'HALT':
-            word = enc_i(MAJ_HALT, 0, pred, True)
-        else:
-            raise AsmError(f"Unknown op '{op}'")
-        
-        out_words.append(word)
-        pc += 4
-        
-    return out_words
+    if op in _THREE_REG:
+        if len(args) != 3: raise AsmError(f"{op} needs rd,rs1,rs2")
+        return enc_3r(_THREE_REG[op], _reg(args[0]), _reg(args[1]), _reg(args[2]), pred, True)
+    if op == 'ADDI':
+        if len(args) != 3: raise AsmError("ADDI needs rd,rs1,imm")
+        word = enc_ri(MAJ_ADDI, _reg(args[0]), _reg(args[1]), 0, pred, True)
+        return _imm14(word, args[2], 1, pc, labels, fixups, lineno)
+    if op == 'LD':
+        if len(args) != 2: raise AsmError("LD needs rd, [mem]")
+        rd = _reg(args[0])
+        base, sign, off = split_mem(args[1])
+        word = enc_ri(MAJ_LD32, rd, base, 0, pred, True)
+        return word if off is None else _imm14(word, off, sign, pc, labels, fixups, lineno)
+    if op == 'ST':
+        if len(args) != 2: raise AsmError("ST needs [mem], rs")
+        base, sign, off = split_mem(args[0])
+        rs = _reg(args[1])
+        word = enc_ri(MAJ_ST32, rs, base, 0, pred, True)  # value register in the rd field
+        return word if off is None else _imm14(word, off, sign, pc, labels, fixups, lineno)
+    if op == 'J':
+        if len(args) != 1: raise AsmError("J needs an immediate or a label")
+        # Jumps are PC-relative. The immediate is a signed word offset.
+        word = enc_i(MAJ_J, 0, pred, True)
+        target = _resolve(args[0], labels)
+        if target.__class__ is str:
+            fixups.append((pc >> 2, word, target, 'jump', pc, 1, lineno, args[0]))
+            return word
+        return word | _jump_field(target, pc, args[0])
+    if op.startswith('CMPI.'):
+        spec = op.split('.',1)[1]
+        if spec not in _CMPI_CODES: raise AsmError(f"Unknown CMPI spec {spec}")
+        if len(args) != 3: raise AsmError("CMPI.<X> needs Pdst, Rs1, imm")
+        pdst = int(args[0].upper().replace('P',''))
+        word = enc_cmpi(pdst, _reg(args[1]), 0, _CMPI_CODES[spec], pred, True)
+        return _imm14(word, args[2], 1, pc, labels, fixups, lineno)
+    if op == 'HALT':
+        return enc_i(MAJ_HALT, 0, pred, True)
+    raise AsmError(f"Unknown op '{op}'")
 
 def assemble_file(in_path: str, out_path: str):
-    with open(in_path,'r') as f:
-        lines = f.read().splitlines()
-    words = assemble(lines)
     with open(out_path,'wb') as g:
-        for w in words:
-            g.write(struct.pack('<I', w & 0xFFFFFFFF))
\ No newline at end of file
+        assemble_stream(in_path, g)
@@ -0,0 +1,216 @@
+# src/dspsim/batch.py
+"""Lockstep batch engine: N instances of one program, vectorized with NumPy.
+
+State is kept as arrays with one row per instance: registers are an
+(N, 32) uint32 array and memories a single (N, mem_size) uint8 array.
+Each step picks the lowest PC among the running instances, masks in the
+instances sitting at that PC and executes the instruction for all of them
+with one NumPy operation. Instances elsewhere are masked out for that
+step, the way a false predicate turns an instruction into a NOP in the
+cycle model, and rejoin when their PCs meet again.
+
+Semantics follow FunctionalSimulator. Faults (bad fetch, unknown opcode,
+out-of-range access, max_cycles) stop only the offending instance and are
+recorded in `errors`; the rest keep running. MMIO is not modelled.
+
+Requires numpy (pip install dspsim[batch]).
+"""
+from __future__ import annotations
+
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover - optional dependency
+    raise ImportError("dspsim.batch requires numpy (pip install 'dspsim[batch]')") from e
+
+from .core import _OPCODES, _imm14
+
+_ALU_UFUNCS = {'ADD': np.add, 'SUB': np.subtract, 'AND': np.bitwise_and, 'OR': np.bitwise_or}
+_BYTE_OFFSETS = np.arange(4, dtype=np.int64)
+
+
+class BatchSimulator:
+    def __init__(self, n: int, mem_size: int = 64 * 1024):
+        if n < 1:
+            raise ValueError("BatchSimulator needs at least one instance")
+        if mem_size % 4:
+            raise ValueError("mem_size must be a multiple of 4")
+        self.n = n
+        self.mem_size = mem_size
+        self.regs = np.zeros((n, 32), dtype=np.uint32)
+        self.mem = np.zeros((n, mem_size), dtype=np.uint8)
+        self.pc = np.full(n, 0x1000, dtype=np.int64)
+        self.cycle_count = np.zeros(n, dtype=np.int64)
+        self.running = np.zeros(n, dtype=bool)
+        # instance index -> error message, for instances stopped by a fault
+        self.errors: Dict[int, str] = {}
+        self._words = self.mem.view('<u4')
+        self._all_rows = np.arange(n)
+        # raw word -> (mnemonic, vectorized handler); see _predecode
+        self._decoded: Dict[int, tuple] = {}
+
+    # -------------------------
+    # Memory helpers
+    # -------------------------
+    def _rows(self, instances: Optional[Iterable[int]]):
+        return slice(None) if instances is None else np.asarray(list(instances), dtype=np.int64)
+
+    def load_words(self, addr: int, words: List[int],
+                   instances: Optional[Iterable[int]] = None) -> None:
+        """Load 32-bit words at addr into every instance (or only the given ones)."""
+        data = np.asarray(words, dtype=np.int64).astype('<u4').view(np.uint8)
+        self.load_blob(addr, data.tobytes(), instances)
+
+    def load_blob(self, addr: int, data: bytes, instances: Optional[Iterable[int]] = None) -> None:
+        """Copy data to addr in every instance (or only the given ones)."""
+        rows = self._rows(instances)
+        self.mem[rows, addr : addr + len(data)] = np.frombuffer(data, dtype=np.uint8)
+
+    def read32(self, instance: int, addr: int) -> int:
+        """Read one little-endian word from one instance's memory."""
+        return int.from_bytes(self.mem[instance, addr : addr + 4].tobytes(), 'little')
+
+    def _load(self, rows, addr):
+        if not (addr & 3).any():
+            return self._words[rows, addr >> 2]
+        b = self.mem[rows[:, None], addr[:, None] + _BYTE_OFFSETS].astype(np.uint32)
+        return b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16) | (b[:, 3] << 24)
+
+    def _store(self, rows, addr, val):
+        if not (addr & 3).any():
+            self._words[rows, addr >> 2] = val
+            return
+        self.mem[rows[:, None], addr[:, None] + _BYTE_OFFSETS] = (
+            (val[:, None] >> (8 * _BYTE_OFFSETS).astype(np.uint32)) & 0xFF).astype(np.uint8)
+
+    # -------------------------
+    # Execution
+    # -------------------------
+    def run(self, entry: int | None = None, max_cycles: int | None = None) -> None:
+        """Run every instance until it halts or faults.
+
+        max_cycles bounds each instance separately; an instance that reaches
+        it stops with "Max cycles reached" in errors.
+        """
+        if entry is not None:
+            self.pc[:] = entry
+        self.running[:] = True
+        self.errors.clear()
+        executed = np.zeros(self.n, dtype=np.int64)
+        running, pc = self.running, self.pc
+        while running.any():
+            if max_cycles is not None:
+                over = running & (executed >= max_cycles)
+                if over.any():
+                    self._fault(np.flatnonzero(over), "Max cycles reached")
+                    continue
+            pc0 = int(pc[running].min())
+            group = running & (pc == pc0)
+            if group.all():
+                rows, sel = self._all_rows, slice(None)
+            else:
+                rows = np.flatnonzero(group)
+                sel = rows
+            executed[sel] += 1
+
+            if not 0 <= pc0 <= self.mem_size - 4:
+                self._fault(rows, f"Fetch fault at PC=0x{pc0:X}: address out of range")
+                continue
+            if pc0 & 3:
+                words = self._load(rows, np.full(rows.size, pc0, dtype=np.int64))
+            else:
+                words = self._words[rows, pc0 >> 2]
+            word = int(words[0])
+            if (words != word).any():
+                # instances disagree about the code here: run each variant on its own rows
+                for w in np.unique(words):
+                    sub = rows[words == w]
+                    self._exec(int(w), sub, sub, pc0)
+            else:
+                self._exec(word, rows, sel, pc0)
+
+    def _exec(self, word: int, rows, sel, pc0: int) -> None:
+        hit = self._decoded.get(word)
+        if hit is None:
+            hit = self._decoded[word] = self._predecode(word)
+        # Advance PC early (as FunctionalSimulator does)
+        self.pc[sel] = pc0 + 4
+        self.cycle_count[sel] += 1
+        if hit is None:
+            self._fault(rows, f"Unknown opcode 0x{(word >> 28) & 0xF:X} at PC=0x{pc0:X}")
+            return
+        mnem, op = hit
+        bad = op(rows, sel, pc0)
+        if bad is not None:
+            self._fault(bad, f"Execution error at PC=0x{pc0:X} ({mnem}): address out of range")
+
+    def _fault(self, rows, msg: str) -> None:
+        self.running[rows] = False
+        for i in np.atleast_1d(rows).tolist():
+            self.errors[i] = msg
+
+    # -------------------------
+    # Vectorized semantics
+    # -------------------------
+    def _predecode(self, word: int):
+        """Return (mnemonic, handler(rows, sel, pc0)) for word, or None if unknown.
+
+        Handlers return the rows that faulted, or None.
+        """
+        hit = _OPCODES.get((word >> 28) & 0xF)
+        if hit is None:
+            return None
+        mnem = hit[0]
+        rd, rs1, rs2 = (word >> 19) & 0x1F, (word >> 14) & 0x1F, (word >> 9) & 0x1F
+        imm = _imm14(word)
+        if mnem in _ALU_UFUNCS:
+            op = partial(self._alu, _ALU_UFUNCS[mnem], rd, rs1, rs2)
+        elif mnem == 'ADDI':
+            op = partial(self._addi, rd, rs1, np.uint32(imm & 0xFFFFFFFF))
+        elif mnem == 'LD':
+            op = partial(self._ld, rd, rs1, np.uint32(imm & 0xFFFFFFFF))
+        elif mnem == 'ST':
+            # the value register comes from the rd field (see FunctionalSimulator._bind)
+            op = partial(self._st, rd, rs1, np.uint32(imm & 0xFFFFFFFF))
+        elif mnem == 'J':
+            op = partial(self._j, imm << 2)
+        elif mnem == 'HALT':
+            op = self._halt
+        else:
+            return None
+        return mnem, op
+
+    def _alu(self, ufunc: Callable, rd: int, rs1: int, rs2: int, rows, sel, pc0: int):
+        regs = self.regs
+        regs[sel, rd] = ufunc(regs[sel, rs1], regs[sel, rs2])
+
+    def _addi(self, rd: int, rs1: int, imm, rows, sel, pc0: int):
+        regs = self.regs
+        regs[sel, rd] = regs[sel, rs1] + imm
+
+    def _checked_addr(self, rs1: int, imm, rows, sel):
+        """Effective addresses for rows; splits off rows whose access would overrun memory."""
+        addr = (self.regs[sel, rs1] + imm).astype(np.int64)
+        bad = addr > self.mem_size - 4
+        if bad.any():
+            ok = rows[~bad]
+            return ok, ok, addr[~bad], rows[bad]
+        return rows, sel, addr, None
+
+    def _ld(self, rd: int, rs1: int, imm, rows, sel, pc0: int):
+        rows, sel, addr, bad = self._checked_addr(rs1, imm, rows, sel)
+        self.regs[sel, rd] = self._load(rows, addr)
+        return bad
+
+    def _st(self, rs2: int, rs1: int, imm, rows, sel, pc0: int):
+        rows, sel, addr, bad = self._checked_addr(rs1, imm, rows, sel)
+        self._store(rows, addr, self.regs[sel, rs2])
+        return bad
+
+    def _j(self, offset: int, rows, sel, pc0: int):
+        self.pc[sel] = pc0 + 4 + offset
+
+    def _halt(self, rows, sel, pc0: int):
+        self.running[sel] = False
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import struct
-from typing import List, Optional, Tuple
+import sys
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from .bitutil import u32
+from .memory import MEM_BACKENDS, PAGE_SHIFT, PAGE_SIZE, PagedMemory
 
 
 class MMIO:
     """Abstract base class for a Memory-Mapped I/O device."""
 
+    # Devices that behave like RAM (e.g. devices.MappedFile) also serve the
+    # bulk read()/write()/load_blob() calls, which otherwise bypass MMIO.
+    is_memory = False
+
     def read32(self, addr: int) -> int:
         """Reads a 32-bit value from the device at the given address."""
         raise NotImplementedError
@@ -24,16 +31,48 @@ class Bus:
     Simulates a system bus with main memory and support for memory-mapped I/O.
     """
 
-    def __init__(self, size: int = 16 * 1024 * 1024):
+    def __init__(self, size: int = 16 * 1024 * 1024, store: Optional[PagedMemory] = None,
+                 backend: str = "flat"):
         """
         Initializes the bus.
 
         Args:
-            size: The total size of the main memory in bytes.
+            size: The total size of the main memory (address space) in bytes.
+            store: Use this paged memory instead of allocating a new one.
+            backend: "flat" allocates a zero-filled bytearray of size bytes up
+                front; "paged" allocates 4 KiB pages on first write.
         """
-        self.mem = bytearray(size)
+        if backend not in MEM_BACKENDS:
+            raise ValueError(f"Unknown memory backend '{backend}' (expected one of {MEM_BACKENDS})")
+        if store is None and backend == "paged":
+            store = PagedMemory(size)
+        # Main memory is either a flat bytearray (self.mem) or a paged,
+        # copy-on-write PagedMemory (self.store). A flat bus switches to
+        # paged on its first snapshot.
+        self.size = size if store is None else store.size
+        self.mem: Optional[bytearray] = bytearray(size) if store is None else None
+        self.store = store
+        # Aligned-word view of the flat memory for the RAM fast path.
+        self._words: Optional[memoryview] = self._word_view(self.mem)
         # Each entry is a tuple: (start_addr, end_addr_inclusive, device_obj)
         self.mmio: List[Tuple[int, int, MMIO]] = []
+        # page -> (starts, ends, devices): the disjoint device ranges inside
+        # that page, sorted by start. Pages absent here are plain RAM and
+        # skip device lookup altogether.
+        self._mmio_pages: Dict[int, Tuple[List[int], List[int], List[MMIO]]] = {}
+        # Pages holding instructions some engine has predecoded. Writes that
+        # land in one of them call on_code_write(addr, size), once per page
+        # with the range clipped to it, so caches can drop the words written.
+        # A page stays watched until its owner calls unwatch_code().
+        self.code_pages: Set[int] = set()
+        self.on_code_write: Optional[Callable[[int, int], None]] = None
+
+    @staticmethod
+    def _word_view(mem: Optional[bytearray]) -> Optional[memoryview]:
+        # Native 'I' items are only the bus's little-endian words on little-endian hosts.
+        if mem is None or sys.byteorder != "little" or struct.calcsize('I') != 4:
+            return None
+        return memoryview(mem)[: len(mem) & ~3].cast('I')
 
     def map_mmio(self, start: int, size: int, dev: MMIO):
         """
@@ -45,17 +84,116 @@ class Bus:
             dev: The MMIO device object to map.
         """
         self.mmio.append((start, start + size - 1, dev))
+        for page in range(start >> PAGE_SHIFT, ((start + size - 1) >> PAGE_SHIFT) + 1):
+            self._index_page(page)
+
+    def map_file(self, start: int, path: str, mode: str = "rw"):
+        """
+        Maps a host file at start with mmap (see devices.MappedFile).
+
+        Returns the MappedFile; close() it to flush and unmap.
+        """
+        from .devices import MappedFile
+
+        dev = MappedFile(path, start, mode)
+        self.map_mmio(start, dev.size, dev)
+        return dev
+
+    def _index_page(self, page: int) -> None:
+        """Rebuilds the sorted, non-overlapping device ranges for one page.
+
+        Where mappings overlap, the one mapped first wins (as in self.mmio).
+        """
+        lo, hi = page << PAGE_SHIFT, ((page + 1) << PAGE_SHIFT) - 1
+        hits = [(max(s, lo), min(e, hi), d) for s, e, d in self.mmio if s <= hi and e >= lo]
+        cuts = sorted({s for s, _, _ in hits} | {e + 1 for _, e, _ in hits})
+        starts: List[int] = []
+        ends: List[int] = []
+        devs: List[MMIO] = []
+        for a, b in zip(cuts, cuts[1:]):
+            owner = next((d for s, e, d in hits if s <= a <= e), None)
+            if owner is None:
+                continue
+            if devs and devs[-1] is owner and ends[-1] == a - 1:
+                ends[-1] = b - 1
+            else:
+                starts.append(a); ends.append(b - 1); devs.append(owner)
+        self._mmio_pages[page] = (starts, ends, devs)
 
     def _mmio(self, addr: int) -> Optional[MMIO]:
         """Finds the MMIO device responsible for a given address, if any."""
-        for start, end, device in self.mmio:
-            if start <= addr <= end:
-                return device
+        ranges = self._mmio_pages.get(addr >> PAGE_SHIFT)
+        if ranges is None:
+            return None
+        starts, ends, devs = ranges
+        i = bisect_right(starts, addr) - 1
+        if i >= 0 and addr <= ends[i]:
+            return devs[i]
+        return None
+
+    def snapshot_memory(self) -> PagedMemory:
+        """
+        Returns a copy-on-write snapshot of main memory.
+
+        The first call freezes the flat bytearray as the shared base image;
+        from then on self.mem is None and all access goes through self.store.
+        """
+        if self.store is None:
+            self._words = None
+            self.store = PagedMemory(self.size, base=self.mem)
+            self.mem = None
+        return self.store.snapshot()
+
+    def restore_memory(self, snap: PagedMemory) -> None:
+        """Replaces main memory with a copy-on-write copy of snap."""
+        self._words = None
+        self.store = snap.snapshot()
+        self.mem = None
+        for page in list(self.code_pages):
+            self._code_written(page << PAGE_SHIFT, PAGE_SIZE)
+
+    def watch_code(self, addr: int) -> int:
+        """Marks the page containing addr as code and returns its page number."""
+        page = addr >> PAGE_SHIFT
+        self.code_pages.add(page)
+        return page
+
+    def unwatch_code(self, page: int) -> None:
+        """Stops watching page (its owner has no code cached there any more)."""
+        self.code_pages.discard(page)
+
+    def _code_written(self, addr: int, size: int) -> None:
+        """Notifies on_code_write of the part of [addr, addr + size) in each watched page."""
+        if size <= 0:
+            return
+        end = addr + size
+        for page in range(addr >> PAGE_SHIFT, ((end - 1) >> PAGE_SHIFT) + 1):
+            if page in self.code_pages:
+                if self.on_code_write is None:
+                    self.code_pages.discard(page)
+                    continue
+                lo = max(addr, page << PAGE_SHIFT)
+                self.on_code_write(lo, min(end, (page + 1) << PAGE_SHIFT) - lo)
+
+    def _memory_device(self, addr: int) -> Optional[MMIO]:
+        """The RAM-like device mapped at addr, if any (see MMIO.is_memory)."""
+        if (addr >> PAGE_SHIFT) in self._mmio_pages:
+            dev = self._mmio(addr)
+            if dev is not None and dev.is_memory:
+                return dev
         return None
 
     def load_blob(self, addr: int, data: bytes):
         """Loads a binary blob (bytes) into main memory at a specific address."""
-        self.mem[addr : addr + len(data)] = data
+        if dev := self._memory_device(addr):
+            dev.write(addr, data)
+            return
+        if self.code_pages:
+            self._code_written(addr, len(data))
+        if self.store is not None:
+            self.store.write(addr, data)
+        else:
+            self.mem[addr : addr + len(data)] = data
 
     def read32(self, addr: int) -> int:
         """
@@ -64,8 +202,12 @@ class Bus:
         Delegates to an MMIO device if the address is mapped;
         otherwise, reads from main memory.
         """
-        if dev := self._mmio(addr):
+        if (addr >> PAGE_SHIFT) in self._mmio_pages and (dev := self._mmio(addr)):
             return u32(dev.read32(addr))
+        elif self._words is not None and not addr & 3:
+            return self._words[addr >> 2]
+        elif self.store is not None:
+            return self.store.read32(addr)
         else:
             return struct.unpack_from('<I', self.mem, addr)[0]
 
@@ -76,15 +218,35 @@ class Bus:
         Delegates to an MMIO device if the address is mapped;
         otherwise, writes to main memory.
         """
-        if dev := self._mmio(addr):
+        if (addr >> PAGE_SHIFT) in self._mmio_pages and (dev := self._mmio(addr)):
             dev.write32(addr, val)
         else:
-            struct.pack_into('<I', self.mem, addr, u32(val))
+            code = self.code_pages
+            if code and (addr >> PAGE_SHIFT in code or (addr + 3) >> PAGE_SHIFT in code):
+                self._code_written(addr, 4)
+            if self._words is not None and not addr & 3:
+                self._words[addr >> 2] = val & 0xFFFFFFFF
+            elif self.store is not None:
+                self.store.write32(addr, val)
+            else:
+                struct.pack_into('<I', self.mem, addr, u32(val))
 
     def read(self, addr: int, size: int) -> bytes:
         """Reads a raw block of bytes directly from main memory."""
+        if dev := self._memory_device(addr):
+            return dev.read(addr, size)
+        if self.store is not None:
+            return self.store.read(addr, size)
         return bytes(self.mem[addr : addr + size])
 
     def write(self, addr: int, data: bytes) -> None:
         """Writes a raw block of bytes directly to main memory."""
-        self.mem[addr : addr + len(data)] = data
\ No newline at end of file
+        if dev := self._memory_device(addr):
+            dev.write(addr, data)
+            return
+        if self.code_pages:
+            self._code_written(addr, len(data))
+        if self.store is not None:
+            self.store.write(addr, data)
+        else:
+            self.mem[addr : addr + len(data)] = data
@@ -0,0 +1,170 @@
+# src/dspsim/cache.py
+"""Set-associative cache timing model for the cycle Core.
+
+Only tags are modelled; data always comes from memory, so a cache changes
+timing but never results. State is kept in flat arrays indexed by
+set * ways + way: tags (-1 = invalid), one replacement stamp per line, and
+dirty bits. No object is created per line. Lookups of the most recently
+used line return without searching the set, which covers straight-line
+fetch and streaming loads.
+
+Policies:
+    lru     evict the line used least recently
+    fifo    evict the line filled earliest
+    random  evict a random line (seeded, so runs repeat)
+
+Stores allocate on a miss and mark the line dirty. Evicting a dirty line
+counts a writeback, which costs no extra cycles.
+"""
+from __future__ import annotations
+
+import random
+from array import array
+from typing import Dict
+
+POLICIES = ("lru", "fifo", "random")
+
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20}
+
+
+def _pow2(n: int) -> bool:
+    return n > 0 and not n & (n - 1)
+
+
+class Cache:
+    def __init__(self, name: str, size: int = 32 * 1024, ways: int = 4, line: int = 32,
+                 policy: str = "lru", miss_latency: int = 20, seed: int = 0):
+        """
+        Args:
+            name: Label used in reports (e.g. "L1D").
+            size: Capacity in bytes.
+            ways: Associativity; ways == size // line makes it fully associative.
+            line: Line size in bytes (a power of two, at least 4).
+            policy: One of POLICIES.
+            miss_latency: Extra cycles an access takes when it misses.
+            seed: Seed for the random policy.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy '{policy}' (expected one of {POLICIES})")
+        if not _pow2(line) or line < 4:
+            raise ValueError(f"{name}: line size must be a power of two >= 4, got {line}")
+        if ways < 1 or size % (ways * line):
+            raise ValueError(f"{name}: size {size} is not a multiple of ways * line "
+                             f"({ways} * {line})")
+        sets = size // (ways * line)
+        if not _pow2(sets):
+            raise ValueError(f"{name}: {sets} sets; size / (ways * line) must be a power of two")
+        self.name = name
+        self.size, self.ways, self.line, self.sets = size, ways, line, sets
+        self.policy = policy
+        self.miss_latency = miss_latency
+        self._line_shift = line.bit_length() - 1
+        self._set_mask = sets - 1
+        self._set_bits = sets.bit_length() - 1
+        self._rng = random.Random(seed)
+        self.reset()
+
+    @classmethod
+    def from_spec(cls, name: str, spec: str) -> Cache:
+        """Build from "SIZE:WAYS:LINE[:POLICY[:MISS]]", e.g. "32K:4:32:lru:20"."""
+        parts = spec.split(":")
+        if not 3 <= len(parts) <= 5:
+            raise ValueError(f"bad cache spec '{spec}' (expected SIZE:WAYS:LINE[:POLICY[:MISS]])")
+        try:
+            size_text = parts[0].strip().upper()
+            unit = size_text[-1] if size_text[-1:] in ("K", "M") else ""
+            size = int(size_text[: len(size_text) - len(unit)], 0) * _UNITS[unit]
+            ways, line = int(parts[1], 0), int(parts[2], 0)
+            miss = int(parts[4], 0) if len(parts) == 5 else 20
+        except ValueError:
+            raise ValueError(f"bad cache spec '{spec}' "
+                             "(expected SIZE:WAYS:LINE[:POLICY[:MISS]])") from None
+        policy = parts[3] if len(parts) >= 4 else "lru"
+        return cls(name, size, ways, line, policy, miss)
+
+    def reset(self) -> None:
+        """Invalidate every line and zero the counters."""
+        n = self.sets * self.ways
+        self.tags = array('q', [-1]) * n
+        self.stamps = array('Q', [0]) * n
+        self.dirty = array('B', [0]) * n
+        self.reset_stats()
+        self._clock = 0
+        self._last_line = -1   # line number and slot of the most recent access
+        self._last_slot = 0
+
+    def reset_stats(self) -> None:
+        """Zero the counters but keep the contents (e.g. after a warmup)."""
+        self.hits = self.misses = self.writebacks = 0
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    def access(self, addr: int, write: bool = False) -> int:
+        """Look up addr, filling its line on a miss; returns the extra cycles (0 on a hit)."""
+        line = addr >> self._line_shift
+        self._clock += 1
+        if line == self._last_line:
+            slot = self._last_slot
+        else:
+            ways = self.ways
+            base = (line & self._set_mask) * ways
+            tag = line >> self._set_bits
+            tags = self.tags
+            for slot in range(base, base + ways):
+                if tags[slot] == tag:
+                    break
+            else:
+                return self._fill(line, base, tag, write)
+            self._last_line, self._last_slot = line, slot
+        self.hits += 1
+        if self.policy == "lru":
+            self.stamps[slot] = self._clock
+        if write:
+            self.dirty[slot] = 1
+        return 0
+
+    def _fill(self, line: int, base: int, tag: int, write: bool) -> int:
+        self.misses += 1
+        tags, stamps = self.tags, self.stamps
+        end = base + self.ways
+        if self.policy == "random":
+            slot = next((s for s in range(base, end) if tags[s] < 0), None)
+            if slot is None:
+                slot = base + self._rng.randrange(self.ways)
+        else:
+            # invalid lines carry stamp 0, so they are taken first
+            slot = min(range(base, end), key=stamps.__getitem__)
+        if tags[slot] >= 0 and self.dirty[slot]:
+            self.writebacks += 1
+        tags[slot] = tag
+        stamps[slot] = self._clock
+        self.dirty[slot] = 1 if write else 0
+        self._last_line, self._last_slot = line, slot
+        return self.miss_latency
+
+    def contains(self, addr: int) -> bool:
+        """True if addr's line is present (no counters or replacement state change)."""
+        line = addr >> self._line_shift
+        base = (line & self._set_mask) * self.ways
+        return (line >> self._set_bits) in self.tags[base : base + self.ways]
+
+    # -------------------------
+    # Reporting
+    # -------------------------
+    @property
+    def accesses(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def miss_rate(self) -> float:
+        return self.misses / self.accesses if self.accesses else 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "writebacks": self.writebacks}
+
+    def report(self) -> str:
+        size = f"{self.size // 1024} KiB" if self.size % 1024 == 0 else f"{self.size} B"
+        return (f"{self.name}: {size} {self.ways}-way {self.line} B lines ({self.policy})  "
+                f"hits={self.hits} misses={self.misses} miss rate={self.miss_rate:.2%} "
+                f"writebacks={self.writebacks}")
@@ -1,25 +1,26 @@
 from __future__ import annotations
 
 import sys
+import json
 import pathlib
 import logging
 import click
 import struct
+from typing import TYPE_CHECKING
 
 from .logging_setup import setup_logging
 from . import __version__
-from . import assembler
-from . import disassembler
-from .core import FunctionalSimulator
-from .core_cycle import Core as CycleSimulator, Memory as CycleMemory
-from .trace import TraceSink
 
-try:
-    from rich.console import Console
-    from rich.table import Table
-    HAVE_RICH = True
-except ImportError:
-    HAVE_RICH = False
+# Subcommands import what they need when they run, so `dspsim --version`,
+# `--help` and `asm` do not load the engines, tracing, numpy or rich.
+# tests/test_startup.py holds the start-up time to a budget.
+if TYPE_CHECKING:
+    from .core import FunctionalSimulator
+    from .trace import TraceFilter
+
+# Mirrors of sweep.ENGINES and trace.COMPRESSIONS for option choices
+ENGINES = ("fast", "jit", "cycle")
+COMPRESSIONS = ("none", "gzip", "zstd")
 
 log = logging.getLogger("dspsim.cli")
 
@@ -44,119 +45,593 @@ def cli(log_level: str):
 @click.option("-o", "--output", type=click.Path(dir_okay=False, path_type=pathlib.Path),
               help="Output binary file (.bin). If omitted, prints hex words.")
 def asm(asm_file: pathlib.Path, output: pathlib.Path | None):
-    """Assemble ASM_FILE into binary words."""
-    lines = _read_text_file(asm_file)
+    """Assemble ASM_FILE into binary words (streamed: the source is never held in memory)."""
+    from . import assembler
+
     try:
-        program_words = assembler.assemble(lines)
+        if output:
+            with output.open("wb") as f:
+                assembler.assemble_stream(asm_file, f)
+                count = f.tell() // 4
+            click.echo(f"Wrote {count} words to {output}")
+            return
+        program_words, _ = assembler.assemble_stream(asm_file)
     except assembler.AsmError as e:
+        if output:
+            output.unlink(missing_ok=True)  # don't leave a half-written binary behind
         raise click.ClickException(f"Assembly failed: {e}") from e
+    except OSError as e:
+        raise click.ClickException(f"Failed to read '{asm_file}': {e}") from e
     except Exception as e:
         raise click.ClickException(f"Assembly crashed: {e}") from e
 
-    if output:
-        with output.open("wb") as f:
-            for w in program_words:
-                f.write(struct.pack("<I", w))
-        click.echo(f"Wrote {len(program_words)} words to {output}")
-    else:
-        for w in program_words:
-            click.echo(f"0x{w:08X}")
+    for w in program_words:
+        click.echo(f"0x{w:08X}")
 
 @cli.command()
 @click.argument("bin_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path))
-def disasm(bin_file: pathlib.Path):
+@click.option("--base", default=0, show_default=True, type=click.IntRange(min=0),
+              help="Address of the first word (J targets and the address column use it).")
+@click.option("--addresses/--no-addresses", default=False, show_default=True,
+              help="Prefix each instruction with its address and raw word.")
+@click.option("--labels/--no-labels", default=True, show_default=True,
+              help="Name every J target L_<addr> and print the labels.")
+def disasm(bin_file: pathlib.Path, base: int, addresses: bool, labels: bool):
     """Disassemble a binary (.bin) of 32-bit words (little-endian)."""
-    data = bin_file.read_bytes()
-    if len(data) % 4:
+    from . import disassembler
+
+    try:
+        lines = disassembler.disassemble_file(bin_file, base=base, addresses=addresses,
+                                              auto_labels=labels)
+        out = click.get_text_stream("stdout")
+        for ln in lines:
+            out.write(ln + "\n")
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    except OSError as e:
+        raise click.ClickException(f"Failed to read '{bin_file}': {e}") from e
+
+def _parse_map_file(spec: str) -> tuple[int, str, str]:
+    """Split an ADDR:PATH[:ro|:cow|:rw] --map-file value."""
+    addr_text, sep, path = spec.partition(":")
+    mode = "rw"
+    for suffix in (":ro", ":cow", ":rw"):
+        if path.endswith(suffix):
+            path, mode = path[: -len(suffix)], suffix[1:]
+            break
+    try:
+        addr = int(addr_text, 0)
+    except ValueError:
+        addr = -1
+    if not sep or not path or addr < 0:
+        raise click.ClickException(f"Bad --map-file '{spec}' (expected ADDR:PATH[:ro|:cow])")
+    return addr, path, mode
+
+def _parse_pc_range(spec: str) -> tuple[int, int]:
+    """Parse a --trace-pc LO:HI value."""
+    lo_text, sep, hi_text = spec.partition(":")
+    try:
+        lo, hi = int(lo_text, 0), int(hi_text, 0)
+    except ValueError:
+        lo = hi = -1
+    if not sep or lo < 0 or hi <= lo:
+        raise click.ClickException(f"Bad --trace-pc '{spec}' (expected LO:HI with LO < HI)")
+    return lo, hi
+
+def _fast_forward(sim: FunctionalSimulator, count: int | None, stop_pc: int | None) -> str:
+    """Run sim for up to count instructions or until stop_pc; returns "count", "pc" or "halt"."""
+    try:
+        if stop_pc is not None:
+            return "pc" if sim.run_until(stop_pc, max_cycles=count) else "halt"
+        sim.run(max_cycles=count)
+    except RuntimeError as e:
+        if "Max cycles" not in str(e):
+            raise click.ClickException(f"Fast-forward failed: {e}") from e
+        return "count"
+    return "halt"
+
+def _open_trace(path: pathlib.Path | None, fmt: str, compression: str, filter: TraceFilter | None = None):
+    """Build the trace sink selected by --trace-file/--trace-format/--trace-compression."""
+    from .trace import BinaryTraceSink, TraceSink
+
+    if fmt == "json":
+        if compression != "none":
+            raise click.ClickException("--trace-compression needs --trace-format bin.")
+        return TraceSink(str(path) if path else None, filter=filter)
+    if path is None:
+        raise click.ClickException("--trace-format bin needs --trace-file.")
+    try:
+        return BinaryTraceSink(str(path), compression=compression, filter=filter)
+    except (OSError, RuntimeError) as e:
+        raise click.ClickException(f"Cannot open trace '{path}': {e}") from e
+
+def _load_program(asm_file: pathlib.Path | None,
+                  bin_file: pathlib.Path | None,
+                  use_cache: bool = True) -> tuple[list[int], dict[str, int]]:
+    """Assemble --asm or read --bin into 32-bit words plus labels (offsets from the first word).
+
+    Assembly goes through the on-disk cache (see asmcache) unless use_cache is False.
+    """
+    if not asm_file and not bin_file:
+        raise click.ClickException("Provide either --asm or --bin.")
+    if asm_file and bin_file:
+        raise click.ClickException("Provide only one of --asm or --bin.")
+
+    if asm_file:
+        from . import assembler
+        from .asmcache import assemble_cached
+
+        lines = _read_text_file(asm_file)
+        try:
+            if use_cache:
+                return assemble_cached(lines)
+            return assembler.assemble_with_labels(lines)
+        except assembler.AsmError as e:
+            raise click.ClickException(f"Assembly failed: {e}") from e
+
+    data = pathlib.Path(bin_file).read_bytes()
+    if len(data) % 4 != 0:
         raise click.ClickException("Binary size is not a multiple of 4 bytes.")
-    words = [struct.unpack_from("<I", data, i)[0] for i in range(0, len(data), 4)]
-    # Assuming disassembler.disassemble exists and works
-    lines = disassembler.disassemble(words)
-    for ln in lines:
-        click.echo(ln)
+    return [struct.unpack_from("<I", data, i)[0] for i in range(0, len(data), 4)], {}
 
 @cli.command()
 @click.option("--asm", "asm_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
               help="Assemble and run this assembly file.")
 @click.option("--bin", "bin_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
               help="Load and run this raw .bin file of 32-bit words.")
+@click.option("--elf", "elf_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+              help="Load and run this ELF executable (requires pyelftools).")
+@click.option("--cache/--no-cache", "use_cache", default=True, show_default=True,
+              help="Reuse assembled --asm programs from the on-disk cache ($DSPSIM_CACHE_DIR, "
+                   "default ~/.cache/dspsim).")
 @click.option("--base", default=0x1000, show_default=True, type=click.IntRange(min=0),
               help="Base load address.")
-@click.option("--entry", default=None, type=int, help="Entry PC address (default: base).")
-@click.option("--engine", type=click.Choice(["fast", "cycle"]), default="fast", show_default=True,
-              help="Select execution engine: functional fast model or cycle/timing model.")
+@click.option("--entry", default=None, type=int, help="Entry PC address (default: base, or the ELF entry).")
+@click.option("--engine", type=click.Choice(ENGINES), default="fast", show_default=True,
+              help="Select execution engine: functional fast model, its basic-block "
+                   "translating variant, or cycle/timing model.")
 @click.option("--trace/--no-trace", default=False, show_default=True, help="Enable instruction trace.")
 @click.option("--pretty/--no-pretty", default=False, show_default=True,
               help="Pretty print trace (requires rich).")
+@click.option("--trace-file", type=click.Path(dir_okay=False, path_type=pathlib.Path),
+              help="Write the trace here instead of stdout.")
+@click.option("--trace-format", type=click.Choice(["json", "bin"]), default="json", show_default=True,
+              help="json: one JSON object per line; bin: compact binary records written by a "
+                   "background thread (needs --trace-file; read with 'dspsim trace-dump').")
+@click.option("--trace-compression", type=click.Choice(COMPRESSIONS), default="none",
+              show_default=True, help="Chunk compression for --trace-format bin (zstd needs zstandard).")
+@click.option("--trace-start-cycle", default=0, type=click.IntRange(min=0), help="Trace from this cycle on.")
+@click.option("--trace-stop-cycle", default=None, type=click.IntRange(min=0), help="Stop tracing at this cycle.")
+@click.option("--trace-start-inst", default=0, type=click.IntRange(min=0),
+              help="Trace from the Nth instruction on (counted whether traced or not).")
+@click.option("--trace-stop-inst", default=None, type=click.IntRange(min=0),
+              help="Stop tracing at the Nth instruction.")
+@click.option("--trace-pc", "trace_pcs", multiple=True, metavar="LO:HI",
+              help="Only trace PCs in [LO, HI). Repeatable.")
+@click.option("--trace-op", "trace_ops", multiple=True, metavar="OP",
+              help="Only trace this opcode (decoder name, e.g. ADDI). Repeatable.")
+@click.option("--trace-mem-only/--no-trace-mem-only", default=False, show_default=True,
+              help="Only trace loads and stores.")
+@click.option("--trace-sample", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Trace one in every N instructions that pass the other filters.")
+@click.option("--mem-size", default=16 * 1024 * 1024, show_default=True, type=click.IntRange(min=4),
+              help="Size of the simulated address space in bytes.")
+@click.option("--mem-backend", type=click.Choice(["flat", "paged"]), default="flat", show_default=True,
+              help="flat: allocate all memory up front; paged: allocate 4 KiB pages on first write.")
+@click.option("--max-cycles", default=None, type=click.IntRange(min=1),
+              help="Stop after this many instructions (fast/jit) or cycles (cycle).")
+@click.option("--fast-forward", default=None, type=click.IntRange(min=1), metavar="N",
+              help="cycle engine: run the first N instructions on the functional model, then "
+                   "switch to the cycle model.")
+@click.option("--ff-until-pc", default=None, metavar="ADDR",
+              help="cycle engine: run on the functional model until PC reaches ADDR, then switch "
+                   "(with --fast-forward, whichever comes first).")
+@click.option("--warmup", default=0, show_default=True, type=click.IntRange(min=0),
+              help="Cycles to simulate in detail after fast-forwarding before counting stats or tracing.")
+@click.option("--l1i", default=None, metavar="SIZE:WAYS:LINE[:POLICY[:MISS]]",
+              help="cycle engine: model an L1 instruction cache, e.g. 32K:4:32:lru:20 "
+                   "(policy lru, fifo or random; MISS = extra cycles, default 20).")
+@click.option("--l1d", default=None, metavar="SIZE:WAYS:LINE[:POLICY[:MISS]]",
+              help="cycle engine: model an L1 data cache (same format as --l1i).")
+@click.option("--map-file", "map_files", multiple=True, metavar="ADDR:PATH[:ro|:cow]",
+              help="Back memory at ADDR with PATH via mmap (fast/jit engines). Writes go to the "
+                   "file unless :ro (read-only) or :cow (private copy-on-write). Repeatable.")
+@click.option("--profile/--no-profile", default=False, show_default=True,
+              help="Count executed instructions per PC and print a flat profile by label "
+                   "(fast/jit engines; jit runs interpreted while profiling).")
+@click.option("--profile-top", default=10, show_default=True, type=click.IntRange(min=0),
+              help="Number of hottest PCs listed in the profile.")
 def run(asm_file: pathlib.Path | None,
         bin_file: pathlib.Path | None,
+        elf_file: pathlib.Path | None,
+        use_cache: bool,
         base: int,
         entry: int | None,
         engine: str,
         trace: bool,
-        pretty: bool):
-    """Run a program (from ASM or BIN) on the simulator."""
-    if not asm_file and not bin_file:
-        raise click.ClickException("Provide either --asm or --bin.")
-    if asm_file and bin_file:
-        raise click.ClickException("Provide only one of --asm or --bin.")
+        pretty: bool,
+        trace_file: pathlib.Path | None,
+        trace_format: str,
+        trace_compression: str,
+        trace_start_cycle: int,
+        trace_stop_cycle: int | None,
+        trace_start_inst: int,
+        trace_stop_inst: int | None,
+        trace_pcs: tuple[str, ...],
+        trace_ops: tuple[str, ...],
+        trace_mem_only: bool,
+        trace_sample: int,
+        mem_size: int,
+        mem_backend: str,
+        max_cycles: int | None,
+        fast_forward: int | None,
+        ff_until_pc: str | None,
+        warmup: int,
+        l1i: str | None,
+        l1d: str | None,
+        map_files: tuple[str, ...],
+        profile: bool,
+        profile_top: int):
+    """Run a program (from ASM, BIN or ELF) on the simulator."""
+    if elf_file and (asm_file or bin_file):
+        raise click.ClickException("Provide only one of --asm, --bin or --elf.")
+    words, labels = (None, {}) if elf_file else _load_program(asm_file, bin_file, use_cache)
+    mappings = [_parse_map_file(spec) for spec in map_files]
+    if mappings and engine == "cycle":
+        raise click.ClickException("--map-file is only supported by the fast and jit engines.")
+    if profile and engine == "cycle":
+        raise click.ClickException("--profile is only supported by the fast and jit engines.")
+    if (fast_forward or ff_until_pc is not None or warmup) and engine != "cycle":
+        raise click.ClickException("--fast-forward, --ff-until-pc and --warmup need --engine cycle.")
+    if (l1i or l1d) and engine != "cycle":
+        raise click.ClickException("--l1i and --l1d need --engine cycle.")
+    caches = {"icache": None, "dcache": None}
+    if l1i or l1d:
+        from .cache import Cache
 
-    if asm_file:
-        lines = _read_text_file(asm_file)
         try:
-            words = assembler.assemble(lines)
-        except assembler.AsmError as e:
-            raise click.ClickException(f"Assembly failed: {e}") from e
-    else:
-        data = pathlib.Path(bin_file).read_bytes()
-        if len(data) % 4 != 0:
-            raise click.ClickException("Binary size is not a multiple of 4 bytes.")
-        words = [struct.unpack_from("<I", data, i)[0] for i in range(0, len(data), 4)]
+            caches = {"icache": Cache.from_spec("L1I", l1i) if l1i else None,
+                      "dcache": Cache.from_spec("L1D", l1d) if l1d else None}
+        except ValueError as e:
+            raise click.ClickException(str(e)) from e
+    ff_pc = None
+    if ff_until_pc is not None:
+        try:
+            ff_pc = int(ff_until_pc, 0)
+        except ValueError:
+            raise click.ClickException(f"Bad --ff-until-pc '{ff_until_pc}' (expected an address)") from None
+    from .core import FunctionalSimulator
+    from .symbols import SymbolTable
 
-    start_pc = entry if entry is not None else base
+    # Filled by load(): symbols for the profile and the [lo, hi) range holding code
+    program = {"symbols": SymbolTable(labels).rebased(base)}
 
-    if engine == "fast":
-        sim = FunctionalSimulator()
-        sim.load_words(base, words)
-        sim.pc = start_pc
+    def load(target) -> int:
+        """Load the program into target (Bus or CycleMemory) and return the start PC."""
+        if elf_file:
+            from .elf import ElfLoadError, load_elf
+
+            try:
+                image = load_elf(str(elf_file), target)
+            except ElfLoadError as e:
+                raise click.ClickException(str(e)) from e
+            log.info("ELF: entry 0x%X, %d segments, %d symbols",
+                     image.entry, len(image.segments), len(image.symbols))
+            code = [seg for seg in image.segments if seg.flags & 0x1] or image.segments
+            program["symbols"] = image.symbols
+            program["range"] = (min((seg.vaddr for seg in code), default=0),
+                                max((seg.vaddr + seg.memsz for seg in code), default=0))
+            return entry if entry is not None else image.entry
+        target.load_blob(base, b"".join(struct.pack("<I", w) for w in words))
+        program["range"] = (base, base + 4 * len(words))
+        return entry if entry is not None else base
+
+    have_rich = pretty and _have_rich()
+    if engine in ("fast", "jit"):
+        sim_cls = FunctionalSimulator
+        if engine == "jit":
+            from .jit import JitSimulator as sim_cls
+        sim = sim_cls(mem_size=mem_size, mem_backend=mem_backend)
+        sim.pc = load(sim.bus)
+        mapped = []
+        for addr, path, mode in mappings:
+            try:
+                mapped.append(sim.bus.map_file(addr, path, mode))
+            except (OSError, ValueError) as e:
+                raise click.ClickException(f"Cannot map '{path}': {e}") from e
         
-        if trace and pretty and not HAVE_RICH:
+        if trace and pretty and not have_rich:
             click.echo("Warning: --pretty requested but 'rich' not installed.", err=True)
+        if profile:
+            from .profiler import Profile
+
+            sim.profile = Profile(*program["range"])
         
-        sim.run()
+        try:
+            sim.run(max_cycles=max_cycles)
+        except RuntimeError as e:
+            if max_cycles is None or "Max cycles" not in str(e):
+                raise
+            click.echo(f"Stopped after {max_cycles} instructions (--max-cycles).", err=True)
+        finally:
+            for dev in mapped:
+                dev.close()
         
         click.echo("Final Registers:")
-        if HAVE_RICH and pretty:
+        if have_rich:
             _print_registers_rich(sim.regs)
         else:
             sim.dump_regs()
+        if profile:
+            click.echo()
+            click.echo(sim.profile.report(program["symbols"], top=profile_top))
 
     else: # engine == "cycle"
-        mem = CycleMemory()
-        program_bytes = b"".join(struct.pack("<I", w) for w in words)
-        mem.load_blob(base, program_bytes)
-        
-        trace_sink = TraceSink() if trace else None
-        core = CycleSimulator(mem=mem, trace=trace_sink)
-        core.pc = start_pc
+        from .core_cycle import Core as CycleSimulator, Memory as CycleMemory
+        from .trace import TraceFilter
 
-        while not core.halted:
-            core.step()
-        
-        if trace_sink:
-            trace_sink.close()
+        ff = None
+        if fast_forward or ff_pc is not None:
+            # Boot on the functional model, then hand its state (and memory) to the Core
+            sim = FunctionalSimulator(mem_size=mem_size, mem_backend=mem_backend)
+            sim.pc = load(sim.bus)
+            ff = _fast_forward(sim, fast_forward, ff_pc)
+        else:
+            mem = CycleMemory(mem_size, backend=mem_backend)
+            start_pc = load(mem)
+
+        trace_filter = None
+        if (trace_start_cycle or trace_stop_cycle is not None or trace_start_inst
+                or trace_stop_inst is not None or trace_pcs or trace_ops or trace_mem_only
+                or trace_sample > 1):
+            trace_filter = TraceFilter(start_cycle=trace_start_cycle, stop_cycle=trace_stop_cycle,
+                                       start_inst=trace_start_inst, stop_inst=trace_stop_inst,
+                                       pc_ranges=[_parse_pc_range(r) for r in trace_pcs],
+                                       ops=trace_ops, mem_only=trace_mem_only,
+                                       sample_every=trace_sample)
+        trace_sink = _open_trace(trace_file, trace_format, trace_compression, trace_filter) if trace else None
+        try:
+            if ff is not None:
+                core = CycleSimulator.from_functional(sim, trace=trace_sink, **caches)
+                core.halted = ff == "halt"
+                click.echo(f"Fast-forward: {sim.cycle_count} instructions, now at PC=0x{core.pc:X} "
+                           f"(stop: {ff})")
+            else:
+                core = CycleSimulator(mem=mem, trace=trace_sink, **caches)
+                core.pc = start_pc
+
+            if warmup:
+                core.trace = None
+                core.run(max_cycles=warmup)
+                core.trace = trace_sink
+                for cache in (core.icache, core.dcache):
+                    if cache is not None:
+                        cache.reset_stats()
+            stats = core.run(max_cycles=max_cycles)
+        finally:
+            # also when the run fails: joins the binary writer and writes the last chunk
+            if trace_sink:
+                try:
+                    trace_sink.close()
+                except RuntimeError as e:
+                    raise click.ClickException(str(e)) from e
 
         click.echo("Final Registers:")
         final_regs = [core.regs.read(i) for i in range(32)]
-        if HAVE_RICH and pretty:
+        if have_rich:
             _print_registers_rich(final_regs)
         else:
             for i in range(0, 32, 4):
                 chunk = final_regs[i:i+4]
                 click.echo(f"R{i:02d}-R{i+3:02d}: " + " ".join(f"{r:08X}" for r in chunk))
+        click.echo(f"Cycles: {stats.cycles}  Instructions: {stats.instructions}  CPI: {stats.cpi:.3f}  "
+                   f"Stall cycles: {stats.stall_cycles}  Stop: {stats.stop}")
+        if stats.stall_cycles:
+            click.echo("Stalls: " + "  ".join(f"{k}={v}" for k, v in stats.stalls.items() if v))
+        for cache in (core.icache, core.dcache):
+            if cache is not None:
+                click.echo(cache.report())
+
+@cli.command()
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path))
+@click.option("--asm", "asm_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+              help="Assemble and run this assembly file.")
+@click.option("--bin", "bin_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+              help="Load and run this raw .bin file of 32-bit words.")
+@click.option("--cache/--no-cache", "use_cache", default=True, show_default=True,
+              help="Reuse assembled --asm programs from the on-disk cache ($DSPSIM_CACHE_DIR, "
+                   "default ~/.cache/dspsim).")
+@click.option("--base", default=0x1000, show_default=True, type=click.IntRange(min=0),
+              help="Base load address.")
+@click.option("--entry", default=None, type=int, help="Entry PC address (default: base).")
+@click.option("--engine", type=click.Choice(ENGINES), default="fast", show_default=True,
+              help="Engine for cases that do not name one.")
+@click.option("--max-cycles", default=None, type=click.IntRange(min=1),
+              help="Budget for cases that do not set max_cycles.")
+@click.option("-j", "--jobs", default=None, type=click.IntRange(min=1),
+              help="Worker processes (default: CPU count).")
+@click.option("-o", "--output", type=click.Path(dir_okay=False, path_type=pathlib.Path),
+              help="Write JSON lines here instead of stdout.")
+def sweep(manifest: pathlib.Path,
+          asm_file: pathlib.Path | None,
+          bin_file: pathlib.Path | None,
+          use_cache: bool,
+          base: int,
+          entry: int | None,
+          engine: str,
+          max_cycles: int | None,
+          jobs: int | None,
+          output: pathlib.Path | None):
+    """Run a program against every case in MANIFEST in parallel.
+
+    MANIFEST is a JSON array or JSON lines of cases (see dspsim.sweep).
+    Results are streamed as JSON lines in completion order.
+    """
+    from . import sweep as sweep_mod
+
+    words, _ = _load_program(asm_file, bin_file, use_cache)
+    cases = _read_manifest(manifest)
+    out = output.open("w") if output else None
+    failed = 0
+    try:
+        for res in sweep_mod.sweep(words, cases, base=base, entry=entry, engine=engine,
+                                   max_cycles=max_cycles, jobs=jobs):
+            failed += res["error"] is not None
+            line = json.dumps(res)
+            if out:
+                out.write(line + "\n")
+            else:
+                click.echo(line)
+    finally:
+        if out:
+            out.close()
+    log.info("sweep: %d cases, %d with errors", len(cases), failed)
+
+@cli.command()
+@click.option("--asm", "asm_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+              help="Assemble and run this assembly file.")
+@click.option("--bin", "bin_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+              help="Load and run this raw .bin file of 32-bit words.")
+@click.option("--cache/--no-cache", "use_cache", default=True, show_default=True,
+              help="Reuse assembled --asm programs from the on-disk cache ($DSPSIM_CACHE_DIR, "
+                   "default ~/.cache/dspsim).")
+@click.option("--base", default=0x1000, show_default=True, type=click.IntRange(min=0),
+              help="Base load address.")
+@click.option("--entry", default=None, type=int, help="Entry PC address (default: base).")
+@click.option("--mem-size", default=16 * 1024 * 1024, show_default=True, type=click.IntRange(min=4),
+              help="Size of the simulated address space in bytes.")
+@click.option("--mem-backend", type=click.Choice(["flat", "paged"]), default="flat", show_default=True,
+              help="flat: allocate all memory up front; paged: allocate 4 KiB pages on first write.")
+@click.option("--interval", default=10_000_000, show_default=True, type=click.IntRange(min=1),
+              help="Instructions per interval.")
+@click.option("--max-k", default=10, show_default=True, type=click.IntRange(min=1),
+              help="Most phases (k-means clusters) to try.")
+@click.option("--dims", default=15, show_default=True, type=click.IntRange(min=1),
+              help="Random projection dimensions for clustering.")
+@click.option("--samples", default=2, show_default=True, type=click.IntRange(min=1),
+              help="Intervals simulated per phase; 2 or more give an error estimate.")
+@click.option("--warmup", default=0, show_default=True, type=click.IntRange(min=0),
+              help="Instructions run in detail before each interval and not counted.")
+@click.option("--seed", default=0, show_default=True, type=int, help="Seed for projection and clustering.")
+@click.option("--max-instructions", default=None, type=click.IntRange(min=1),
+              help="Stop the functional run after this many instructions.")
+@click.option("--bbv-out", type=click.Path(dir_okay=False, path_type=pathlib.Path),
+              help="Also write the basic-block vectors here in SimPoint .bb format.")
+def simpoint(asm_file: pathlib.Path | None,
+             bin_file: pathlib.Path | None,
+             use_cache: bool,
+             base: int,
+             entry: int | None,
+             mem_size: int,
+             mem_backend: str,
+             interval: int,
+             max_k: int,
+             dims: int,
+             samples: int,
+             warmup: int,
+             seed: int,
+             max_instructions: int | None,
+             bbv_out: pathlib.Path | None):
+    """Estimate cycle-model CPI by simulating only representative intervals."""
+    try:
+        from . import simpoint as simpoint_mod
+    except ImportError as e:
+        raise click.ClickException(str(e)) from e
+    from .core import FunctionalSimulator
+
+    words, _ = _load_program(asm_file, bin_file, use_cache)
+
+    def make_sim() -> FunctionalSimulator:
+        sim = FunctionalSimulator(mem_size=mem_size, mem_backend=mem_backend)
+        sim.load_words(base, words)
+        sim.pc = entry if entry is not None else base
+        return sim
+
+    try:
+        profile = simpoint_mod.collect_bbvs(make_sim(), interval, max_instructions)
+        if bbv_out:
+            with bbv_out.open("w") as out:
+                profile.write_bb(out)
+        est = simpoint_mod.estimate(make_sim, interval, max_k=max_k, dims=dims, samples=samples,
+                                    warmup=warmup, seed=seed, profile=profile)
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e)) from e
+
+    click.echo(f"Intervals: {len(profile.lengths)} x {interval}  Phases: {est.k}  "
+               f"Simulated: {len(est.points)} intervals ({est.detailed_instructions} instructions)")
+    for p in est.points:
+        click.echo(f"  phase {p.cluster} weight {est.weights[p.cluster]:.3f}  interval {p.interval:6d}"
+                   f"{'*' if p.representative else ' '}  CPI {p.cpi:.3f}")
+    error = f" +/- {est.cpi_error:.3f} (95%)" if est.cpi_error is not None else ""
+    click.echo(f"Instructions: {est.instructions}  Estimated CPI: {est.cpi:.3f}{error}  "
+               f"Estimated cycles: {est.cycles}")
+
+@cli.command("trace-dump")
+@click.argument("trace_file", type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path))
+@click.option("-o", "--output", type=click.Path(dir_okay=False, path_type=pathlib.Path),
+              help="Write JSON lines here instead of stdout.")
+def trace_dump(trace_file: pathlib.Path, output: pathlib.Path | None):
+    """Convert a binary trace (--trace-format bin) to JSON lines."""
+    from .trace import read_binary_trace
+
+    out = output.open("w") if output else None
+    try:
+        for rec in read_binary_trace(str(trace_file)):
+            line = json.dumps(rec)
+            if out:
+                out.write(line + "\n")
+            else:
+                click.echo(line)
+    except (ValueError, RuntimeError, OSError, EOFError) as e:
+        raise click.ClickException(f"Cannot read trace '{trace_file}': {e}") from e
+    finally:
+        if out:
+            out.close()
+
+@cli.command()
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False, path_type=pathlib.Path),
+              help="Listen on this Unix socket instead of TCP.")
+@click.option("--host", default="127.0.0.1", show_default=True, help="TCP address to listen on.")
+@click.option("--port", default=0, show_default=True, type=click.IntRange(0, 65535),
+              help="TCP port (0 picks a free one; the address is printed).")
+@click.option("-j", "--workers", default=None, type=click.IntRange(min=1),
+              help="Warm worker processes (default: CPU count).")
+@click.option("--max-cycles", default=100_000_000, show_default=True, type=click.IntRange(min=0),
+              help="Cycle budget cap for every job, and the budget of jobs that set none (0 = no cap).")
+def serve(socket_path: pathlib.Path | None, host: str, port: int, workers: int | None, max_cycles: int):
+    """Serve assemble/run/trace jobs over JSON-RPC (one JSON object per line)."""
+    from . import server
+
+    if socket_path is not None and not hasattr(server.socket, "AF_UNIX"):
+        raise click.ClickException("Unix sockets are not available on this platform; use --port.")
+    try:
+        server.serve(str(socket_path) if socket_path is not None else None, host, port,
+                     on_ready=lambda address: click.echo(f"Listening on {address}"),
+                     workers=workers, max_cycles=max_cycles or None)
+    except OSError as e:
+        raise click.ClickException(f"Cannot serve: {e}") from e
+
+def _read_manifest(path: pathlib.Path) -> list[dict]:
+    text = "\n".join(_read_text_file(path))
+    try:
+        if text.lstrip().startswith("["):
+            return json.loads(text)
+        return [json.loads(ln) for ln in text.splitlines() if ln.strip()]
+    except json.JSONDecodeError as e:
+        raise click.ClickException(f"Bad manifest '{path}': {e}") from e
+
+def _have_rich() -> bool:
+    try:
+        import rich  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 def _print_registers_rich(regs_32: list[int]):
     """Prints the register file state using a rich Table."""
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
     table = Table(title="Register File (R0..R31)")
     table.add_column("Range", justify="right")
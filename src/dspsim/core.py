@@ -7,22 +7,57 @@ reference/fast engine for correctness tests. It uses the Bus abstraction
 """
 from __future__ import annotations
 
-import struct
-from typing import List
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional, Set, Tuple
 
 from .isa import INSTRUCTION_SET
 from .bus import Bus
-from .bitutil import s32, u32
+from .bitutil import u32
+from .memory import PAGE_SHIFT, PagedMemory
+from .profiler import Profile
+
+# major opcode -> (mnemonic, executor, arg types); first INSTRUCTION_SET entry wins
+_OPCODES = {}
+for _mnem, (_fn, _argtypes, _maj) in INSTRUCTION_SET.items():
+    _OPCODES.setdefault(_maj, (_mnem, _fn, _argtypes))
+
+
+def _imm14(word: int) -> int:
+    """Sign-extend the 14-bit immediate in word[13:0]."""
+    imm = word & 0x3FFF
+    return imm - 0x4000 if imm & 0x2000 else imm
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Architectural state captured by FunctionalSimulator.snapshot()."""
+    regs: Tuple[int, ...]
+    pred: Tuple[bool, ...]
+    pc: int
+    cycle_count: int
+    mem: PagedMemory
 
 
 class FunctionalSimulator:
-    def __init__(self, mem_size: int = 16 * 1024 * 1024):
+    def __init__(self, mem_size: int = 16 * 1024 * 1024, bus: Optional[Bus] = None,
+                 mem_backend: str = "flat"):
         self.regs: List[int] = [0] * 32
         self.pred: List[bool] = [True] * 4  # predicate state (kept for compatibility)
         self.pc: int = 0x1000
         self.cycle_count: int = 0
         self.running: bool = False
-        self.bus = Bus(size=mem_size)
+        self.bus = bus if bus is not None else Bus(size=mem_size, backend=mem_backend)
+        # pc -> (bound handler, mnemonic); see _predecode
+        self._icache: Dict[int, tuple] = {}
+        # page -> PCs in it with an _icache entry
+        self._icache_pages: Dict[int, Set[int]] = {}
+        self.bus.on_code_write = self._code_written
+        # Set to a Profile to count retired instructions per PC (see _run_profiled)
+        self.profile: Optional[Profile] = None
+        # run_until(): the PC to stop before, and whether it was reached
+        self._stop_pc: Optional[int] = None
+        self._stop_hit = False
 
     # -------------------------
     # Memory helpers
@@ -36,6 +71,36 @@ class FunctionalSimulator:
         w = self.bus.read32(self.pc)
         return w
 
+    # -------------------------
+    # Snapshots
+    # -------------------------
+    def snapshot(self) -> Snapshot:
+        """Capture registers, predicates, PC, cycle count and memory (copy-on-write)."""
+        return Snapshot(tuple(self.regs), tuple(self.pred), self.pc, self.cycle_count,
+                        self.bus.snapshot_memory())
+
+    def restore(self, snap: Snapshot) -> None:
+        """Return to snap. The snapshot itself is left untouched and can be restored again."""
+        self.regs[:] = snap.regs
+        self.pred[:] = snap.pred
+        self.pc = snap.pc
+        self.cycle_count = snap.cycle_count
+        self.bus.restore_memory(snap.mem)
+        self.flush_icache()
+
+    def fork(self, snap: Optional[Snapshot] = None):
+        """New simulator of the same class starting from snap (default: the current state).
+
+        Memory is shared copy-on-write; MMIO devices are shared, not copied.
+        """
+        snap = snap if snap is not None else self.snapshot()
+        bus = Bus(store=snap.mem.snapshot())
+        for start, end, dev in self.bus.mmio:
+            bus.map_mmio(start, end - start + 1, dev)
+        child = type(self)(bus=bus)
+        child.restore(snap)
+        return child
+
     # -------------------------
     # Execution
     # -------------------------
@@ -43,83 +108,225 @@ class FunctionalSimulator:
         """Run starting from entry (or current pc). Stops on HALT or invalid opcode.
 
         max_cycles: optional safeguard to avoid infinite loops in tests.
+
+        Instructions are decoded once per PC into bound handlers (see
+        _predecode) and reused until a write to their code page invalidates them.
         """
         if entry is not None:
             self.pc = entry
         self.running = True
+        if self.profile is not None:
+            self._run_profiled(max_cycles)
+            return
         executed = 0
+        icache = self._icache
         while self.running:
             if max_cycles is not None and executed >= max_cycles:
                 raise RuntimeError("Max cycles reached")
-            try:
-                word = self.fetch_word()
-            except Exception as e:
-                raise RuntimeError(f"Fetch fault at PC=0x{self.pc:X}: {e}") from e
+            pc = self.pc
+            hit = icache.get(pc)
+            if hit is None:
+                hit = self._fill(pc)
 
             # Advance PC early (simple, deterministic flow)
-            self.pc += 4
+            self.pc = pc + 4
             self.cycle_count += 1
             executed += 1
 
-            maj = (word >> 28) & 0xF
+            op, mnem = hit
+            try:
+                op()
+            except Exception as e:
+                raise RuntimeError(f"Execution error at PC=0x{pc:X} ({mnem}): {e}") from e
 
-            # find matching instruction via INSTRUCTION_SET (small loop; fine for tests)
-            matched = False
-            for mnem, (fn, argtypes, majcode) in INSTRUCTION_SET.items():
-                if majcode == maj:
-                    matched = True
-                    try:
-                        self._dispatch(fn, argtypes, word)
-                    except Exception as e:
-                        raise RuntimeError(f"Execution error at PC=0x{self.pc-4:X} ({mnem}): {e}") from e
-                    break
+    def run_until(self, stop_pc: int, max_cycles: int | None = None) -> bool:
+        """run() until the instruction at stop_pc is about to execute.
 
-            if not matched:
-                raise RuntimeError(f"Unknown opcode 0x{maj:X} at PC=0x{self.pc-4:X}")
+        Returns True if stop_pc was reached and False if the program halted
+        first. The stop is a breakpoint handler planted in the predecode cache,
+        so the interpreter loop runs unchanged. Subclasses (the JIT) are run
+        interpreted here.
+        """
+        self._stop_pc, self._stop_hit = stop_pc, False
+        self._plant_stop()
+        try:
+            FunctionalSimulator.run(self, max_cycles=max_cycles)
+        finally:
+            self._stop_pc = None
+            self._icache.pop(stop_pc, None)
+        return self._stop_hit
 
-    def _dispatch(self, fn, argtypes, word: int):
-        """Decode fields from word according to canonical formats and call instruction semantics."""
+    def _plant_stop(self) -> None:
+        self._icache[self._stop_pc] = (self._break, "BREAK")
+        self._icache_pages.setdefault(self.bus.watch_code(self._stop_pc), set()).add(self._stop_pc)
+
+    def _break(self) -> None:
+        # run() has already moved past stop_pc; undo that and stop
+        self.pc -= 4
+        self.cycle_count -= 1
+        self.running = False
+        self._stop_hit = True
+
+    def _run_profiled(self, max_cycles: int | None) -> None:
+        """run() with one counter bump per retired instruction into self.profile.
+
+        Kept as a separate loop so that run() pays nothing when profiling is off.
+        To keep the overhead down, cycle_count is brought up to date when the
+        loop exits rather than per instruction (as the JIT does per block).
+        """
+        prof = self.profile
+        counts, lo, hi, outside = prof.counts, prof.lo, prof.hi, prof.outside
+        # instructions predecoded before the profile was attached; _fill reports the rest
+        for pc, (_, mnem) in list(self._icache.items()):
+            prof.decoded(pc, mnem)
+        limit = -1 if max_cycles is None else max(max_cycles, 0)
+        executed = 0
+        icache = self._icache
+        start_cycles = self.cycle_count
+        try:
+            while self.running:
+                if executed == limit:
+                    raise RuntimeError("Max cycles reached")
+                pc = self.pc
+                hit = icache.get(pc)
+                if hit is None:
+                    self.cycle_count = start_cycles + executed
+                    hit = self._fill(pc)
+
+                self.pc = pc + 4
+                executed += 1
+                if lo <= pc < hi:
+                    counts[(pc - lo) >> 2] += 1
+                else:
+                    outside[pc] = outside.get(pc, 0) + 1
+
+                op, mnem = hit
+                try:
+                    op()
+                except Exception as e:
+                    raise RuntimeError(f"Execution error at PC=0x{pc:X} ({mnem}): {e}") from e
+        finally:
+            # _fill already counted the cycle of an unknown opcode; keep it
+            self.cycle_count = max(self.cycle_count, start_cycles + executed)
+            prof.finish()
+
+    def _step(self) -> None:
+        """Execute exactly one instruction, as one iteration of run() would."""
+        pc = self.pc
+        hit = self._icache.get(pc)
+        if hit is None:
+            hit = self._fill(pc)
+        self.pc = pc + 4
+        self.cycle_count += 1
+        op, mnem = hit
+        try:
+            op()
+        except Exception as e:
+            raise RuntimeError(f"Execution error at PC=0x{pc:X} ({mnem}): {e}") from e
+
+    # -------------------------
+    # Predecode cache
+    # -------------------------
+    def _fill(self, pc: int):
+        """Fetch and predecode the instruction at pc, caching it when possible."""
+        try:
+            word = self.bus.read32(pc)
+        except Exception as e:
+            raise RuntimeError(f"Fetch fault at PC=0x{pc:X}: {e}") from e
+        hit = self._predecode(word)
+        if hit is None:
+            self.pc = pc + 4
+            self.cycle_count += 1
+            raise RuntimeError(f"Unknown opcode 0x{(word >> 28) & 0xF:X} at PC=0x{pc:X}")
+        self._cache_insn(pc, hit)
+        if self.profile is not None:
+            self.profile.decoded(pc, hit[1])
+        return hit
+
+    def _predecode(self, word: int):
+        """Return (bound handler, mnemonic) for word, or None for an unknown opcode."""
+        hit = _OPCODES.get((word >> 28) & 0xF)
+        if hit is None:
+            return None
+        mnem, fn, argtypes = hit
+        return self._bind(fn, argtypes, word), mnem
+
+    def _cache_insn(self, pc: int, entry) -> None:
+        """Remember a predecoded instruction and watch its page for writes."""
+        if self.bus._mmio(pc) is not None:
+            return  # device-backed code may change under us; always refetch
+        self._icache[pc] = entry
+        self._icache_pages.setdefault(self.bus.watch_code(pc), set()).add(pc)
+
+    def _code_written(self, addr: int, size: int) -> None:
+        """Bus hook: [addr, addr + size), within one watched page, was written."""
+        page = addr >> PAGE_SHIFT
+        self._invalidate(page, addr & ~3, addr + size)
+        if not self._has_code(page):
+            self.bus.unwatch_code(page)
+
+    def _invalidate(self, page: int, lo: int, hi: int) -> None:
+        """Drop the predecoded instructions at word addresses in [lo, hi), all in page.
+
+        Only the words actually written are dropped, so data stored next to
+        the code that stores it costs a set lookup, not a refill of the page.
+        """
+        pcs = self._icache_pages.get(page)
+        if not pcs:
+            return
+        if (hi - lo) >> 2 <= len(pcs):
+            hit = [pc for pc in range(lo, hi, 4) if pc in pcs]
+        else:
+            hit = [pc for pc in pcs if lo <= pc < hi]
+        for pc in hit:
+            pcs.discard(pc)
+            self._icache.pop(pc, None)
+        if not pcs:
+            del self._icache_pages[page]
+        if self._stop_pc in hit:
+            self._plant_stop()
+
+    def _has_code(self, page: int) -> bool:
+        """Whether anything is still cached for page (else the bus can stop watching it)."""
+        return page in self._icache_pages
+
+    def flush_icache(self) -> None:
+        """Drop all predecoded instructions (e.g. after poking bus.mem directly)."""
+        self._icache.clear()
+        self._icache_pages.clear()
+        self.bus.code_pages.clear()
+
+    def _bind(self, fn, argtypes, word: int):
+        """Decode fields from word according to canonical formats and bind them to fn."""
         # 3-register form: rd[23:19], rs1[18:14], rs2[13:9]
         if argtypes == ('reg', 'reg', 'reg'):
             rd = (word >> 19) & 0x1F
             rs1 = (word >> 14) & 0x1F
             rs2 = (word >> 9) & 0x1F
-            fn(self, rd, rs1, rs2)
-            return
+            return partial(fn, self, rd, rs1, rs2)
 
-        # register, reg, imm (RI): rd[23:19], rs1[18:14], imm[13:0] (14-bit signed)
+        # register, reg, imm (RI): rd[23:19], rs1[18:14], imm[13:0] (14-bit signed).
+        # ST shares this form; its value register is taken from the rd field.
         if argtypes == ('reg', 'reg', 'imm'):
             rd = (word >> 19) & 0x1F
             rs1 = (word >> 14) & 0x1F
-            imm = word & 0x3FFF
-            imm = s32(imm) if (imm & 0x2000) else imm  # keep sign
-            fn(self, rd, rs1, imm)
-            return
+            return partial(fn, self, rd, rs1, _imm14(word))
 
-        # store form uses rs2 in rs2 field, base in rs1
-        if argtypes == ('reg', 'reg', 'imm') and fn.__name__.startswith("instr_st"):
-            rs2 = (word >> 9) & 0x1F
-            rs1 = (word >> 14) & 0x1F
-            imm = word & 0x3FFF
-            imm = s32(imm) if (imm & 0x2000) else imm
-            fn(self, rs2, rs1, imm)
-            return
-        
-            # immediate-only form: imm[23:0] (for jumps, using 14 bits)
+        # immediate-only form: imm[13:0] (for jumps)
         if argtypes == ('imm',):
-            imm = word & 0x3FFF
-            imm = s32(imm) if (imm & 0x2000) else imm # sign extend
-            fn(self, imm)
-            return
-        
+            return partial(fn, self, _imm14(word))
+
         # HALT / no-arg
         if argtypes == ():
-            fn(self)
-            return
+            return partial(fn, self)
 
         # fallback: try to be helpful
         raise RuntimeError(f"Unsupported argtypes {argtypes}")
 
+    def _dispatch(self, fn, argtypes, word: int):
+        """Decode fields from word according to canonical formats and call instruction semantics."""
+        self._bind(fn, argtypes, word)()
+
     # -------------------------
     # Debugging helpers
     # -------------------------
@@ -1,9 +1,13 @@
 # core_cycle.py
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 from .inst import Inst
 from .decoder import decode_word
+from .cache import Cache
 from .fu import ALU, LSU, VEC
+from .memory import MEM_BACKENDS, PagedMemory
 from .trace import TraceSink
+import heapq
 import struct
 
 class RegFile:
@@ -18,17 +22,105 @@ class RegFile:
         self.R[idx] = val & 0xFFFFFFFF
 
 class Memory:
-    def __init__(self, size=16*1024*1024):
-        self.mem = bytearray(size)
+    def __init__(self, size=16*1024*1024, store: Optional[PagedMemory]=None, backend: str="flat"):
+        # backend "flat" = one bytearray up front, "paged" = lazy 4 KiB pages.
+        # A flat memory turns paged (copy-on-write) on its first snapshot, like Bus.
+        if backend not in MEM_BACKENDS:
+            raise ValueError(f"Unknown memory backend '{backend}' (expected one of {MEM_BACKENDS})")
+        if store is None and backend == "paged":
+            store = PagedMemory(size)
+        self.size = size if store is None else store.size
+        self.mem = bytearray(size) if store is None else None
+        self.store = store
+    @classmethod
+    def from_bus(cls, bus) -> "Memory":
+        """Memory over a Bus's main memory, shared rather than copied.
+
+        MMIO devices have no counterpart here, so a bus with devices mapped is refused.
+        """
+        if bus.mmio:
+            raise ValueError("the cycle model has no MMIO; unmap the bus's devices first")
+        mem = cls.__new__(cls)
+        mem.size, mem.mem, mem.store = bus.size, bus.mem, bus.store
+        return mem
     def load32(self, addr):
+        if self.store is not None:
+            return self.store.read32(addr)
         return struct.unpack_from('<I', self.mem, addr)[0]
     def store32(self, addr, val):
-        struct.pack_into('<I', self.mem, addr, val & 0xFFFFFFFF)
+        if self.store is not None:
+            self.store.write32(addr, val)
+        else:
+            struct.pack_into('<I', self.mem, addr, val & 0xFFFFFFFF)
     def load_blob(self, addr, data: bytes):
-        self.mem[addr:addr+len(data)] = data
+        if self.store is not None:
+            self.store.write(addr, data)
+        else:
+            self.mem[addr:addr+len(data)] = data
+    def snapshot(self) -> PagedMemory:
+        if self.store is None:
+            self.store = PagedMemory(self.size, base=self.mem)
+            self.mem = None
+        return self.store.snapshot()
+    def restore(self, snap: PagedMemory):
+        self.store = snap.snapshot()
+        self.mem = None
+
+@dataclass(frozen=True)
+class CoreSnapshot:
+    """State captured by Core.snapshot(); fus holds (busy_until, cur_inst) per unit and
+    rob the pending completions as (done_cycle, seq, fu index, inst, x, y)."""
+    regs: Tuple[int, ...]
+    pred: Tuple[bool, ...]
+    pc: int
+    cycle: int
+    halted: bool
+    fus: Tuple[Tuple[int, Optional[Inst]], ...]
+    mem: PagedMemory
+    rob: Tuple[tuple, ...] = ()
+    instret: int = 0
+
+# Why a packet could not issue: a source or destination register still in flight,
+# no free unit of a class, or an L1I miss fetching it.
+STALL_CAUSES = ("raw", "waw", "alu_busy", "lsu_busy", "vec_busy", "icache")
+
+@dataclass
+class RunStats:
+    """What one Core.run() call did."""
+    cycles: int = 0           # cycles advanced
+    instructions: int = 0     # instructions retired (committed, NOPed, J or HALT)
+    stall_cycles: int = 0     # cycles a fetched packet waited to issue
+    skipped_cycles: int = 0   # idle cycles jumped over without a step() call
+    stop: str = ""            # "halt", "max_cycles" or "until"
+    stalls: Dict[str, int] = field(default_factory=dict)  # stall cycles per STALL_CAUSES entry
+
+    @property
+    def cpi(self) -> float:
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+# decoder mnemonic -> register operands (sources, destination)
+_THREE_REG = ("ADD", "SUB", "AND", "OR", "XOR", "SHL", "SHR", "MUL", "MAC")
+_WRITES_RD = frozenset(_THREE_REG + ("ADDI", "NOT", "LD", "LD32"))
+
+def _operands(inst) -> Tuple[Tuple[int, ...], Optional[int]]:
+    op = inst.op
+    if op in _THREE_REG:
+        srcs = (inst.rs1, inst.rs2)
+    elif op in ("ST", "ST32"):
+        srcs = (inst.rs1, inst.rs2)
+    elif op in ("ADDI", "LD", "LD32", "NOT"):
+        srcs = (inst.rs1,)
+    else:
+        srcs = ()
+    return srcs, (inst.rd if op in _WRITES_RD else None)
 
 class Core:
-    def __init__(self, mem: Memory, trace: TraceSink=None):
+    # decoder mnemonic -> functional unit class; everything else runs on an ALU
+    LSU_OPS = frozenset({"LD", "ST", "LD32", "ST32"})
+    MAX_PACKET = 4  # words fetched per packet when no EOP bit ends it sooner
+
+    def __init__(self, mem: Memory, trace: TraceSink=None, icache: Optional[Cache]=None,
+                 dcache: Optional[Cache]=None):
         self.mem = mem
         self.regs = RegFile()
         self.pc = 0x1000
@@ -36,104 +128,319 @@ class Core:
         self.alus = [ALU("ALU0", latency=1), ALU("ALU1", latency=1)]
         self.lsus = [LSU("LSU0", latency=3)]
         self.vecs = [VEC("VEC0", latency=2, lanes=4)]
-        self.rob = []  # simple list of pending completions
+        self._fus = self.alus + self.lsus + self.vecs
+        self._units = {"alu": self.alus, "lsu": self.lsus, "vec": self.vecs}
+        # scoreboard: cycle from which each register's pending value is readable
+        self.reg_ready = [0] * 32
+        # pending completions: heap of (done_cycle, seq, fu, inst, x, y); seq keeps issue
+        # order. x/y are the operands captured at issue (see _issue).
+        self.rob = []
+        self._seq = 0
+        self.instret = 0
+        self.stalls = dict.fromkeys(STALL_CAUSES, 0)
+        self.skipped_cycles = 0
+        self._cycle_limit = None  # run()'s max_cycles bound; stall jumps stop there
         self.trace = trace
+        # Optional L1 timing models (see cache.py). An L1I miss delays the packet's
+        # issue; an L1D miss lengthens the load/store on the (blocking) LSU.
+        self.icache = icache
+        self.dcache = dcache
+        # (pc, cycle its words are in) for the packet whose L1I lookup is done; it is
+        # refetched after a stall and must not issue before that cycle
+        self._fetched = None
         self.halted = False
 
+    def _all_fus(self):
+        return self._fus
+
+    @property
+    def stall_cycles(self) -> int:
+        return sum(self.stalls.values())
+
+    def snapshot(self) -> CoreSnapshot:
+        """Capture registers, predicates, PC, cycle, FU occupancy, pending completions
+        and memory (copy-on-write)."""
+        index = {id(fu): i for i, fu in enumerate(self._fus)}
+        return CoreSnapshot(tuple(self.regs.R), tuple(self.regs.P), self.pc, self.cycle, self.halted,
+                            tuple((fu.busy_until, fu.cur_inst) for fu in self._fus),
+                            self.mem.snapshot(),
+                            tuple((done, seq, index[id(fu)], inst, x, y)
+                                  for done, seq, fu, inst, x, y in self.rob),
+                            self.instret)
+
+    def restore(self, snap: CoreSnapshot):
+        """Return to snap; the snapshot stays valid for further restores."""
+        self.regs.R[:] = snap.regs
+        self.regs.P[:] = snap.pred
+        self.pc = snap.pc
+        self.cycle = snap.cycle
+        self.halted = snap.halted
+        self._fetched = None
+        for fu, (busy_until, cur_inst) in zip(self._fus, snap.fus):
+            fu.busy_until, fu.cur_inst = busy_until, cur_inst
+        # snapshot order is heap order, so the list is still a valid heap
+        self.rob = [(done, seq, self._fus[i], inst, x, y) for done, seq, i, inst, x, y in snap.rob]
+        self._seq = max((e[1] for e in snap.rob), default=-1) + 1
+        # the scoreboard only matters for values still in flight
+        self.reg_ready = [0] * 32
+        for done, _, _, inst, _, _ in self.rob:
+            dst = _operands(inst)[1]
+            if dst is not None:
+                self.reg_ready[dst] = max(self.reg_ready[dst], done)
+        self.instret = snap.instret
+        self.mem.restore(snap.mem)
+
+    @classmethod
+    def from_functional(cls, sim, trace: TraceSink=None, icache: Optional[Cache]=None,
+                        dcache: Optional[Cache]=None) -> "Core":
+        """New Core continuing where the FunctionalSimulator sim stopped.
+
+        Registers, predicates and PC are copied; memory is sim's own, shared
+        without a copy (see Memory.from_bus), so sim should not run again
+        afterwards. The Core starts idle at cycle 0, with nothing in flight.
+        """
+        core = cls(Memory.from_bus(sim.bus), trace=trace, icache=icache, dcache=dcache)
+        core.regs.R[:] = [r & 0xFFFFFFFF for r in sim.regs]
+        core.regs.P[:] = sim.pred
+        core.pc = sim.pc
+        return core
+
+    def fork(self, snap: CoreSnapshot=None, trace: TraceSink=None):
+        """New Core starting from snap (default: now), sharing memory copy-on-write."""
+        snap = snap if snap is not None else self.snapshot()
+        child = Core(Memory(store=snap.mem.snapshot()), trace=trace)
+        child.restore(snap)
+        return child
+
     def fetch_packet(self):
-        # fetch one word (later: multiple words up to packet limit)
-        w = self.mem.load32(self.pc)
-        inst = decode_word(w, self.pc)
-        self.pc += 4
-        return [inst]
+        """Fetch words up to and including the one with the EOP bit (at most MAX_PACKET)."""
+        packet = []
+        pc = self.pc
+        while True:
+            inst = decode_word(self.mem.load32(pc), pc)
+            packet.append(inst)
+            pc += 4
+            if inst.endpkt or len(packet) == self.MAX_PACKET:
+                break
+        self.pc = pc
+        return packet
 
     def regs_snapshot(self):
         return {f"R{i}": self.regs.read(i) for i in range(8)}  # small snapshot for perf
 
+    # -------------------------
+    # Execution
+    # -------------------------
+    def run(self, max_cycles: Optional[int]=None, until=None) -> RunStats:
+        """Step until HALT, until max_cycles more cycles have passed, or until `until`.
+
+        until is a PC (stop before fetching from it) or a callable taking the
+        core and returning True to stop. Cycles in which nothing can issue are
+        skipped in one jump (see step), so a run costs time per event rather
+        than per cycle.
+        """
+        if isinstance(until, int):
+            stop_pc = until
+            until = lambda core: core.pc == stop_pc
+        start_cycle, start_ret, start_skip = self.cycle, self.instret, self.skipped_cycles
+        start_stalls = dict(self.stalls)
+        limit = None if max_cycles is None else self.cycle + max_cycles
+        step = self.step
+        stop = "halt"
+        self._cycle_limit = limit
+        try:
+            while not self.halted:
+                if limit is not None and self.cycle >= limit:
+                    stop = "max_cycles"
+                    break
+                if until is not None and until(self):
+                    stop = "until"
+                    break
+                step()
+        finally:
+            self._cycle_limit = None
+        stalls = {k: v - start_stalls[k] for k, v in self.stalls.items()}
+        return RunStats(self.cycle - start_cycle, self.instret - start_ret, sum(stalls.values()),
+                        self.skipped_cycles - start_skip, stop, stalls)
+
+    def _unit_class(self, inst) -> str:
+        if inst.op in self.LSU_OPS:
+            return "lsu"
+        if inst.op.startswith("V"):
+            return "vec"
+        return "alu"
+
     def step(self):
+        """Simulate one cycle: commit what is due, then fetch and issue one packet.
+
+        A packet issues as a whole or not at all. When it has to wait (a
+        register still in flight, or not enough free units), the cycle jumps
+        straight to the first one where it can issue and the wait is counted
+        under the binding cause. Returns False once the core has halted.
+        """
         if self.halted:
             return False
+        self._tick_fus()
+        start_pc = self.pc
         packet = self.fetch_packet()
-        # decode done in fetch; now try to issue
+        cycle = self.cycle
+        reg_ready = self.reg_ready
+
+        # Check the whole packet against the scoreboard and the units before issuing any
+        # of it; instructions in a packet read the registers as they were before it.
+        wake, cause = cycle, None
+        if self.icache is not None:
+            fetched = self._fetched
+            if fetched is None or fetched[0] != start_pc:
+                access = self.icache.access
+                penalty = 0
+                for inst in packet:
+                    penalty += access(inst.pc)
+                fetched = self._fetched = (start_pc, cycle + penalty)
+            if fetched[1] > wake:
+                # still waiting for the miss, even if a run() boundary cut the stall short
+                wake, cause = fetched[1], "icache"
+        issue = []
+        need = {}
         for inst in packet:
-            # predicate check
             if inst.pred is not None and not self.regs.P[inst.pred]:
-                # treat as NOP
-                if self.trace:
-                    self.trace.emit_inst(self.cycle, inst, {}, {}, [])
                 continue
-            # choose FU
-            fu = None
-            if inst.op in ("ADD","ADDI","SUB"):
-                for a in self.alus:
-                    if a.can_accept(self.cycle):
-                        fu = a; break
-            elif inst.op in ("LD32","ST32"):
-                for l in self.lsus:
-                    if l.can_accept(self.cycle):
-                        fu = l; break
-            elif inst.op.startswith("V"):
-                for v in self.vecs:
-                    if v.can_accept(self.cycle):
-                        fu = v; break
-            elif inst.op == "HALT":
-                self.halted = True
-                if self.trace:
-                    self.trace.emit_inst(self.cycle, inst, {}, {}, [])
-                return False
-            else:
-                # default ALU
-                for a in self.alus:
-                    if a.can_accept(self.cycle):
-                        fu = a; break
-            if not fu:
-                # stall: can't issue this cycle; bump cycle and try again
-                self.cycle += 1
-                # tick FUs to finish ready insts
-                self._tick_fus()
-                return True
-            # execute: capture reg states
-            regs_before = self.regs_snapshot()
-            # materialize execution immediate effect for single-cycle ALU or schedule for multi-cycle
-            fu.start(inst, self.cycle)
-            # we register completion record in ROB for writeback at end cycle
-            self.rob.append((fu, inst, self.cycle + fu.latency))
-        # advance time by one cycle and tick FUs
-        self._tick_fus()
+            if inst.op in ("J", "HALT") or inst.op.startswith("CMPI"):
+                continue
+            srcs, dst = _operands(inst)
+            for r in srcs:
+                if reg_ready[r] > wake:
+                    wake, cause = reg_ready[r], "raw"
+            if dst is not None and reg_ready[dst] > wake:
+                wake, cause = reg_ready[dst], "waw"
+            cls = self._unit_class(inst)
+            need[cls] = need.get(cls, 0) + 1
+            issue.append((inst, cls))
+        for cls, n in need.items():
+            units = self._units[cls]
+            if n > len(units):
+                raise RuntimeError(f"Packet at PC=0x{start_pc:X} needs {n} {cls.upper()} slots; "
+                                   f"the core has {len(units)}")
+            free_at = sorted(u.busy_until for u in units)[n - 1]
+            if free_at > wake:
+                wake, cause = free_at, f"{cls}_busy"
+        if wake > cycle:
+            if self._cycle_limit is not None and wake > self._cycle_limit:
+                wake = max(self._cycle_limit, cycle + 1)
+            self.pc = start_pc  # refetch the packet when it can issue
+            self.stalls[cause] += wake - cycle
+            self.skipped_cycles += wake - cycle - 1
+            self.cycle = wake
+            return True
+
+        self._fetched = None
+        for inst, cls in issue:
+            self._issue(inst, cls)
+        halt = False
+        for inst in packet:
+            if inst.pred is not None and not self.regs.P[inst.pred]:
+                # treat as NOP
+                self._retire_now(inst)
+            elif inst.op == "J":
+                # PC-relative from the following instruction, as in the functional model
+                self.pc = (inst.pc + 4 + (inst.imm << 2)) & 0xFFFFFFFF
+                self._retire_now(inst)
+            elif inst.op == "HALT" or inst.op.startswith("CMPI"):
+                # Major opcode 0xF is HALT, as in the functional model (the decoder
+                # names it CMPI_n because CMPI shares the opcode; neither engine runs CMPI).
+                halt = True
+                self._retire_now(inst)
+                break
+        if halt:
+            self._drain()
+            self.halted = True
+            return False
         self.cycle += 1
         return True
 
+    def _retire_now(self, inst):
+        """Retire an instruction that needs no unit (NOP, J, HALT) at issue."""
+        self.instret += 1
+        if self.trace is not None and self.trace.wants(self.cycle, inst):
+            self.trace.emit_commit(self.cycle, inst, None, (), ())
+
+    def _issue(self, inst, cls):
+        """Start inst on a free unit of cls, capturing its operands now."""
+        for fu in self._units[cls]:
+            if fu.can_accept(self.cycle):
+                break
+        R = self.regs.R
+        op = inst.op
+        x = y = None
+        if op in ("ADD", "SUB", "AND", "OR"):
+            x, y = R[inst.rs1], R[inst.rs2]
+        elif op in ("ADDI", "LD", "LD32"):
+            x = (R[inst.rs1] + (inst.imm or 0)) & 0xFFFFFFFF
+        elif op in ("ST", "ST32"):
+            x, y = (R[inst.rs1] + (inst.imm or 0)) & 0xFFFFFFFF, R[inst.rs2]
+        extra = 0
+        if cls == "lsu" and self.dcache is not None:
+            extra = self.dcache.access(x, write=y is not None)
+        fu.start(inst, self.cycle, extra)
+        done = self.cycle + fu.latency + extra
+        if op in _WRITES_RD:
+            self.reg_ready[inst.rd] = done
+        # completion record, committed by _tick_fus once the cycle reaches it
+        heapq.heappush(self.rob, (done, self._seq, fu, inst, x, y))
+        self._seq += 1
+
+    def _drain(self):
+        """Commit every pending completion, advancing the cycle to the last one."""
+        while self.rob:
+            self.cycle = max(self.cycle, self.rob[0][0])
+            self._tick_fus()
+
     def _tick_fus(self):
-        finished = []
-        for fu in (self.alus + self.lsus + self.vecs):
-            inst = fu.tick(self.cycle)
-            if inst:
-                finished.append((fu, inst))
-        # commit finished insts
-        for fu, inst in finished:
-            regs_before = self.regs_snapshot()
-            memops = []
-            # simple semantics: implement core ops here
-            if inst.op == "ADD":
-                a = self.regs.read(inst.rs1); b = self.regs.read(inst.rs2)
-                self.regs.write(inst.rd, (a + b) & 0xFFFFFFFF)
-            elif inst.op == "ADDI":
-                a = self.regs.read(inst.rs1)
-                self.regs.write(inst.rd, (a + (inst.imm or 0)) & 0xFFFFFFFF)
-            elif inst.op == "SUB":
-                a = self.regs.read(inst.rs1); b = self.regs.read(inst.rs2)
-                self.regs.write(inst.rd, (a - b) & 0xFFFFFFFF)
-            elif inst.op == "LD32":
-                addr = (self.regs.read(inst.rs1) + (inst.imm or 0)) & 0xFFFFFFFF
-                val = self.mem.load32(addr)
-                self.regs.write(inst.rd, val)
-                memops.append({"type":"LD","addr":hex(addr),"value":hex(val)})
-            elif inst.op == "ST32":
-                addr = (self.regs.read(inst.rs1) + (inst.imm or 0)) & 0xFFFFFFFF
-                val = self.regs.read(inst.rs2)
-                self.mem.store32(addr, val)
-                memops.append({"type":"ST","addr":hex(addr),"value":hex(val)})
-            # vector ops, branch, etc: implement later
-            regs_after = self.regs_snapshot()
-            if self.trace:
-                self.trace.emit_inst(self.cycle, inst, regs_before, regs_after, memops)
+        """Commit completions due by the current cycle, in completion then issue order."""
+        rob = self.rob
+        while rob and rob[0][0] <= self.cycle:
+            done, _, fu, inst, x, y = heapq.heappop(rob)
+            if fu.cur_inst is inst:
+                fu.cur_inst = None
+            self._commit(done, inst, x, y)
+
+    def _commit(self, cycle, inst, x, y):
+        """Apply a completed instruction. Without a trace sink (or when the sink
+        declines the instruction) nothing is allocated; otherwise the sink gets
+        the live register file, the write as an (idx, old, new) delta and the
+        memory access as a (type, addr, value) tuple."""
+        self.instret += 1
+        op = inst.op
+        if op == "ADD":
+            val = x + y
+        elif op == "ADDI":
+            val = x
+        elif op == "SUB":
+            val = x - y
+        elif op == "AND":
+            val = x & y
+        elif op == "OR":
+            val = x | y
+        elif op in ("LD", "LD32"):
+            val = self.mem.load32(x)
+        elif op in ("ST", "ST32"):
+            self.mem.store32(x, y)
+            val = None
+        else:
+            val = None  # vector ops etc: implement later
+        R = self.regs.R
+        trace = self.trace
+        if trace is None or not trace.wants(cycle, inst):
+            if val is not None:
+                R[inst.rd] = val & 0xFFFFFFFF
+            return
+        deltas = memops = ()
+        if val is not None:
+            rd = inst.rd
+            deltas = ((rd, R[rd], val & 0xFFFFFFFF),)
+            R[rd] = val & 0xFFFFFFFF
+            if op in ("LD", "LD32"):
+                memops = (("LD", x, val),)
+        elif op in ("ST", "ST32"):
+            memops = (("ST", x, y),)
+        trace.emit_commit(cycle, inst, R, deltas, memops)
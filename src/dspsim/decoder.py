@@ -1,9 +1,14 @@
 # src/dspsim/decoder.py
 
 from __future__ import annotations
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
 from .bitutil import get_bits, s32
 from .isa import *
-from .inst import Inst # Import the correct dataclass
+from .inst import Inst
+
+# Distinct raw words whose decode is kept; a program's hot loop fits many times over.
+DECODE_CACHE_SIZE = 1 << 16
 
 def _imm14s(word: int) -> int:
     """Extracts a 14-bit signed immediate from an instruction word."""
@@ -25,51 +30,56 @@ def _common(word: int) -> tuple:
     
     return maj, predicate_index, end, rd, rs1, rs2
 
+# -------------------------
+# Per-format field selection: (word, rd, rs1, rs2) -> (op, rd, rs1, rs2, imm)
+# -------------------------
+def _3r(op: str) -> Callable:
+    return lambda word, rd, rs1, rs2: (op, rd, rs1, rs2, None)
+
+def _ri(op: str) -> Callable:
+    return lambda word, rd, rs1, rs2: (op, rd, rs1, None, _imm14s(word))
+
+def _st(word, rd, rs1, rs2):
+    # the value register is encoded in the rd field; Inst carries it as rs2
+    return "ST", None, rs1, rd, _imm14s(word)
+
+def _j(word, rd, rs1, rs2):
+    return "J", None, None, None, _imm14s(word)
+
+def _jr(word, rd, rs1, rs2):
+    return "JR", None, rs1, None, None
+
+def _cmpi(word, rd, rs1, rs2):
+    # HALT shares major opcode 0xF and decodes as CMPI_0; both engines halt on it
+    return f"CMPI_{get_bits(word, 8, 5)}", None, rs1, None, _imm14s(word)
+
+# major opcode -> field selector; None marks an opcode the decoder rejects
+_DISPATCH: Tuple[Optional[Callable], ...] = tuple({
+    MAJ_ADD: _3r("ADD"), MAJ_ADDI: _ri("ADDI"), MAJ_SUB: _3r("SUB"), MAJ_AND: _3r("AND"),
+    MAJ_OR: _3r("OR"), MAJ_XOR: _3r("XOR"), MAJ_SHL: _3r("SHL"), MAJ_SHR: _3r("SHR"),
+    MAJ_MUL: _3r("MUL"), MAJ_MAC: _3r("MAC"), MAJ_LD32: _ri("LD"), MAJ_ST32: _st,
+    MAJ_J: _j, MAJ_JR: _jr, MAJ_CMPI: _cmpi,
+}.get(maj) for maj in range(16))
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode_fields(word: int) -> Optional[tuple]:
+    """The PC-independent part of a decode, cached by raw word: every Inst field
+    after pc, in order, or None if the major opcode is unrecognized."""
+    maj, pred, end, rd, rs1, rs2 = _common(word)
+    select = _DISPATCH[maj]
+    if select is None:
+        return None
+    return select(word, rd, rs1, rs2) + (pred, end, None)
+
+_new_inst = tuple.__new__
+
 def decode_word(word: int, pc: int = 0) -> Inst | None:
     """
     Decodes a 32-bit instruction word into an Inst object.
     
     Returns None if the major opcode is unrecognized.
     """
-    maj, pred, end, rd, rs1, rs2 = _common(word)
-    
-    # Helper to create Inst with common params
-    def make_inst(op, rd=rd, rs1=rs1, rs2=rs2, imm=None):
-        return Inst(raw=word, pc=pc, op=op, rd=rd, rs1=rs1, rs2=rs2, imm=imm, pred=pred, endpkt=end)
-
-    if maj == MAJ_ADD:
-        return make_inst("ADD")
-    if maj == MAJ_ADDI:
-        return make_inst("ADDI", rs2=None, imm=_imm14s(word))
-    if maj == MAJ_SUB:
-        return make_inst("SUB")
-    if maj == MAJ_AND:
-        return make_inst("AND")
-    if maj == MAJ_OR:
-        return make_inst("OR")
-    if maj == MAJ_XOR:
-        return make_inst("XOR")
-    if maj == MAJ_SHL:
-        return make_inst("SHL")
-    if maj == MAJ_SHR:
-        return make_inst("SHR")
-    if maj == MAJ_MUL:
-        return make_inst("MUL")
-    if maj == MAJ_MAC:
-        return make_inst("MAC")
-    if maj == MAJ_LD32:
-        return make_inst("LD", rs2=None, imm=_imm14s(word))
-    if maj == MAJ_ST32:
-        return make_inst("ST", rd=None, imm=_imm14s(word))
-    if maj == MAJ_J:
-        return make_inst("J", rd=None, rs1=None, rs2=None, imm=_imm14s(word))
-    if maj == MAJ_JR:
-        return make_inst("JR", rd=None, rs2=None)
-    if maj == MAJ_CMPI:
-        sub = get_bits(word, 8, 5)
-        return make_inst(f"CMPI_{sub}", rd=None, rs2=None, imm=_imm14s(word))
-    if maj == MAJ_HALT:
-        # Check for HALT-specific encoding if necessary, assuming simple for now
-        return make_inst("HALT", rd=None, rs1=None, rs2=None)
-        
-    return None
\ No newline at end of file
+    fields = decode_fields(word)
+    if fields is None:
+        return None
+    return _new_inst(Inst, (word, pc) + fields)
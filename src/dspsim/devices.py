@@ -1,3 +1,56 @@
 # Peripheral device models.
-# (Currently empty, can add UART, Timers, etc. later)
-pass
+from __future__ import annotations
+
+import mmap
+import struct
+
+from .bus import MMIO
+
+
+class MappedFile(MMIO):
+    """
+    A host file mapped into the guest address space with mmap.
+
+    Nothing is copied at load time; pages come in from the file as the guest
+    touches them. Modes:
+        rw   guest writes go straight to the file (read results back from it)
+        ro   guest writes raise PermissionError
+        cow  guest writes stay private to this mapping; the file is untouched
+    """
+
+    MODES = {"rw": mmap.ACCESS_WRITE, "ro": mmap.ACCESS_READ, "cow": mmap.ACCESS_COPY}
+    is_memory = True
+
+    def __init__(self, path: str, base: int, mode: str = "rw"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mapping mode '{mode}' (expected one of {tuple(self.MODES)})")
+        with open(path, "r+b" if mode == "rw" else "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=self.MODES[mode])
+        self.path = path
+        self.base = base
+        self.mode = mode
+        self.size = len(self.mm)
+
+    def read32(self, addr: int) -> int:
+        return struct.unpack_from('<I', self.mm, addr - self.base)[0]
+
+    def write32(self, addr: int, value: int) -> None:
+        if self.mode == "ro":
+            raise PermissionError(f"Write to read-only mapped file '{self.path}' at 0x{addr:X}")
+        struct.pack_into('<I', self.mm, addr - self.base, value & 0xFFFFFFFF)
+
+    def read(self, addr: int, size: int) -> bytes:
+        off = addr - self.base
+        return self.mm[off : off + size]
+
+    def write(self, addr: int, data: bytes) -> None:
+        if self.mode == "ro":
+            raise PermissionError(f"Write to read-only mapped file '{self.path}' at 0x{addr:X}")
+        off = addr - self.base
+        self.mm[off : off + len(data)] = data
+
+    def close(self) -> None:
+        """Flushes shared writes to the file and unmaps it."""
+        if self.mode == "rw":
+            self.mm.flush()
+        self.mm.close()
@@ -1,2 +1,289 @@
-# Disassembler logic. (Placeholder for now)
-pass
+# src/dspsim/disassembler.py
+"""Disassembler: 32-bit little-endian words back to assembler syntax.
+
+The field layout is the one decode_word() reads (and the encoder writes):
+maj [31:28], P? [27], Pidx [26:25], EOP [24], rd [23:19], rs1 [18:14],
+rs2 [13:9], imm14 [13:0] (signed) and the CMPI condition [8:5]. With numpy
+installed, the image is processed in chunks of CHUNK words. Each field is
+extracted for the whole chunk with one shift-and-mask. Rows are then
+grouped by major opcode, and each group is formatted through that
+opcode's entry in _FORMATS, so the only per-word Python left is the
+string formatting itself. Without numpy, each word goes through
+decode_word() and the same table, so the two paths produce identical
+text.
+
+Output is a stream of lines. Each line is an instruction, a "name:" label,
+or ".word 0x..." for a word that does not decode (the assembler accepts
+.word). By default the listing re-assembles to the same words, provided it
+only uses what the assembler can encode: ops it lacks (XOR, SHL, SHR, MUL,
+MAC, NOT, JR) are listed by name for reading, and a word marked "packet
+continues" comes back with EOP set, since the assembler ends every packet.
+J targets print as the label at the target when there is one, otherwise
+as an absolute address (reassembling that needs base=0). addresses=True
+prefixes each instruction with its address and raw word, objdump style.
+The result reads better but no longer assembles.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+from .decoder import _common, _imm14s, decode_word
+from .isa import (
+    MAJ_ADD, MAJ_ADDI, MAJ_SUB, MAJ_AND, MAJ_OR, MAJ_XOR, MAJ_SHL, MAJ_SHR,
+    MAJ_MUL, MAJ_MAC, MAJ_LD, MAJ_ST, MAJ_J, MAJ_JR, MAJ_CMPI,
+)
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAVE_NUMPY = False
+
+CHUNK = 1 << 16  # words formatted per step
+
+# major opcode -> (template, operand columns). "target" is the resolved J
+# destination, "cond" the CMPI condition name and "cmpimm" its immediate
+# without the condition bits (which the assembler ORs back in); the rest are
+# raw fields.
+_FORMATS = {
+    MAJ_ADD:  ("ADD r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_SUB:  ("SUB r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_AND:  ("AND r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_OR:   ("OR r%d, r%d, r%d",       ("rd", "rs1", "rs2")),
+    MAJ_XOR:  ("XOR r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_SHL:  ("SHL r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_SHR:  ("SHR r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_MUL:  ("MUL r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_MAC:  ("MAC r%d, r%d, r%d",      ("rd", "rs1", "rs2")),
+    MAJ_ADDI: ("ADDI r%d, r%d, #%d",     ("rd", "rs1", "imm")),
+    MAJ_LD:   ("LD r%d, [r%d%+d]",       ("rd", "rs1", "imm")),
+    # the store's value register is encoded in the rd field
+    MAJ_ST:   ("ST [r%d%+d], r%d",       ("rs1", "imm", "rd")),
+    MAJ_J:    ("J %s",                   ("target",)),
+    MAJ_JR:   ("JR r%d",                 ("rs1",)),
+    MAJ_CMPI: ("CMPI.%s P%d, r%d, #%d",  ("cond", "rd", "rs1", "cmpimm")),
+}
+_CONDS = ("EQ", "NE", "LT", "GE", "LE", "GT")
+_WORD = ".word 0x%08X"
+_CONTINUES = "  ; packet continues"  # EOP clear: the next word is in the same packet
+_HALT_MASK = 0x00FFFFFF              # HALT is MAJ_CMPI with every field below the header zero
+_SUFFIXES = [g + e for e in ("", _CONTINUES) for g in ("", " @P0", " @P1", " @P2", " @P3")]
+
+Image = Union[bytes, bytearray, memoryview, Iterable[int]]
+
+
+# -------------------------
+# Formatting
+# -------------------------
+def _target(addr: int, imm: int) -> int:
+    return (addr + 4 + (imm << 2)) & 0xFFFFFFFF
+
+
+def _show_target(target: int, names: Mapping[int, str]) -> str:
+    name = names.get(target)
+    return name if name is not None else "0x%X" % target
+
+
+def _cmp_imm(imm: int, code: int) -> int:
+    # bits [8:5] of a CMPI immediate are the condition; a negative immediate
+    # with a valid condition is printed raw, as there is no cleaner spelling
+    return imm - (code << 5) if imm >= 0 else imm
+
+
+def _format_word(word: int, addr: int, names: Mapping[int, str]) -> str:
+    """One word through decode_word(); the reference the vector path must match."""
+    inst = decode_word(word, addr)
+    if inst is None:
+        return _WORD % word
+    maj, pred, end, rd, rs1, rs2 = _common(word)
+    if maj == MAJ_CMPI and not word & _HALT_MASK:
+        text = "HALT"
+    elif maj == MAJ_CMPI and (word >> 5) & 0xF >= len(_CONDS):
+        return _WORD % word
+    else:
+        fields = {"rd": rd, "rs1": rs1, "rs2": rs2, "imm": _imm14s(word)}
+        if maj == MAJ_J:
+            fields["target"] = _show_target(_target(addr, fields["imm"]), names)
+        elif maj == MAJ_CMPI:
+            code = (word >> 5) & 0xF
+            fields["cond"] = _CONDS[code]
+            fields["cmpimm"] = _cmp_imm(fields["imm"], code)
+        template, columns = _FORMATS[maj]
+        text = template % tuple(fields[c] for c in columns)
+    if pred is not None:
+        text += " @P%d" % pred
+    return text if end else text + _CONTINUES
+
+
+def _format_chunk(w: "np.ndarray", addr0: int, names: Mapping[int, str]) -> List[str]:
+    """Text for every word of w (uint32), the first at addr0."""
+    n = len(w)
+    w = w.astype(np.int64)
+    maj = w >> 28
+    imm = w & 0x3FFF
+    imm -= (imm & 0x2000) << 1
+    fields = {"rd": (w >> 19) & 31, "rs1": (w >> 14) & 31, "rs2": (w >> 9) & 31, "imm": imm}
+    # index into _SUFFIXES: guard (0 = none, 1-4 = P0-P3), +5 when EOP is clear
+    suffix = (np.where((w >> 27) & 1, ((w >> 25) & 3) + 1, 0) + 5 * (1 - ((w >> 24) & 1))).tolist()
+    text = np.empty(n, dtype=object)
+
+    for m in np.unique(maj).tolist():
+        idx = np.flatnonzero(maj == m)
+        fmt = _FORMATS.get(m)
+        if fmt is None:
+            continue
+        if m == MAJ_CMPI:
+            halt = idx[(w[idx] & _HALT_MASK) == 0]
+            text[halt] = ["HALT" + _SUFFIXES[suffix[i]] for i in halt.tolist()]
+            idx = idx[(w[idx] & _HALT_MASK) != 0]
+            idx = idx[((w[idx] >> 5) & 0xF) < len(_CONDS)]
+        template, columns = fmt
+        cols = []
+        for c in columns:
+            if c == "target":
+                targets = (addr0 + 4 + 4 * idx + 4 * imm[idx]) & 0xFFFFFFFF
+                cols.append([_show_target(t, names) for t in targets.tolist()])
+            elif c == "cond":
+                cols.append([_CONDS[k] for k in ((w[idx] >> 5) & 0xF).tolist()])
+            elif c == "cmpimm":
+                v = imm[idx]
+                cols.append(np.where(v >= 0, v - (((w[idx] >> 5) & 0xF) << 5), v).tolist())
+            else:
+                cols.append(fields[c][idx].tolist())
+        sfx = [_SUFFIXES[suffix[i]] for i in idx.tolist()]
+        text[idx] = [template % t + x for t, x in zip(zip(*cols), sfx)]
+
+    undecoded = np.flatnonzero(text == None)  # noqa: E711 - elementwise on an object array
+    text[undecoded] = [_WORD % v for v in w[undecoded].tolist()]
+    return text.tolist()
+
+
+# -------------------------
+# Chunk sources
+# -------------------------
+def _chunks_of(image: Image) -> Callable[[], Iterator[Union["np.ndarray", List[int]]]]:
+    """A callable yielding image in CHUNK-word pieces; callable again for a second pass."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        data = memoryview(image).cast("B")
+        if len(data) % 4:
+            raise ValueError("Image size is not a multiple of 4 bytes")
+        if HAVE_NUMPY:
+            words = np.frombuffer(data, "<u4")
+        else:
+            words = [w for (w,) in struct.iter_unpack("<I", data)]
+    else:
+        words = np.asarray(image, dtype=np.uint32) if HAVE_NUMPY else list(image)
+    return lambda: (words[i : i + CHUNK] for i in range(0, len(words), CHUNK))
+
+
+def _file_chunks(path: Union[str, os.PathLike],
+                 ) -> Callable[[], Iterator[Union["np.ndarray", List[int]]]]:
+    size = os.path.getsize(path)
+    if size % 4:
+        raise ValueError(f"{os.fspath(path)}: size is not a multiple of 4 bytes")
+
+    def read():
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK * 4)
+                if not data:
+                    return
+                if HAVE_NUMPY:
+                    yield np.frombuffer(data, "<u4")
+                else:
+                    yield [w for (w,) in struct.iter_unpack("<I", data)]
+    return read
+
+
+def jump_targets(chunks: Iterable[Union["np.ndarray", List[int]]], base: int = 0) -> List[int]:
+    """Sorted, de-duplicated destinations of every J in the image."""
+    found = set()
+    addr = base
+    for w in chunks:
+        if HAVE_NUMPY:
+            w = np.asarray(w, dtype=np.int64)
+            idx = np.flatnonzero((w >> 28) == MAJ_J)
+            imm = w[idx] & 0x3FFF
+            imm -= (imm & 0x2000) << 1
+            found.update(((addr + 4 + 4 * idx + 4 * imm) & 0xFFFFFFFF).tolist())
+        else:
+            for i, word in enumerate(w):
+                if word >> 28 == MAJ_J:
+                    found.add(_target(addr + 4 * i, _imm14s(word)))
+        addr += 4 * len(w)
+    return sorted(found)
+
+
+# -------------------------
+# Listing
+# -------------------------
+def _listing(chunks: Callable[[], Iterator], base: int, addresses: bool,
+             labels: Optional[Mapping[str, int]], auto_labels: bool) -> Iterator[str]:
+    names: Dict[int, str] = {}
+    for name, addr in (labels or {}).items():
+        names.setdefault(addr, name)  # first name wins for operands
+    by_addr: Dict[int, List[str]] = {}
+    for name, addr in (labels or {}).items():
+        by_addr.setdefault(addr, []).append(name)
+    if auto_labels:
+        for t in jump_targets(chunks(), base):
+            if t not in names:
+                names[t] = "L_%X" % t
+                by_addr[t] = [names[t]]
+    label_addrs = sorted(by_addr)
+
+    addr = base
+    for w in chunks():
+        n = len(w)
+        text = _format_chunk(w, addr, names) if HAVE_NUMPY else [
+            _format_word(word, addr + 4 * i, names) for i, word in enumerate(w)]
+        if addresses:
+            raw = w.tolist() if HAVE_NUMPY else w
+            lines = list(map("%08X:  %08X  %s".__mod__,
+                             zip(range(addr, addr + 4 * n, 4), raw, text)))
+        else:
+            lines = ["    " + t for t in text]
+        # labels inside this chunk, emitted just before their word
+        start = 0
+        j = bisect_left(label_addrs, addr)
+        while j < len(label_addrs) and label_addrs[j] < addr + 4 * n:
+            at = label_addrs[j]
+            j += 1
+            if (at - addr) & 3:
+                continue  # not on a word boundary: nothing to attach it to
+            i = (at - addr) >> 2
+            yield from lines[start:i]
+            for name in by_addr[at]:
+                yield name + ":"
+            start = i
+        yield from lines[start:]
+        addr += 4 * n
+
+
+def disassemble(image: Image, base: int = 0, addresses: bool = False,
+                labels: Optional[Mapping[str, int]] = None,
+                auto_labels: bool = False) -> Iterator[str]:
+    """Lines of assembly for an image, produced lazily.
+
+    Args:
+        image: Little-endian bytes (anything supporting the buffer protocol)
+            or a sequence of word values.
+        base: Address of the first word.
+        addresses: Prefix each instruction with "ADDR:  WORD" columns.
+        labels: name -> address symbols (e.g. assembler labels rebased to
+            base, or SymbolTable.by_name); emitted as "name:" lines and used
+            for J targets.
+        auto_labels: Also invent an L_<addr> label for every J target that
+            has no name yet.
+    """
+    return _listing(_chunks_of(image), base, addresses, labels, auto_labels)
+
+
+def disassemble_file(path: Union[str, os.PathLike], base: int = 0, addresses: bool = False,
+                     labels: Optional[Mapping[str, int]] = None,
+                     auto_labels: bool = False) -> Iterator[str]:
+    """disassemble() reading path a chunk at a time (twice with auto_labels), never whole."""
+    return _listing(_file_chunks(path), base, addresses, labels, auto_labels)
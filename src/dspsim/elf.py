@@ -0,0 +1,105 @@
+# src/dspsim/elf.py
+"""ELF loader (requires the optional pyelftools dependency).
+
+PT_LOAD segments are copied into the target straight out of an mmap of
+the file as memoryview slices, one load_blob per segment. Nothing is
+staged through intermediate bytes objects and there is no per-word loop.
+The .bss part of a segment (memsz beyond filesz) is not written at all,
+because simulator memory starts zeroed. With the paged backend those
+pages are only allocated when the program touches them.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+from dataclasses import dataclass
+from typing import List
+
+from .symbols import SymbolTable
+
+try:
+    from elftools.common.exceptions import ELFError
+    from elftools.elf.elffile import ELFFile
+    from elftools.elf.sections import SymbolTableSection
+    HAVE_ELFTOOLS = True
+except ImportError:
+    HAVE_ELFTOOLS = False
+
+
+class ElfLoadError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Segment:
+    vaddr: int
+    offset: int
+    filesz: int
+    memsz: int
+    flags: int
+
+
+class ElfImage:
+    """A parsed ELF32 little-endian executable: entry point, PT_LOAD segments and symbols."""
+
+    def __init__(self, path: str):
+        if not HAVE_ELFTOOLS:
+            raise ElfLoadError("ELF support requires pyelftools (pip install 'dspsim[elf]')")
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                elf = ELFFile(f)
+            except ELFError as e:
+                raise ElfLoadError(f"'{path}' is not a valid ELF file: {e}") from e
+            if elf.elfclass != 32 or not elf.little_endian:
+                raise ElfLoadError(f"'{path}' is not a 32-bit little-endian ELF")
+            self.entry: int = elf.header["e_entry"]
+            self.segments: List[Segment] = [
+                Segment(seg["p_vaddr"], seg["p_offset"], seg["p_filesz"], seg["p_memsz"],
+                        seg["p_flags"])
+                for seg in elf.iter_segments() if seg["p_type"] == "PT_LOAD"
+            ]
+            self.symbols = SymbolTable()
+            for section in elf.iter_sections():
+                if isinstance(section, SymbolTableSection):
+                    self.symbols.update(
+                        (sym.name, sym["st_value"]) for sym in section.iter_symbols()
+                        if sym.name and sym["st_shndx"] != "SHN_UNDEF"
+                        and sym["st_info"]["type"] in ("STT_FUNC", "STT_NOTYPE", "STT_OBJECT")
+                    )
+            # Keep the file mapped so segments can be handed out as memoryview slices.
+            has_data = os.fstat(f.fileno()).st_size > 0
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if has_data else None
+
+    def segment_data(self, seg: Segment) -> memoryview:
+        """The file-backed bytes of seg, as a view into the mapped file."""
+        if seg.filesz == 0:
+            return memoryview(b"")
+        return memoryview(self._mm)[seg.offset : seg.offset + seg.filesz]
+
+    def load(self, target) -> None:
+        """Copy every PT_LOAD segment into target (a Bus or core_cycle.Memory)."""
+        size = getattr(target, "size", None)
+        for seg in self.segments:
+            if size is not None and seg.vaddr + seg.memsz > size:
+                raise ElfLoadError(
+                    f"Segment at 0x{seg.vaddr:X} (+0x{seg.memsz:X}) "
+                    f"does not fit in {size:#x}-byte memory")
+            if seg.filesz:
+                with self.segment_data(seg) as data:
+                    target.load_blob(seg.vaddr, data)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+def load_elf(path: str, target) -> ElfImage:
+    """Parse path and load it into target; returns the image (entry, symbols)."""
+    image = ElfImage(path)
+    try:
+        image.load(target)
+    finally:
+        image.close()
+    return image
@@ -13,9 +13,10 @@ class FU:
     def can_accept(self, curr_cycle: int) -> bool:
         return curr_cycle >= self.busy_until
 
-    def start(self, inst, curr_cycle: int):
+    def start(self, inst, curr_cycle: int, extra: int = 0):
+        """Occupy the unit for latency (+ extra, e.g. a cache miss) cycles."""
         self.cur_inst = inst
-        self.busy_until = curr_cycle + self.latency
+        self.busy_until = curr_cycle + self.latency + extra
 
     def tick(self, curr_cycle: int):
         if self.cur_inst and curr_cycle >= self.busy_until:
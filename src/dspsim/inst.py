@@ -1,9 +1,13 @@
 # inst.py
-from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Any, Dict, NamedTuple, Optional
 
-@dataclass
-class Inst:
+
+class Inst(NamedTuple):
+    """One decoded instruction.
+
+    Immutable, so the decoder can hand out the PC-independent part of a
+    decode for any number of fetches of the same word (see decoder.decode_fields).
+    """
     raw: int
     pc: int
     op: str
@@ -13,4 +17,4 @@ class Inst:
     imm: Optional[int] = None
     pred: Optional[int] = None
     endpkt: bool = True
-    meta: Dict[str, Any] = None
+    meta: Optional[Dict[str, Any]] = None
@@ -0,0 +1,233 @@
+# src/dspsim/jit.py
+"""Basic-block translating engine.
+
+Straight-line runs of guest code (ending at J, HALT, an instruction the
+translator does not know, or MAX_BLOCK words) are turned into Python
+source once, compile()d and cached by start PC. Registers live in local
+variables for the duration of a block, so a block costs one Python call
+instead of one dispatch per instruction. A block whose J targets its own
+start is emitted as a loop and spins until its instruction budget runs out.
+
+Semantics are those of FunctionalSimulator (see isa.py and
+FunctionalSimulator._bind); anything the translator cannot express falls
+back to the predecoded interpreter one instruction at a time.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .bus import Bus
+from .memory import PAGE_SHIFT
+from .core import FunctionalSimulator, _OPCODES, _imm14
+
+# Longest block translated in one go.
+MAX_BLOCK = 64
+
+_ALU_OPS = {'ADD': '+', 'SUB': '-', 'AND': '&', 'OR': '|'}
+_OTHER_OPS = ('ADDI', 'LD', 'ST', 'J', 'HALT')
+_NO_BUDGET = 1 << 62
+
+
+class JitSimulator(FunctionalSimulator):
+    """FunctionalSimulator that executes whole basic blocks per call."""
+
+    def __init__(self, mem_size: int = 16 * 1024 * 1024, bus: Optional[Bus] = None,
+                 mem_backend: str = "flat"):
+        super().__init__(mem_size=mem_size, bus=bus, mem_backend=mem_backend)
+        # start pc -> (compiled block, instruction count)
+        self._blocks: Dict[int, Tuple[Callable, int]] = {}
+        # start pc -> end of the block's words (exclusive), and page -> starts
+        self._block_ends: Dict[int, int] = {}
+        self._block_pages: Dict[int, Set[int]] = {}
+        # bumped whenever a write lands on translated words, so running
+        # blocks can bail out
+        self._code_gen = 0
+
+    def run(self, entry: int | None = None, max_cycles: int | None = None) -> None:
+        """Run starting from entry (or current pc); same contract as FunctionalSimulator.run.
+
+        With a profile attached this defers to the interpreter, which counts every PC.
+        """
+        if self.profile is not None:
+            return super().run(entry, max_cycles)
+        if entry is not None:
+            self.pc = entry
+        self.running = True
+        executed = 0
+        blocks = self._blocks
+        while self.running:
+            if max_cycles is not None and executed >= max_cycles:
+                raise RuntimeError("Max cycles reached")
+            budget = _NO_BUDGET if max_cycles is None else max_cycles - executed
+            hit = blocks.get(self.pc)
+            if hit is None:
+                hit = self._translate(self.pc)
+            if hit is None or hit[1] > budget:
+                # untranslatable here, or the block would overrun max_cycles
+                self._step()
+                executed += 1
+                continue
+            executed += hit[0](self, budget)
+
+    # -------------------------
+    # Block cache
+    # -------------------------
+    def _invalidate(self, page: int, lo: int, hi: int) -> None:
+        super()._invalidate(page, lo, hi)
+        starts = self._block_pages.get(page)
+        if not starts:
+            return
+        ends = self._block_ends
+        dead = [pc for pc in starts if pc < hi and ends[pc] > lo]
+        if dead:
+            self._code_gen += 1
+            for pc in dead:
+                self._drop_block(pc)
+
+    def _drop_block(self, start: int) -> None:
+        end = self._block_ends.pop(start)
+        self._blocks.pop(start, None)
+        for page in range(start >> PAGE_SHIFT, ((end - 1) >> PAGE_SHIFT) + 1):
+            starts = self._block_pages.get(page)
+            if starts is not None:
+                starts.discard(start)
+                if not starts:
+                    del self._block_pages[page]
+                    if not self._has_code(page):
+                        self.bus.unwatch_code(page)
+
+    def _has_code(self, page: int) -> bool:
+        return super()._has_code(page) or page in self._block_pages
+
+    def flush_icache(self) -> None:
+        super().flush_icache()
+        self._code_gen += 1
+        self._blocks.clear()
+        self._block_ends.clear()
+        self._block_pages.clear()
+
+    def _translate(self, start: int) -> Optional[Tuple[Callable, int]]:
+        """Translate the block at start; None if its first word cannot be translated."""
+        if self.bus._mmio(start) is not None:
+            return None
+        insns = []  # (pc, mnemonic, word)
+        pc = start
+        while len(insns) < MAX_BLOCK:
+            if self.bus._mmio(pc) is not None:
+                break
+            try:
+                word = self.bus.read32(pc)
+            except Exception:
+                break
+            hit = _OPCODES.get((word >> 28) & 0xF)
+            if hit is None or (hit[0] not in _ALU_OPS and hit[0] not in _OTHER_OPS):
+                break
+            insns.append((pc, hit[0], word))
+            pc += 4
+            if hit[0] in ('J', 'HALT'):
+                break
+        if not insns:
+            return None
+
+        fn = _compile_block(start, insns)
+        block = (fn, len(insns))
+        self._blocks[start] = block
+        self._block_ends[start] = pc
+        for page in range(start >> PAGE_SHIFT, ((pc - 1) >> PAGE_SHIFT) + 1):
+            self.bus.watch_code(page << PAGE_SHIFT)
+            self._block_pages.setdefault(page, set()).add(start)
+        return block
+
+
+# -----------------------------------------------------------------------------
+# Code generation
+# -----------------------------------------------------------------------------
+
+
+def _fields(word: int) -> Tuple[int, int, int, int]:
+    """rd, rs1, rs2 and the signed 14-bit immediate, as FunctionalSimulator._bind extracts them."""
+    return (word >> 19) & 0x1F, (word >> 14) & 0x1F, (word >> 9) & 0x1F, _imm14(word)
+
+
+def _compile_block(start: int, insns: List[Tuple[int, str, int]]) -> Callable:
+    """Generate, compile and return the Python function for one block.
+
+    The function takes (sim, budget), runs at least one pass over the block,
+    writes the touched registers back, updates pc/cycle_count and returns
+    the number of instructions retired.
+    """
+    n_insns = len(insns)
+    used, written = set(), set()
+    body: List[str] = []
+    tail: List[str] = []
+    has_store = False
+
+    for k, (pc, mnem, word) in enumerate(insns):
+        rd, rs1, rs2, imm = _fields(word)
+        if mnem in _ALU_OPS:
+            used.update((rs1, rs2)); written.add(rd)
+            body.append(f"r{rd} = (r{rs1} {_ALU_OPS[mnem]} r{rs2}) & 0xFFFFFFFF")
+        elif mnem == 'ADDI':
+            used.add(rs1); written.add(rd)
+            body.append(f"r{rd} = (r{rs1} + {imm}) & 0xFFFFFFFF")
+        elif mnem == 'LD':
+            used.add(rs1); written.add(rd)
+            body.append(f"k = {k}")
+            body.append(f"r{rd} = read32((r{rs1} + {imm}) & 0xFFFFFFFF)")
+        elif mnem == 'ST':
+            # the value register comes from the rd field (see FunctionalSimulator._bind)
+            used.update((rs1, rd))
+            has_store = True
+            body.append(f"k = {k}")
+            body.append(f"write32((r{rs1} + {imm}) & 0xFFFFFFFF, r{rd})")
+            if k + 1 < n_insns:
+                # the store may have rewritten the rest of this block (only
+                # writes to translated words bump _code_gen)
+                body.append("if sim._code_gen != gen:")
+                body.append(f"    n += {k + 1}; pc = {pc + 4}; break")
+        elif mnem == 'J':
+            target = pc + 4 + (imm << 2)
+            tail.append(f"n += {n_insns}")
+            if target == start:
+                cond = "n + %d > budget" % n_insns
+                if has_store:
+                    cond += " or sim._code_gen != gen"
+                tail.append(f"if {cond}:")
+                tail.append(f"    pc = {start}; break")
+            else:
+                tail.append(f"pc = {target}; break")
+        elif mnem == 'HALT':
+            tail.append(f"n += {n_insns}; pc = {pc + 4}")
+            tail.append("sim.running = False; break")
+    if not tail:
+        tail.append(f"n += {n_insns}; pc = {insns[-1][0] + 4}; break")
+
+    mnems = tuple(m for _, m, _ in insns)
+    loads = [f"    r{i} = regs[{i}]" for i in sorted(used | written)]
+    stores = [f"        regs[{i}] = r{i}" for i in sorted(written)]
+    src = [
+        "def block(sim, budget):",
+        "    regs = sim.regs",
+        "    read32 = sim.bus.read32",
+        "    write32 = sim.bus.write32",
+        "    gen = sim._code_gen",
+        *loads,
+        "    n = 0",
+        "    k = 0",
+        "    try:",
+        "        while True:",
+        *("            " + ln for ln in body + tail),
+        "    except Exception as e:",
+        *stores,
+        f"        sim.pc = {start} + 4 * k + 4",
+        "        sim.cycle_count += n + k + 1",
+        f"        raise RuntimeError(f\"Execution error at PC=0x{{{start} + 4 * k:X}} \"",
+        "                           f\"({MNEMS[k]}): {e}\") from e",
+        *(ln[4:] for ln in stores),
+        "    sim.pc = pc",
+        "    sim.cycle_count += n",
+        "    return n",
+    ]
+    namespace = {"MNEMS": mnems}
+    exec(compile("\n".join(src), f"<block 0x{start:X}>", "exec"), namespace)
+    return namespace["block"]
@@ -0,0 +1,129 @@
+# src/dspsim/memory.py
+"""Paged simulator memory with copy-on-write snapshots.
+
+PagedMemory stores memory as 4 KiB pages in a dict, allocated on first
+write. Pages that were never written fall back to an optional read-only
+flat `base` image, or read as zero, so the address space can be far larger
+than what is actually touched (up to the full 4 GiB). snapshot() hands out
+a new PagedMemory that shares every page with its parent. Whichever side
+writes a shared page first copies it, so a snapshot costs one dict copy
+and memory grows only with the pages that are dirtied afterwards.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Dict, Optional, Set
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+
+_u32 = struct.Struct('<I')
+
+# Storage choices for Bus / core_cycle.Memory: one up-front bytearray, or lazy pages.
+MEM_BACKENDS = ("flat", "paged")
+
+
+class PagedMemory:
+    def __init__(self, size: int, base: Optional[bytearray] = None):
+        """
+        Args:
+            size: Size of the address space in bytes.
+            base: Flat image backing pages that have not been written. It is
+                never modified and may be shared by many PagedMemory objects.
+        """
+        self.size = size
+        self.base = base
+        self.pages: Dict[int, bytearray] = {}
+        # Pages this object may modify in place; the rest are shared with a snapshot.
+        self._private: Set[int] = set()
+
+    # -------------------------
+    # Snapshots
+    # -------------------------
+    def snapshot(self) -> PagedMemory:
+        """Return a copy-on-write copy; costs one dict copy, no page data."""
+        child = PagedMemory(self.size, self.base)
+        child.pages = dict(self.pages)
+        self._private.clear()
+        return child
+
+    def dirty_pages(self) -> int:
+        """Number of pages materialized by this object (shared or private)."""
+        return len(self.pages)
+
+    # -------------------------
+    # Page access
+    # -------------------------
+    def _check(self, addr: int, size: int) -> None:
+        if addr < 0 or addr + size > self.size:
+            raise IndexError(f"address 0x{addr:X} (+{size}) outside {self.size:#x}-byte memory")
+
+    def _writable_page(self, n: int) -> bytearray:
+        page = self.pages.get(n)
+        if page is None:
+            start = n << PAGE_SHIFT
+            page = bytearray(PAGE_SIZE)
+            if self.base is not None:
+                chunk = self.base[start : start + PAGE_SIZE]
+                page[: len(chunk)] = chunk
+        elif n in self._private:
+            return page
+        else:
+            page = bytearray(page)
+        self.pages[n] = page
+        self._private.add(n)
+        return page
+
+    # -------------------------
+    # Bus-style interface
+    # -------------------------
+    def read32(self, addr: int) -> int:
+        off = addr & PAGE_MASK
+        if off > PAGE_SIZE - 4:
+            return int.from_bytes(self.read(addr, 4), 'little')
+        self._check(addr, 4)
+        page = self.pages.get(addr >> PAGE_SHIFT)
+        if page is not None:
+            return _u32.unpack_from(page, off)[0]
+        if self.base is not None:
+            return _u32.unpack_from(self.base, addr)[0]
+        return 0
+
+    def write32(self, addr: int, val: int) -> None:
+        off = addr & PAGE_MASK
+        if off > PAGE_SIZE - 4:
+            self.write(addr, (val & 0xFFFFFFFF).to_bytes(4, 'little'))
+            return
+        self._check(addr, 4)
+        _u32.pack_into(self._writable_page(addr >> PAGE_SHIFT), off, val & 0xFFFFFFFF)
+
+    def read(self, addr: int, size: int) -> bytes:
+        self._check(addr, size)
+        out = bytearray()
+        end = addr + size
+        while addr < end:
+            n, off = addr >> PAGE_SHIFT, addr & PAGE_MASK
+            take = min(PAGE_SIZE - off, end - addr)
+            page = self.pages.get(n)
+            if page is not None:
+                out += page[off : off + take]
+            elif self.base is not None:
+                out += self.base[addr : addr + take]
+            else:
+                out += bytes(take)
+            addr += take
+        return bytes(out)
+
+    def write(self, addr: int, data: bytes) -> None:
+        self._check(addr, len(data))
+        view = memoryview(data)
+        pos = 0
+        while pos < len(view):
+            n, off = (addr + pos) >> PAGE_SHIFT, (addr + pos) & PAGE_MASK
+            take = min(PAGE_SIZE - off, len(view) - pos)
+            self._writable_page(n)[off : off + take] = view[pos : pos + take]
+            pos += take
+
+    def load_blob(self, addr: int, data: bytes) -> None:
+        self.write(addr, data)
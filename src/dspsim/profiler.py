@@ -0,0 +1,98 @@
+# src/dspsim/profiler.py
+"""Guest-level flat profiler for the functional engine.
+
+A Profile preallocates one counter per instruction word of a code range.
+The counters are a plain list, because incrementing a list slot is cheaper
+than incrementing an array('Q') slot. FunctionalSimulator.run bumps the
+counter of every instruction it retires while sim.profile is set. PCs
+outside the range land in a small dict instead. The per-opcode histogram
+is settled from those counts whenever a PC is (re)decoded and once more
+after the run, so the hot loop does exactly one increment per instruction.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .isa import INSTRUCTION_SET
+from .symbols import SymbolTable
+
+# major opcode -> mnemonic for the histogram; first INSTRUCTION_SET entry wins, as in core
+_MAJ_NAMES: Dict[int, str] = {}
+for _mnem, (_fn, _argtypes, _maj) in INSTRUCTION_SET.items():
+    _MAJ_NAMES.setdefault(_maj, _mnem)
+_MAJ_OF: Dict[str, int] = {name: maj for maj, name in _MAJ_NAMES.items()}
+
+
+class Profile:
+    def __init__(self, lo: int, hi: int):
+        """Count instructions in [lo, hi) (the loaded program) with preallocated counters."""
+        self.lo = lo
+        self.hi = hi
+        self.counts: List[int] = [0] * max(0, (hi - lo + 3) // 4)
+        self.outside: Dict[int, int] = {}
+        self.opcodes = array('Q', bytes(8 * 16))
+        # pc -> (major opcode decoded there, its count when that was recorded)
+        self._decoded: Dict[int, Tuple[int, int]] = {}
+
+    def _count(self, pc: int) -> int:
+        if self.lo <= pc < self.hi:
+            return self.counts[(pc - self.lo) >> 2]
+        return self.outside.get(pc, 0)
+
+    def decoded(self, pc: int, mnem: str) -> None:
+        """Note that pc now holds mnem; retirements counted so far keep the previous opcode."""
+        maj = _MAJ_OF.get(mnem)
+        if maj is None:
+            return  # a breakpoint, not a guest instruction
+        n = self._count(pc)
+        prev = self._decoded.get(pc)
+        if prev is not None:
+            self.opcodes[prev[0]] += n - prev[1]
+        self._decoded[pc] = (maj, n)
+
+    def pc_counts(self) -> Iterator[Tuple[int, int]]:
+        """(pc, count) for every PC that retired at least once."""
+        lo = self.lo
+        for i, n in enumerate(self.counts):
+            if n:
+                yield lo + 4 * i, n
+        yield from self.outside.items()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts) + sum(self.outside.values())
+
+    def finish(self) -> None:
+        """Add the retirements since each PC was last decoded to the opcode histogram."""
+        for pc, (maj, _) in list(self._decoded.items()):
+            self.decoded(pc, _MAJ_NAMES[maj])
+
+    def by_symbol(self, symbols: Optional[SymbolTable]) -> List[Tuple[str, int]]:
+        """Instruction counts aggregated by the closest preceding symbol, busiest first."""
+        agg: Dict[str, int] = {}
+        for pc, n in self.pc_counts():
+            hit = symbols.lookup(pc) if symbols is not None else None
+            name = hit[0] if hit else "<no label>"
+            agg[name] = agg.get(name, 0) + n
+        return sorted(agg.items(), key=lambda kv: -kv[1])
+
+    def report(self, symbols: Optional[SymbolTable] = None, top: int = 10) -> str:
+        """Flat profile by label, opcode histogram and the hottest PCs, as text."""
+        total = self.total or 1
+        lines = [f"Flat profile: {self.total} instructions", "",
+                 f"{'%':>6} {'cum%':>6} {'insns':>12}  label"]
+        cum = 0
+        for name, n in self.by_symbol(symbols):
+            cum += n
+            lines.append(f"{100 * n / total:6.2f} {100 * cum / total:6.2f} {n:12d}  {name}")
+        lines += ["", f"{'%':>6} {'insns':>12}  opcode"]
+        for maj in sorted(range(16), key=lambda m: -self.opcodes[m]):
+            n = self.opcodes[maj]
+            if n:
+                lines.append(f"{100 * n / total:6.2f} {n:12d}  {_MAJ_NAMES.get(maj, f'op{maj:X}')}")
+        lines += ["", f"{'%':>6} {'insns':>12}  pc (top {top})"]
+        for pc, n in sorted(self.pc_counts(), key=lambda kv: -kv[1])[:top]:
+            where = symbols.symbolize(pc) if symbols is not None else ""
+            lines.append(f"{100 * n / total:6.2f} {n:12d}  0x{pc:08X} {where}".rstrip())
+        return "\n".join(lines)
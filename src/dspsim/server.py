@@ -0,0 +1,681 @@
+# src/dspsim/server.py
+"""`dspsim serve`: a JSON-RPC 2.0 job server for scripted use.
+
+Clients connect over a Unix socket or localhost TCP and send one JSON
+object per line. Responses, and notifications for streamed output, come
+back one per line. Jobs run in a pool of worker processes that stay up
+between jobs. Each worker builds its simulators once and resets them
+from a pristine snapshot for every job, a copy-on-write restore, so a job
+pays neither interpreter startup nor a fresh 16 MiB memory.
+
+Methods:
+    assemble  {"source"}                         -> {"words", "labels"}
+    run       {"source" | "words", "base", "entry", "engine", "max_cycles",
+               "regs", "mem", "dump"}            -> run result (see below)
+    trace     run params + {"filter", "batch"}   -> run result + {"records"}
+              The cycle engine is always used. Records stream as "trace"
+              notifications, {"id": <request id>, "records": [...]}, in
+              batches of `batch`, before the response.
+    cancel    {"id": <request id>}               -> {"cancelled": bool}
+              A running job stops at its next slice and answers normally
+              with stop "cancelled"; a queued one gets error -32800.
+    status    {}                                 -> pool and queue counters
+
+"regs", "mem" and "dump" take the same forms as sweep cases, and "entry"
+may be a label. A run result has engine, stop ("halt", "max_cycles",
+"cancelled" or "error"), error, pc, cycles, instructions, regs and dump;
+cycle runs also report stalls. Every job gets a cycle budget: its own max_cycles,
+capped by the server's. A worker runs a job in slices of SLICE cycles and
+checks for cancellation between slices. Responses to concurrent jobs
+arrive in completion order and are matched to requests by id. Closing the
+connection cancels that connection's jobs.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from . import __version__
+from .assembler import AsmError, assemble_with_labels
+from .core import FunctionalSimulator
+from .core_cycle import Core, Memory
+from .jit import JitSimulator
+from .sweep import _initial_regs, _int, _preloads
+from .trace import TraceFilter, TraceSink
+
+log = logging.getLogger("dspsim.server")
+
+ENGINES = ("fast", "jit", "cycle")
+METHODS = ("assemble", "run", "trace", "cancel", "status")
+DEFAULT_MAX_CYCLES = 100_000_000
+SLICE = 50_000        # cycles run between cancellation checks
+TRACE_BATCH = 256     # trace records per notification
+LINE_LIMIT = 64 << 20  # longest request line accepted (sources travel inline)
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+JOB_FAILED = -32000
+CANCELLED = -32800
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+# -------------------------
+# Worker process
+# -------------------------
+class _Warm:
+    """One worker's simulators, built once and restored to a pristine state per job."""
+
+    def __init__(self, mem_size: int):
+        self.sims = {"fast": FunctionalSimulator(mem_size), "jit": JitSimulator(mem_size)}
+        self.sim_snaps = {name: sim.snapshot() for name, sim in self.sims.items()}
+        self.core = Core(Memory(mem_size))
+        self.core_snap = self.core.snapshot()
+
+    def sim(self, engine: str) -> FunctionalSimulator:
+        sim = self.sims[engine]
+        sim.restore(self.sim_snaps[engine])
+        return sim
+
+    def cycle_core(self) -> Core:
+        self.core.restore(self.core_snap)
+        self.core.trace = None
+        return self.core
+
+
+@functools.lru_cache(maxsize=64)
+def _assemble(source: str) -> Tuple[List[int], Dict[str, int]]:
+    return assemble_with_labels(source.splitlines())
+
+
+class _StreamSink(TraceSink):
+    """TraceSink whose JSON lines are batched into messages instead of a file."""
+
+    def __init__(self, send: Callable[[str], None], batch: int, filter: Optional[TraceFilter]):
+        super().__init__(filter=filter)
+        self.fp = self  # TraceSink.emit_inst writes each record here
+        self.records = 0
+        self._send = send
+        self._batch = batch
+        self._lines: List[str] = []
+
+    def write(self, line: str) -> None:
+        self._lines.append(line.rstrip("\n"))
+        self.records += 1
+        if len(self._lines) >= self._batch:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._lines:
+            self._send("[" + ",".join(self._lines) + "]")
+            self._lines = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+class _Job:
+    """What a handler in the worker sees of its job."""
+
+    def __init__(self, no: int, params: Dict[str, Any], conn, cancel):
+        self.no = no
+        self.params = params
+        self._conn = conn
+        self._cancel = cancel
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.value == self.no
+
+    def stream(self, kind: str, payload: str) -> None:
+        self._conn.send(("stream", self.no, kind, payload))
+
+
+def _program(params: Dict[str, Any]) -> Tuple[bytes, Dict[str, int]]:
+    if "source" in params:
+        words, labels = _assemble(params["source"])
+    elif "words" in params:
+        words, labels = [_int(w) for w in params["words"]], {}
+    else:
+        raise ValueError("need 'source' or 'words'")
+    return b"".join((w & 0xFFFFFFFF).to_bytes(4, "little") for w in words), labels
+
+
+def _setup(params: Dict[str, Any]):
+    image, labels = _program(params)
+    base = _int(params.get("base", 0x1000))
+    entry = params.get("entry")
+    if entry is None:
+        entry = base
+    elif isinstance(entry, str) and entry in labels:
+        entry = base + labels[entry]
+    else:
+        entry = _int(entry)
+    # the sweep helpers assume these shapes; check them here so a bad job is INVALID_PARAMS
+    for key, types, what in (("regs", (list, dict), "a list or an object"),
+                             ("mem", list, "a list"), ("dump", list, "a list")):
+        if not isinstance(params.get(key, []), types):
+            raise TypeError(f"'{key}' must be {what}")
+    regs = _initial_regs(params.get("regs"))
+    if any(not 0 <= i < 32 for i in regs):
+        raise ValueError("register numbers must be 0..31")
+    return image, base, entry, regs, _preloads(params.get("mem"))
+
+
+def _dump(params: Dict[str, Any], read32) -> Dict[str, List[int]]:
+    return {hex(addr): [read32(addr + 4 * i) for i in range(_int(n))]
+            for addr, n in ((_int(a), n) for a, n in params.get("dump", ()))}
+
+
+def _run_functional(warm: _Warm, job: _Job, engine: str) -> Dict[str, Any]:
+    image, base, entry, regs, preloads = _setup(job.params)
+    budget = job.params.get("max_cycles")
+    sim = warm.sim(engine)
+    sim.bus.load_blob(base, image)
+    for addr, data in preloads:
+        sim.bus.load_blob(addr, data)
+    for i, v in regs.items():
+        sim.regs[i] = v & 0xFFFFFFFF
+    sim.pc = entry
+    result: Dict[str, Any] = {"engine": engine, "stop": "halt", "error": None}
+    while True:
+        step = SLICE if budget is None else min(SLICE, budget - sim.cycle_count)
+        if step <= 0:
+            result.update(stop="max_cycles", error="Max cycles reached")
+            break
+        try:
+            sim.run(max_cycles=step)
+            break
+        except RuntimeError as e:
+            if "Max cycles" not in str(e):
+                result.update(stop="error", error=str(e))
+                break
+        if job.cancelled:
+            result["stop"] = "cancelled"
+            break
+    result.update(pc=sim.pc, cycles=sim.cycle_count, instructions=sim.cycle_count,
+                  regs=list(sim.regs), dump=_dump(job.params, sim.bus.read32))
+    return result
+
+
+def _run_cycle(warm: _Warm, job: _Job, sink: Optional[_StreamSink] = None) -> Dict[str, Any]:
+    image, base, entry, regs, preloads = _setup(job.params)
+    budget = job.params.get("max_cycles")
+    core = warm.cycle_core()
+    core.mem.load_blob(base, image)
+    for addr, data in preloads:
+        core.mem.load_blob(addr, data)
+    for i, v in regs.items():
+        core.regs.write(i, v)
+    core.pc = entry
+    core.trace = sink
+    result: Dict[str, Any] = {"engine": "cycle", "stop": "halt", "error": None}
+    stalls: Dict[str, int] = {}
+    instructions = 0
+    while True:
+        step = SLICE if budget is None else min(SLICE, budget - core.cycle)
+        if step <= 0:
+            result.update(stop="max_cycles", error="Max cycles reached")
+            break
+        stats = core.run(max_cycles=step)
+        instructions += stats.instructions
+        for cause, n in stats.stalls.items():
+            stalls[cause] = stalls.get(cause, 0) + n
+        if stats.stop == "halt":
+            break
+        if job.cancelled:
+            result["stop"] = "cancelled"
+            break
+    core.trace = None
+    if sink is not None:
+        sink.close()
+        result["records"] = sink.records
+    result.update(pc=core.pc, cycles=core.cycle, instructions=instructions,
+                  regs=list(core.regs.R), dump=_dump(job.params, core.mem.load32), stalls=stalls)
+    return result
+
+
+def _do_assemble(warm: _Warm, job: _Job) -> Dict[str, Any]:
+    words, labels = _assemble(job.params["source"])
+    return {"words": list(words), "labels": dict(labels)}
+
+
+def _do_run(warm: _Warm, job: _Job) -> Dict[str, Any]:
+    engine = job.params.get("engine", "fast")
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine '{engine}' (expected one of {ENGINES})")
+    if engine == "cycle":
+        return _run_cycle(warm, job)
+    return _run_functional(warm, job, engine)
+
+
+def _do_trace(warm: _Warm, job: _Job) -> Dict[str, Any]:
+    spec = job.params.get("filter")
+    filt = TraceFilter(**spec) if spec else None
+    batch = _int(job.params.get("batch", TRACE_BATCH))
+    if batch < 1:
+        raise ValueError("batch must be >= 1")
+    sink = _StreamSink(lambda payload: job.stream("trace", payload), batch, filt)
+    return _run_cycle(warm, job, sink)
+
+
+_HANDLERS = {"assemble": _do_assemble, "run": _do_run, "trace": _do_trace}
+
+
+def _worker_main(conn, cancel, mem_size: int) -> None:
+    """Worker loop: (job no, method, params) in; "stream" and "done" messages out."""
+    warm = _Warm(mem_size)
+    conn.send(("ready",))
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if msg is None:
+            return
+        no, method, params = msg
+        job = _Job(no, params, conn, cancel)
+        try:
+            conn.send(("done", no, _HANDLERS[method](warm, job), None))
+        except AsmError as e:
+            conn.send(("done", no, None, (JOB_FAILED, f"Assembly failed: {e}")))
+        except (KeyError, TypeError, ValueError) as e:
+            conn.send(("done", no, None, (INVALID_PARAMS, f"Invalid params: {e}")))
+        except Exception as e:
+            conn.send(("done", no, None, (JOB_FAILED, f"{type(e).__name__}: {e}")))
+
+
+# -------------------------
+# Server side
+# -------------------------
+class _Connection:
+    """One client: serialized writes and the jobs it still has open."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.jobs: Dict[Any, _PendingJob] = {}
+        self._lock = asyncio.Lock()
+
+    async def send(self, line: str) -> None:
+        async with self._lock:
+            if self.writer.is_closing():
+                return
+            self.writer.write(line.encode() + b"\n")
+            try:
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+
+    async def reply(self, req_id, result=None, error: Optional[Tuple[int, str]] = None) -> None:
+        msg: Dict[str, Any] = {"jsonrpc": "2.0", "id": req_id}
+        if error is None:
+            msg["result"] = result
+        else:
+            msg["error"] = {"code": error[0], "message": error[1]}
+        await self.send(json.dumps(msg))
+
+
+class _PendingJob:
+    def __init__(self, no: int, req_id, method: str, params: Dict[str, Any], conn: _Connection):
+        self.no = no
+        self.req_id = req_id
+        self.method = method
+        self.params = params
+        self.conn = conn
+        self.worker: Optional[_Worker] = None
+        self.cancelled = False
+
+
+class _Worker:
+    def __init__(self, ctx, mem_size: int):
+        self.cancel = ctx.Value("q", -1, lock=False)
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, self.cancel, mem_size),
+                                name="dspsim-serve-worker", daemon=True)
+        self.proc.start()
+        child.close()
+        # one thread per worker carries the blocking pipe calls
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dspsim-serve-io")
+        self.job: Optional[_PendingJob] = None
+
+    async def call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io, fn, *args)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.job is not None:
+            self.cancel.value = self.job.no
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join()
+        self.conn.close()
+        self.io.shutdown(wait=False)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Unlink path if it is a socket; refuse to touch any other kind of file."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    os.unlink(path)
+
+
+class Server:
+    def __init__(self, workers: Optional[int] = None,
+                 max_cycles: Optional[int] = DEFAULT_MAX_CYCLES,
+                 mem_size: int = 16 * 1024 * 1024):
+        """
+        Args:
+            workers: Worker processes (default: the CPU count).
+            max_cycles: Cap on every job's cycle budget, and the budget of jobs
+                that do not set one; None for no cap.
+            mem_size: Simulated memory per simulator.
+        """
+        self.n_workers = workers or os.cpu_count() or 1
+        self.max_cycles = max_cycles
+        self.mem_size = mem_size
+        self.address: Optional[str] = None
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._tasks: List[asyncio.Task] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._job_nos = itertools.count()
+        self._closing = False
+        self._conns: Set[_Connection] = set()
+        self._socket: Optional[Tuple[str, int, int]] = None  # path, st_dev, st_ino we bound
+
+    async def start(self, path: Optional[str] = None, host: str = "127.0.0.1",
+                    port: int = 0) -> str:
+        """Spawn the workers, wait until they are warm and listen; returns the address.
+
+        An existing socket at path (left by an earlier server) is replaced;
+        any other file there raises FileExistsError.
+        """
+        if path is not None:
+            _remove_stale_socket(path)
+        self._queue = asyncio.Queue()
+        self._workers = [_Worker(self._ctx, self.mem_size) for _ in range(self.n_workers)]
+        for w in self._workers:
+            ready = await w.call(w.conn.recv)
+            if ready != ("ready",):
+                raise RuntimeError(f"worker failed to start: {ready!r}")
+        self._tasks = [asyncio.ensure_future(self._drive(i)) for i in range(self.n_workers)]
+        if path is not None:
+            _remove_stale_socket(path)  # again: one may have appeared while workers started
+            self._server = await asyncio.start_unix_server(self._handle, path, limit=LINE_LIMIT)
+            st = os.stat(path)
+            self._socket = (path, st.st_dev, st.st_ino)
+            self.address = f"unix:{path}"
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+            host, port = self._server.sockets[0].getsockname()[:2]
+            self.address = f"tcp:{host}:{port}"
+        log.info("serving on %s with %d workers", self.address, self.n_workers)
+        return self.address
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for conn in list(self._conns):
+            conn.writer.close()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, w.stop) for w in self._workers))
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._socket is not None:
+            # only remove the socket we bound, not whatever replaced it since
+            path, dev, ino = self._socket
+            self._socket = None
+            try:
+                st = os.stat(path)
+                if (st.st_dev, st.st_ino) == (dev, ino):
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    # -------------------------
+    # Clients
+    # -------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = _Connection(writer)
+        self._conns.add(conn)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # over LINE_LIMIT, or reset
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await self._request(conn, line)
+        finally:
+            self._conns.discard(conn)
+            for job in list(conn.jobs.values()):
+                self._cancel(job)
+            writer.close()
+
+    async def _request(self, conn: _Connection, line: bytes) -> None:
+        try:
+            msg = json.loads(line)
+        except ValueError as e:
+            await conn.reply(None, error=(PARSE_ERROR, f"Parse error: {e}"))
+            return
+        if not isinstance(msg, dict) or not isinstance(msg.get("method"), str):
+            await conn.reply(msg.get("id") if isinstance(msg, dict) else None,
+                             error=(INVALID_REQUEST, "Invalid request"))
+            return
+        req_id, method = msg.get("id"), msg["method"]
+        params = msg.get("params") or {}
+        if method not in METHODS:
+            await conn.reply(req_id, error=(METHOD_NOT_FOUND, f"Method not found: {method}"))
+            return
+        if not isinstance(params, dict):
+            await conn.reply(req_id, error=(INVALID_PARAMS, "params must be an object"))
+            return
+        if method == "cancel":
+            job = conn.jobs.get(params.get("id"))
+            if job is not None:
+                self._cancel(job)
+            await conn.reply(req_id, {"cancelled": job is not None})
+            return
+        if method == "status":
+            await conn.reply(req_id, self.status())
+            return
+        if req_id in conn.jobs:
+            await conn.reply(req_id, error=(INVALID_REQUEST,
+                                            f"Request id {req_id!r} is already running"))
+            return
+        if method in ("run", "trace"):
+            try:
+                params = dict(params, max_cycles=self._budget(params.get("max_cycles")))
+            except (TypeError, ValueError) as e:
+                await conn.reply(req_id, error=(INVALID_PARAMS, f"Invalid params: {e}"))
+                return
+        job = _PendingJob(next(self._job_nos), req_id, method, params, conn)
+        conn.jobs[req_id] = job
+        self._queue.put_nowait(job)
+
+    def _budget(self, requested) -> Optional[int]:
+        if requested is None:
+            return self.max_cycles
+        budget = _int(requested)
+        if budget < 0:
+            raise ValueError("max_cycles must be >= 0")
+        return budget if self.max_cycles is None else min(budget, self.max_cycles)
+
+    def _cancel(self, job: _PendingJob) -> None:
+        job.cancelled = True
+        if job.worker is not None:
+            job.worker.cancel.value = job.no  # the worker stops at its next slice
+
+    def status(self) -> Dict[str, Any]:
+        return {"version": __version__, "workers": self.n_workers,
+                "busy": sum(w.job is not None for w in self._workers),
+                "queued": self._queue.qsize(), "max_cycles": self.max_cycles}
+
+    # -------------------------
+    # Workers
+    # -------------------------
+    async def _drive(self, index: int) -> None:
+        """Feed jobs to worker `index` and relay its messages, one job at a time."""
+        while True:
+            job = await self._queue.get()
+            conn = job.conn
+            if job.cancelled:
+                conn.jobs.pop(job.req_id, None)
+                await conn.reply(job.req_id, error=(CANCELLED, "Request cancelled"))
+                continue
+            w = self._workers[index]
+            w.job, job.worker = job, w
+            try:
+                await w.call(w.conn.send, (job.no, job.method, job.params))
+                while True:
+                    msg = await w.call(w.conn.recv)
+                    if msg[0] == "stream":
+                        _, _, kind, payload = msg
+                        await conn.send('{"jsonrpc":"2.0","method":"%s",'
+                                        '"params":{"id":%s,"records":%s}}'
+                                        % (kind, json.dumps(job.req_id), payload))
+                        continue
+                    _, _, result, error = msg
+                    await conn.reply(job.req_id, result, error)
+                    break
+            except (EOFError, OSError) as e:
+                if self._closing:
+                    return
+                log.warning("worker %d died running job %d: %s; restarting it", index, job.no, e)
+                await conn.reply(job.req_id, error=(JOB_FAILED, "Worker process died"))
+                w.stop(timeout=0)
+                w = self._workers[index] = _Worker(self._ctx, self.mem_size)
+                await w.call(w.conn.recv)
+            finally:
+                w.job = None
+                conn.jobs.pop(job.req_id, None)
+
+
+def serve(path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0,
+          on_ready: Optional[Callable[[str], None]] = None, **kwargs) -> None:
+    """Run a Server until interrupted (the `dspsim serve` entry point)."""
+    async def main():
+        server = Server(**kwargs)
+        address = await server.start(path, host, port)
+        if on_ready is not None:
+            on_ready(address)
+        forever = asyncio.ensure_future(server.serve_forever())
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, forever.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass  # no signal handlers on this platform/loop
+        try:
+            await forever
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+# -------------------------
+# Blocking client
+# -------------------------
+class Client:
+    """Minimal synchronous client, e.g. for notebooks.
+
+    Example: Client("unix:/tmp/dspsim.sock").call("run", {"source": "HALT"})
+    """
+
+    def __init__(self, address: str, timeout: Optional[float] = None):
+        kind, _, rest = address.partition(":")
+        if kind == "unix":
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(rest)
+        elif kind == "tcp":
+            host, _, port = rest.rpartition(":")
+            self._sock = socket.create_connection((host, int(port)), timeout)
+        else:
+            raise ValueError(f"bad server address '{address}' "
+                             "(expected unix:PATH or tcp:HOST:PORT)")
+        self._file = self._sock.makefile("rwb")
+        self._ids = itertools.count(1)
+
+    def send(self, method: str, params: Optional[Dict[str, Any]] = None, req_id=None):
+        """Send a request without waiting; returns its id."""
+        req_id = next(self._ids) if req_id is None else req_id
+        self._file.write(json.dumps({"jsonrpc": "2.0", "id": req_id, "method": method,
+                                     "params": params or {}}).encode() + b"\n")
+        self._file.flush()
+        return req_id
+
+    def receive(self) -> Dict[str, Any]:
+        """The next response or notification."""
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None,
+             on_notify: Optional[Callable[[Dict[str, Any]], None]] = None) -> Any:
+        """Send a request and wait for its result; raises RpcError on an error response.
+
+        Notifications for it are passed to on_notify as they arrive.
+        """
+        req_id = self.send(method, params)
+        while True:
+            msg = self.receive()
+            if "method" in msg:
+                if on_notify is not None and msg["params"].get("id") == req_id:
+                    on_notify(msg)
+                continue
+            if msg.get("id") != req_id:
+                continue
+            if "error" in msg:
+                raise RpcError(msg["error"]["code"], msg["error"]["message"])
+            return msg["result"]
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> Client:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,323 @@
+# src/dspsim/simpoint.py
+"""Sampled timing: basic-block vectors, k-means phases and CPI extrapolation.
+
+The program runs in three steps, in the style of SimPoint:
+
+1. collect_bbvs() runs it on FunctionalSimulator and splits execution into
+   intervals of N instructions. Each interval gets a basic-block vector,
+   i.e. the instructions executed in each dynamic basic block (a block
+   starts wherever a jump lands).
+2. choose_points() normalizes the vectors and projects them to a few
+   random dimensions. It then clusters them with k-means, choosing k by BIC.
+   Each cluster is a program phase. The interval nearest its centroid
+   represents it, and optional extra members (chosen at random) are kept
+   for the error estimate.
+3. estimate() replays the program functionally and snapshots it at each
+   chosen interval (less the warmup). It runs the interval on the cycle
+   Core from that checkpoint and weights the measured CPIs by phase size.
+
+Phases are treated as strata. With two or more samples per phase, the
+stratified-sampling variance gives a 95% confidence half-width for the
+CPI. With one sample per phase (classic SimPoint) no error estimate is
+available.
+
+Requires numpy (pip install dspsim[simpoint]).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, TextIO
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover - optional dependency
+    raise ImportError("dspsim.simpoint requires numpy (pip install 'dspsim[simpoint]')") from e
+
+from .core import FunctionalSimulator
+from .core_cycle import Core
+
+
+@dataclass
+class BBVProfile:
+    """Per-interval basic-block vectors from collect_bbvs()."""
+    interval: int                                   # instructions per interval
+    vectors: List[Dict[int, int]] = field(default_factory=list)  # block start PC -> instructions
+    lengths: List[int] = field(default_factory=list)  # instructions each, last may be short
+    halted: bool = False                            # program reached HALT (vs. max_instructions)
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.lengths)
+
+    def matrix(self):
+        """(intervals, blocks) array of instruction counts and the block PC of each column."""
+        blocks = sorted({pc for v in self.vectors for pc in v})
+        col = {pc: i for i, pc in enumerate(blocks)}
+        m = np.zeros((len(self.vectors), len(blocks)))
+        for row, v in enumerate(self.vectors):
+            for pc, n in v.items():
+                m[row, col[pc]] = n
+        return m, blocks
+
+    def write_bb(self, out: TextIO) -> None:
+        """Write the vectors in SimPoint's .bb text format (1-based block ids)."""
+        _, blocks = self.matrix()
+        ids = {pc: i + 1 for i, pc in enumerate(blocks)}
+        for v in self.vectors:
+            out.write("T" + "".join(f":{ids[pc]}:{n} " for pc, n in sorted(v.items())) + "\n")
+
+
+@dataclass
+class SimPoint:
+    """One interval chosen for detailed simulation."""
+    interval: int               # interval index
+    cluster: int
+    representative: bool        # nearest to its centroid (vs. an extra random sample)
+    cycles: int = 0             # measured on the cycle Core
+    instructions: int = 0
+
+    @property
+    def cpi(self) -> float:
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+
+@dataclass
+class Estimate:
+    """Whole-program timing extrapolated from the simulated points."""
+    instructions: int           # total, from the functional run
+    cpi: float
+    cpi_error: Optional[float]  # 95% confidence half-width; None with one sample per phase
+    k: int                      # phases found
+    weights: List[float]        # fraction of all instructions in each phase
+    points: List[SimPoint]
+
+    @property
+    def cycles(self) -> int:
+        return round(self.cpi * self.instructions)
+
+    @property
+    def detailed_instructions(self) -> int:
+        return sum(p.instructions for p in self.points)
+
+
+# -------------------------
+# Collection
+# -------------------------
+def collect_bbvs(sim: FunctionalSimulator, interval: int,
+                 max_instructions: Optional[int] = None) -> BBVProfile:
+    """Run sim from its PC to HALT (or max_instructions), recording one BBV per interval.
+
+    A block's instructions are added to its vector when the block ends, so
+    the loop itself only compares the PC with the fall-through address. It
+    is a separate loop, like FunctionalSimulator._run_profiled, and syncs
+    cycle_count on exit.
+    """
+    if interval < 1:
+        raise ValueError("interval must be at least 1")
+    prof = BBVProfile(interval)
+    limit = -1 if max_instructions is None else max_instructions
+    icache, fill = sim._icache, sim._fill
+    bbv: Dict[int, int] = {}
+    executed = total = 0          # in this interval / in earlier intervals
+    block_pc = expected = sim.pc
+    block_start = 0
+    start_cycles = sim.cycle_count
+    sim.running = True
+    try:
+        while sim.running:
+            if executed == interval or total + executed == limit:
+                bbv[block_pc] = bbv.get(block_pc, 0) + executed - block_start
+                prof.vectors.append(bbv)
+                prof.lengths.append(executed)
+                total += executed
+                bbv, executed, block_start = {}, 0, 0
+                if total == limit:
+                    return prof
+            pc = sim.pc
+            if pc != expected:
+                # a taken jump ended the block that started at block_pc
+                bbv[block_pc] = bbv.get(block_pc, 0) + executed - block_start
+                block_pc, block_start = pc, executed
+            hit = icache.get(pc)
+            if hit is None:
+                sim.cycle_count = start_cycles + total + executed
+                hit = fill(pc)
+
+            sim.pc = expected = pc + 4
+            executed += 1
+
+            op, mnem = hit
+            try:
+                op()
+            except Exception as e:
+                raise RuntimeError(f"Execution error at PC=0x{pc:X} ({mnem}): {e}") from e
+        prof.halted = True
+        if executed:
+            bbv[block_pc] = bbv.get(block_pc, 0) + executed - block_start
+            prof.vectors.append(bbv)
+            prof.lengths.append(executed)
+        return prof
+    finally:
+        sim.cycle_count = max(sim.cycle_count, start_cycles + sum(prof.lengths))
+
+
+# -------------------------
+# Clustering
+# -------------------------
+def project(profile: BBVProfile, dims: int = 15, seed: int = 0):
+    """Row-normalized BBVs projected onto dims random directions, (intervals, dims)."""
+    m, _ = profile.matrix()
+    m /= np.maximum(m.sum(axis=1, keepdims=True), 1)
+    rng = np.random.default_rng(seed)
+    return m @ rng.uniform(-1.0, 1.0, size=(m.shape[1], dims))
+
+
+def kmeans(x, k: int, rng, iters: int = 100):
+    """Lloyd's k-means with k-means++ seeding; returns (labels, centers, inertia)."""
+    n = len(x)
+    centers = [x[rng.integers(n)]]
+    d2 = ((x - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = d2.sum()
+        i = rng.choice(n, p=d2 / total) if total > 0 else rng.integers(n)
+        centers.append(x[i])
+        d2 = np.minimum(d2, ((x - x[i]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+    labels = None
+    for _ in range(iters):
+        dist = ((x[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new = dist.argmin(axis=1)
+        if labels is not None and (new == labels).all():
+            break
+        labels = new
+        for c in range(k):
+            members = x[labels == c]
+            if len(members):
+                centers[c] = members.mean(axis=0)
+    inertia = float(((x - centers[labels]) ** 2).sum())
+    return labels, centers, inertia
+
+
+def bic(x, labels, centers, inertia: float) -> float:
+    """Bayesian information criterion of a spherical-Gaussian clustering (as in X-means)."""
+    n, d = x.shape
+    k = len(centers)
+    variance = max(inertia / max(d * (n - k), 1), 1e-12)
+    sizes = np.bincount(labels, minlength=k)
+    sizes = sizes[sizes > 0]
+    loglik = float((sizes * np.log(sizes / n)).sum()
+                   - n * d / 2 * np.log(2 * np.pi * variance) - d * (n - k) / 2)
+    params = k * (d + 1)
+    return loglik - params / 2 * np.log(n)
+
+
+def choose_points(profile: BBVProfile, max_k: int = 10, dims: int = 15, samples: int = 1,
+                  seed: int = 0, bic_threshold: float = 0.9):
+    """Cluster the intervals and pick the ones to simulate.
+
+    Tries k = 1..max_k and keeps the smallest k whose BIC reaches
+    bic_threshold of the way from the worst score to the best (SimPoint's
+    rule). Returns (points, weights, sizes): `samples` points per phase, the
+    first being the interval nearest the centroid; weights[c] is the fraction
+    of all instructions spent in phase c and sizes[c] its number of intervals.
+    """
+    if not profile.vectors:
+        raise ValueError("no intervals to cluster")
+    x = project(profile, dims, seed)
+    rng = np.random.default_rng(seed)
+    fits = []
+    for k in range(1, min(max_k, len(x)) + 1):
+        labels, centers, inertia = kmeans(x, k, rng)
+        fits.append((bic(x, labels, centers, inertia), labels, centers))
+    scores = [f[0] for f in fits]
+    lo, hi = min(scores), max(scores)
+    _, labels, centers = next(f for f in fits if f[0] >= lo + bic_threshold * (hi - lo))
+
+    lengths = np.asarray(profile.lengths, dtype=float)
+    points: List[SimPoint] = []
+    weights: List[float] = []
+    sizes: List[int] = []
+    for c in range(len(centers)):
+        members = np.flatnonzero(labels == c)
+        if not len(members):
+            continue
+        cluster = len(weights)
+        weights.append(float(lengths[members].sum() / lengths.sum()))
+        sizes.append(len(members))
+        nearest = members[((x[members] - centers[c]) ** 2).sum(axis=1).argmin()]
+        points.append(SimPoint(int(nearest), cluster, True))
+        others = members[members != nearest]
+        extra = rng.choice(others, size=min(samples - 1, len(others)), replace=False)
+        points.extend(SimPoint(int(i), cluster, False) for i in sorted(extra))
+    return points, weights, sizes
+
+
+# -------------------------
+# Detailed simulation
+# -------------------------
+def _advance(sim: FunctionalSimulator, n: int) -> None:
+    """Execute exactly n more instructions (fewer if the program halts)."""
+    if n <= 0:
+        return
+    try:
+        sim.run(max_cycles=n)
+    except RuntimeError as e:
+        if "Max cycles" not in str(e):
+            raise
+
+
+def simulate_points(make_sim: Callable[[], FunctionalSimulator], profile: BBVProfile,
+                    points: List[SimPoint], warmup: int = 0) -> None:
+    """Measure each point on the cycle Core, filling in its cycles and instructions.
+
+    One functional replay from make_sim() visits the intervals in order. At
+    each one it forks a checkpoint `warmup` instructions early (sharing
+    memory copy-on-write). The Core runs from there through the warmup,
+    which is not counted, and then through the interval itself.
+    """
+    starts = np.concatenate(([0], np.cumsum(profile.lengths)))
+    sim = make_sim()
+    done = 0
+    for p in sorted(points, key=lambda p: p.interval):
+        start = int(starts[p.interval])
+        ckpt = max(start - warmup, 0)
+        _advance(sim, ckpt - done)
+        done = ckpt
+        core = Core.from_functional(sim.fork())
+        warm = start - ckpt
+        if warm:
+            core.run(until=lambda c: c.instret >= warm)
+        stats = core.run(until=lambda c: c.instret >= warm + profile.lengths[p.interval])
+        p.cycles, p.instructions = stats.cycles, stats.instructions
+
+
+def estimate(make_sim: Callable[[], FunctionalSimulator], interval: int, *, max_k: int = 10,
+             dims: int = 15, samples: int = 1, warmup: int = 0, seed: int = 0,
+             max_instructions: Optional[int] = None,
+             profile: Optional[BBVProfile] = None) -> Estimate:
+    """Estimate whole-program CPI from a few detailed intervals.
+
+    make_sim returns a freshly loaded simulator positioned at the entry
+    point; it is called once for BBV collection (unless profile is given)
+    and once for the detailed replay.
+    """
+    if profile is None:
+        profile = collect_bbvs(make_sim(), interval, max_instructions)
+    points, weights, sizes = choose_points(profile, max_k, dims, samples, seed)
+    simulate_points(make_sim, profile, points, warmup)
+
+    cpi = 0.0
+    variance = 0.0
+    have_error = True
+    for c, w in enumerate(weights):
+        cpis = np.array([p.cpi for p in points if p.cluster == c])
+        cpi += w * cpis.mean()
+        if len(cpis) > 1:
+            fpc = 1 - len(cpis) / sizes[c]
+            variance += w * w * fpc * cpis.var(ddof=1) / len(cpis)
+        elif sizes[c] > 1:
+            have_error = False  # an unsampled spread we cannot measure
+    return Estimate(profile.instructions, float(cpi),
+                    float(1.96 * np.sqrt(variance)) if have_error else None,
+                    len(weights), weights, points)
+
@@ -0,0 +1,143 @@
+# src/dspsim/sweep.py
+"""Run one program against many cases in a pool of worker processes.
+
+A case is a dict (one line of the manifest) with any of:
+
+    id          label echoed in the result (default: position in the manifest)
+    regs        initial registers, {"R1": 5, "2": "0x10"} or a list of up to 32 values
+    mem         preloads, [{"addr": "0x2000", "words": [1, 2]}, {"addr": 256, "hex": "deadbeef"}]
+    engine      "fast", "jit" or "cycle" (default: the sweep's engine)
+    max_cycles  instruction/cycle budget (default: the sweep's max_cycles)
+    dump        memory to report back, [["0x2000", 4], ...] as (addr, word count)
+
+Each worker receives the program image once (pool initializer) and reuses
+it for every case it runs.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .core import FunctionalSimulator
+from .core_cycle import Core as CycleSimulator, Memory as CycleMemory
+from .jit import JitSimulator
+
+ENGINES = ("fast", "jit", "cycle")
+
+# Program state installed in each worker by _init_worker.
+_program: Dict[str, Any] = {}
+
+
+def _int(v) -> int:
+    return int(v, 0) if isinstance(v, str) else int(v)
+
+
+def _init_worker(image: bytes, base: int, entry: int, defaults: Dict[str, Any]) -> None:
+    _program.update(image=image, base=base, entry=entry, defaults=defaults)
+
+
+def _initial_regs(spec) -> Dict[int, int]:
+    if spec is None:
+        return {}
+    if isinstance(spec, list):
+        return {i: _int(v) for i, v in enumerate(spec)}
+    return {int(str(k).upper().lstrip("R")): _int(v) for k, v in spec.items()}
+
+
+def _preloads(spec) -> List[tuple]:
+    out = []
+    for item in spec or ():
+        if "hex" in item:
+            data = bytes.fromhex(item["hex"])
+        else:
+            data = b"".join(struct.pack("<I", _int(w) & 0xFFFFFFFF) for w in item["words"])
+        out.append((_int(item["addr"]), data))
+    return out
+
+
+def run_case(index: int, case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case against the worker's program and return its JSON-able result."""
+    defaults = _program["defaults"]
+    engine = case.get("engine", defaults["engine"])
+    max_cycles = case.get("max_cycles", defaults["max_cycles"])
+    max_cycles = None if max_cycles is None else _int(max_cycles)
+    result: Dict[str, Any] = {"id": case.get("id", index), "engine": engine, "error": None}
+    try:
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine '{engine}'")
+        regs = _initial_regs(case.get("regs"))
+        preloads = _preloads(case.get("mem"))
+        if engine == "cycle":
+            read32 = _run_cycle(regs, preloads, max_cycles, result)
+        else:
+            read32 = _run_functional(engine, regs, preloads, max_cycles, result)
+        result["dump"] = {
+            hex(addr): [read32(addr + 4 * i) for i in range(_int(n))]
+            for addr, n in ((_int(a), n) for a, n in case.get("dump", ()))
+        }
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def _run_functional(engine, regs, preloads, max_cycles, result):
+    sim = JitSimulator() if engine == "jit" else FunctionalSimulator()
+    sim.bus.load_blob(_program["base"], _program["image"])
+    for addr, data in preloads:
+        sim.bus.load_blob(addr, data)
+    for i, v in regs.items():
+        sim.regs[i] = v & 0xFFFFFFFF
+    try:
+        sim.run(entry=_program["entry"], max_cycles=max_cycles)
+    except RuntimeError as e:
+        result["error"] = str(e)
+    result.update(pc=sim.pc, cycles=sim.cycle_count, regs=list(sim.regs))
+    return sim.bus.read32
+
+
+def _run_cycle(regs, preloads, max_cycles, result):
+    mem = CycleMemory()
+    mem.load_blob(_program["base"], _program["image"])
+    for addr, data in preloads:
+        mem.load_blob(addr, data)
+    core = CycleSimulator(mem=mem)
+    core.pc = _program["entry"]
+    for i, v in regs.items():
+        core.regs.write(i, v)
+    if core.run(max_cycles=max_cycles).stop == "max_cycles":
+        result["error"] = "Max cycles reached"
+    result.update(pc=core.pc, cycles=core.cycle, regs=list(core.regs.R))
+    return mem.load32
+
+
+def _run_chunk(chunk: List[tuple]) -> List[Dict[str, Any]]:
+    return [run_case(i, case) for i, case in chunk]
+
+
+def sweep(words: List[int], cases: Iterable[Dict[str, Any]], *, base: int = 0x1000,
+          entry: Optional[int] = None, engine: str = "fast", max_cycles: Optional[int] = None,
+          jobs: Optional[int] = None, chunksize: int = 8) -> Iterator[Dict[str, Any]]:
+    """Run every case and yield results as they complete (not in manifest order).
+
+    jobs defaults to the machine's CPU count; jobs=1 runs in-process.
+    """
+    image = b"".join(struct.pack("<I", w & 0xFFFFFFFF) for w in words)
+    initargs = (image, base, base if entry is None else entry,
+                {"engine": engine, "max_cycles": max_cycles})
+    indexed = list(enumerate(cases))
+    chunks = [indexed[i : i + chunksize] for i in range(0, len(indexed), chunksize)]
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            yield from _run_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, max(len(chunks), 1)),
+                             initializer=_init_worker, initargs=initargs) as pool:
+        futures = [pool.submit(_run_chunk, chunk) for chunk in chunks]
+        for fut in as_completed(futures):
+            yield from fut.result()
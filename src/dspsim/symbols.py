@@ -0,0 +1,49 @@
+# src/dspsim/symbols.py
+"""Address -> symbol lookup shared by the loaders and reporting tools."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SymbolTable:
+    """Named addresses (labels, ELF symbols) that PCs can be symbolized against."""
+
+    def __init__(self, symbols: Optional[Dict[str, int]] = None):
+        self.by_name: Dict[str, int] = {}
+        self._addrs: List[int] = []
+        self._names: List[str] = []
+        if symbols:
+            self.update(symbols.items())
+
+    def update(self, items: Iterable[Tuple[str, int]]) -> None:
+        """Add (name, addr) pairs; a later name for the same address wins."""
+        self.by_name.update(items)
+        pairs = sorted((addr, name) for name, addr in self.by_name.items())
+        self._addrs = [a for a, _ in pairs]
+        self._names = [n for _, n in pairs]
+
+    def rebased(self, offset: int) -> SymbolTable:
+        """Copy with every address shifted by offset (e.g. to a load address)."""
+        return SymbolTable({name: addr + offset for name, addr in self.by_name.items()})
+
+    def lookup(self, addr: int) -> Optional[Tuple[str, int]]:
+        """(name, offset) of the closest symbol at or below addr, or None."""
+        i = bisect_right(self._addrs, addr) - 1
+        if i < 0:
+            return None
+        return self._names[i], addr - self._addrs[i]
+
+    def symbolize(self, addr: int) -> str:
+        """Format addr as 'name', 'name+0x10' or plain hex when nothing precedes it."""
+        hit = self.lookup(addr)
+        if hit is None:
+            return f"0x{addr:X}"
+        name, off = hit
+        return name if off == 0 else f"{name}+0x{off:X}"
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
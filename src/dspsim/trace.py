@@ -1,11 +1,101 @@
 # trace.py
+import gzip
 import json
-from typing import Optional
+import queue
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-class TraceSink:
-    def __init__(self, path: Optional[str]=None):
+try:
+    import zstandard
+    HAVE_ZSTD = True
+except ImportError:
+    HAVE_ZSTD = False
+
+# Ops that count as memory operations for TraceFilter(mem_only=True)
+MEM_OPS = frozenset({"LD", "ST", "LD32", "ST32"})
+
+# Registers R0..R(TRACE_REGS-1) appear in the regs_before/regs_after of a record
+TRACE_REGS = 8
+
+class TraceFilter:
+    """
+    Decides which instructions get a trace record.
+
+    Windows are half-open: [start_cycle, stop_cycle) and [start_inst, stop_inst),
+    where the instruction index counts every instruction offered to wants(),
+    traced or not. pc_ranges is a list of [lo, hi) ranges, ops a set of
+    mnemonics, mem_only keeps loads/stores, and sample_every=N keeps one of
+    every N instructions that pass the other filters.
+    """
+
+    def __init__(self, start_cycle: int = 0, stop_cycle: Optional[int] = None,
+                 start_inst: int = 0, stop_inst: Optional[int] = None,
+                 pc_ranges: Optional[List[Tuple[int, int]]] = None,
+                 ops: Optional[Iterable[str]] = None,
+                 mem_only: bool = False, sample_every: int = 1):
+        if sample_every < 1:
+            raise ValueError("sample_every must be >= 1")
+        self.start_cycle = start_cycle
+        self.stop_cycle = stop_cycle
+        self.start_inst = start_inst
+        self.stop_inst = stop_inst
+        self.pc_ranges = list(pc_ranges or ())
+        self.ops = frozenset(op.upper() for op in ops) if ops else None
+        self.mem_only = mem_only
+        self.sample_every = sample_every
+        self.seen = 0      # instructions offered so far
+        self._passed = 0   # instructions that passed every filter except sampling
+
+    def wants(self, cycle: int, inst) -> bool:
+        n = self.seen
+        self.seen = n + 1
+        if n < self.start_inst or cycle < self.start_cycle:
+            return False
+        if (self.stop_inst is not None and n >= self.stop_inst) or \
+           (self.stop_cycle is not None and cycle >= self.stop_cycle):
+            return False
+        if self.pc_ranges and not any(lo <= inst.pc < hi for lo, hi in self.pc_ranges):
+            return False
+        if self.ops is not None and inst.op not in self.ops:
+            return False
+        if self.mem_only and inst.op not in MEM_OPS:
+            return False
+        self._passed += 1
+        return self.sample_every == 1 or (self._passed - 1) % self.sample_every == 0
+
+class _FilteredSink:
+    """wants() for the sinks: emitters call it first and skip building the record on False."""
+    filter: Optional[TraceFilter] = None
+
+    def wants(self, cycle, inst) -> bool:
+        return self.filter is None or self.filter.wants(cycle, inst)
+
+    def emit_commit(self, cycle, inst, regs, deltas, memops):
+        """Record an instruction from the emitter's raw state.
+
+        regs is the live register list, after the instruction (None for a
+        record without registers), deltas the (idx, old, new) writes it made
+        and memops (type, addr, value) tuples. This builds emit_inst()'s
+        dicts; a sink can override it to skip them.
+        """
+        if regs is None:
+            before = after = {}
+        else:
+            after = {f"R{i}": regs[i] for i in range(TRACE_REGS)}
+            before = dict(after)
+            for idx, old, _ in reversed(deltas):
+                if idx < TRACE_REGS:
+                    before[f"R{idx}"] = old
+        self.emit_inst(cycle, inst, before, after,
+                       [{"type": t, "addr": hex(addr), "value": hex(value)}
+                        for t, addr, value in memops])
+
+class TraceSink(_FilteredSink):
+    def __init__(self, path: Optional[str]=None, filter: Optional[TraceFilter]=None):
         self.path = path
         self.fp = open(path, 'w') if path else None
+        self.filter = filter
 
     def emit_inst(self, cycle, inst, regs_before, regs_after, memops):
         rec = {
@@ -31,3 +121,253 @@ class TraceSink:
     def close(self):
         if self.fp:
             self.fp.close()
+
+# -------------------------
+# Binary trace format
+# -------------------------
+# File:   header, then chunks of (raw length, stored length, payload), where the
+#         payload is a run of records, compressed as a whole when enabled.
+# Record: _REC (fixed size), then n_sync _SYNC entries that bring the reader's
+#         register shadow up to regs_before, n_delta _DELTA (idx, old, new)
+#         entries for registers the instruction changed, and n_mem _MEM memops.
+#         Opcode names are sent once as _OPDEF records and referenced by id.
+TRACE_MAGIC = b"DSPT"
+TRACE_VERSION = 1
+COMPRESSIONS = {"none": 0, "gzip": 1, "zstd": 2}
+
+_HDR = struct.Struct('<4sHH')                # magic, version, compression
+_CHUNK = struct.Struct('<II')                # raw length, stored length
+_REC = struct.Struct('<BQIIHBBBBiBBBB')      # kind=0, cycle, pc, raw, op id, rd, rs1, rs2, pred,
+                                             # imm, flags, n_sync, n_delta, n_mem
+_OPDEF = struct.Struct('<BHB')               # kind=1, op id, name length (name bytes follow)
+_SYNC = struct.Struct('<BI')                 # reg idx, value
+_DELTA = struct.Struct('<BII')               # reg idx, old, new
+_MEM = struct.Struct('<BII')                 # type (0=LD, 1=ST), addr, value
+
+_NONE = 0xFF                                 # rd/rs1/rs2/pred "not present"
+_F_IMM = 1                                   # imm field is valid
+_F_REGS = 2                                  # record carries register snapshots
+_MEM_TYPES = ("LD", "ST")
+
+_REG_IDX: Dict[str, int] = {}
+
+def _reg_idx(name: str) -> int:
+    """'R12' -> 12, memoized because the same few names come up on every record."""
+    idx = _REG_IDX.get(name)
+    if idx is None:
+        idx = _REG_IDX[name] = int(name[1:])
+    return idx
+
+def _num(v) -> int:
+    return int(v, 16) if isinstance(v, str) else v
+
+def _compress(kind: int, data: bytes, level: Optional[int]) -> bytes:
+    if kind == 1:
+        return gzip.compress(data, compresslevel=6 if level is None else level)
+    if kind == 2:
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    return data
+
+def _decompress(kind: int, data: bytes) -> bytes:
+    if kind == 1:
+        return gzip.decompress(data)
+    if kind == 2:
+        if not HAVE_ZSTD:
+            raise RuntimeError("Trace is zstd-compressed; install 'zstandard' to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+class BinaryTraceSink(_FilteredSink):
+    """
+    Drop-in replacement for TraceSink that writes the compact binary format.
+
+    emit_inst packs fixed-size records into an in-memory chunk. Full chunks
+    go through a bounded queue to a writer thread, which compresses them and
+    writes them out, so the simulator thread never waits on the disk. It only
+    waits when `queue_chunks` chunks are already pending. Read a trace back
+    with read_binary_trace() or `dspsim trace-dump`.
+    """
+
+    def __init__(self, path: str, compression: str = "none", level: Optional[int] = None,
+                 chunk_size: int = 1 << 20, queue_chunks: int = 8,
+                 filter: Optional[TraceFilter] = None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown trace compression '{compression}' "
+                             f"(expected one of {tuple(COMPRESSIONS)})")
+        if compression == "zstd" and not HAVE_ZSTD:
+            raise RuntimeError("zstd trace compression requires 'zstandard' "
+                               "(pip install zstandard)")
+        self.path = path
+        self.filter = filter
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self._kind = COMPRESSIONS[compression]
+        self._level = level
+        self._buf = bytearray()
+        self._ops: Dict[str, int] = {}
+        self._shadow: Dict[int, int] = {}  # register index -> last value written to the trace
+        self._error: Optional[BaseException] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_chunks)
+        self.fp = open(path, 'wb')
+        self.fp.write(_HDR.pack(TRACE_MAGIC, TRACE_VERSION, self._kind))
+        self._writer = threading.Thread(target=self._write_loop, name="dspsim-trace-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    def emit_inst(self, cycle, inst, regs_before, regs_after, memops):
+        before = after = None
+        if regs_before:
+            before = {_reg_idx(k): v for k, v in regs_before.items()}
+            after = {_reg_idx(k): v for k, v in regs_after.items()}
+        self._record(cycle, inst, before, after,
+                     [(m["type"], _num(m["addr"]), _num(m["value"])) for m in memops])
+
+    def emit_commit(self, cycle, inst, regs, deltas, memops):
+        before = after = None
+        if regs is not None:
+            after = dict(enumerate(regs[:TRACE_REGS]))
+            before = dict(after)
+            for idx, old, _ in reversed(deltas):
+                if idx < TRACE_REGS:
+                    before[idx] = old
+        self._record(cycle, inst, before, after, memops)
+
+    def _record(self, cycle, inst, before, after, memops):
+        """Pack one record; before/after map register index -> value, or are None."""
+        buf = self._buf
+        op_id = self._ops.get(inst.op)
+        if op_id is None:
+            op_id = self._ops[inst.op] = len(self._ops)
+            name = inst.op.encode()
+            buf += _OPDEF.pack(1, op_id, len(name))
+            buf += name
+
+        shadow = self._shadow
+        sync: List[tuple] = []
+        deltas: List[tuple] = []
+        if before is not None:
+            for i, v in before.items():
+                if shadow.get(i) != v:
+                    shadow[i] = v
+                    sync.append((i, v))
+            for i, v in after.items():
+                old = shadow.get(i)
+                if old != v:
+                    shadow[i] = v
+                    deltas.append((i, 0 if old is None else old, v))
+
+        flags = (_F_IMM if inst.imm is not None else 0) | (_F_REGS if before is not None else 0)
+        buf += _REC.pack(0, cycle, inst.pc & 0xFFFFFFFF, inst.raw & 0xFFFFFFFF, op_id,
+                         _NONE if inst.rd is None else inst.rd,
+                         _NONE if inst.rs1 is None else inst.rs1,
+                         _NONE if inst.rs2 is None else inst.rs2,
+                         _NONE if inst.pred is None else inst.pred,
+                         inst.imm or 0, flags, len(sync), len(deltas), len(memops))
+        for item in sync:
+            buf += _SYNC.pack(*item)
+        for item in deltas:
+            buf += _DELTA.pack(*item)
+        for t, addr, value in memops:
+            buf += _MEM.pack(_MEM_TYPES.index(t), addr, value)
+
+        if len(buf) >= self.chunk_size:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        if self._buf:
+            self._queue.put(bytes(self._buf))
+            self._buf.clear()
+
+    def _write_loop(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so the simulator never blocks on a dead writer
+            try:
+                stored = _compress(self._kind, chunk, self._level)
+                self.fp.write(_CHUNK.pack(len(chunk), len(stored)))
+                self.fp.write(stored)
+            except BaseException as e:
+                self._error = e
+
+    def close(self):
+        """Flush pending records, stop the writer and close the file; re-raises writer errors."""
+        if self.fp.closed:
+            return
+        self._flush_chunk()
+        self._queue.put(None)
+        self._writer.join()
+        self.fp.close()
+        if self._error is not None:
+            raise RuntimeError(
+                f"Trace writer failed for '{self.path}': {self._error}") from self._error
+
+def read_binary_trace(path: str) -> Iterator[dict]:
+    """Yield the records of a binary trace as the dicts TraceSink would have written."""
+    with open(path, 'rb') as f:
+        head = f.read(_HDR.size)
+        if len(head) < _HDR.size:
+            raise ValueError(f"'{path}' is too short to be a dspsim trace")
+        magic, version, kind = _HDR.unpack(head)
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"'{path}' is not a dspsim binary trace")
+        if version != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {version} in '{path}'")
+        ops: Dict[int, str] = {}
+        shadow: Dict[int, int] = {}
+        while True:
+            head = f.read(_CHUNK.size)
+            if not head:
+                return
+            if len(head) < _CHUNK.size:
+                raise ValueError(f"Truncated chunk header in '{path}'")
+            raw_len, stored_len = _CHUNK.unpack(head)
+            data = _decompress(kind, f.read(stored_len))
+            if len(data) != raw_len:
+                raise ValueError(f"Corrupt chunk in '{path}'")
+            yield from _parse_chunk(data, ops, shadow)
+
+def _parse_chunk(data: bytes, ops: Dict[int, str], shadow: Dict[int, int]) -> Iterator[dict]:
+    pos = 0
+    end = len(data)
+    while pos < end:
+        if data[pos] == 1:
+            _, op_id, n = _OPDEF.unpack_from(data, pos)
+            pos += _OPDEF.size
+            ops[op_id] = data[pos : pos + n].decode()
+            pos += n
+            continue
+        (_, cycle, pc, raw, op_id, rd, rs1, rs2, pred, imm, flags,
+         n_sync, n_delta, n_mem) = _REC.unpack_from(data, pos)
+        pos += _REC.size
+        for _ in range(n_sync):
+            idx, v = _SYNC.unpack_from(data, pos)
+            shadow[idx] = v
+            pos += _SYNC.size
+        before = {f"R{i}": hex(v) for i, v in sorted(shadow.items())} if flags & _F_REGS else {}
+        for _ in range(n_delta):
+            idx, _old, new = _DELTA.unpack_from(data, pos)
+            shadow[idx] = new
+            pos += _DELTA.size
+        after = {f"R{i}": hex(v) for i, v in sorted(shadow.items())} if flags & _F_REGS else {}
+        memops = []
+        for _ in range(n_mem):
+            t, addr, value = _MEM.unpack_from(data, pos)
+            memops.append({"type": _MEM_TYPES[t], "addr": hex(addr), "value": hex(value)})
+            pos += _MEM.size
+        yield {
+            "cycle": cycle,
+            "pc": hex(pc),
+            "op": ops[op_id],
+            "rd": None if rd == _NONE else rd,
+            "rs1": None if rs1 == _NONE else rs1,
+            "rs2": None if rs2 == _NONE else rs2,
+            "imm": imm if flags & _F_IMM else None,
+            "pred": None if pred == _NONE else pred,
+            "raw": hex(raw),
+            "regs_before": before,
+            "regs_after": after,
+            "memops": memops,
+        }
@@ -0,0 +1,13 @@
+# tests/conftest.py
+import os
+import pytest
+
+@pytest.fixture(autouse=True, scope="session")
+def _asm_cache_dir(tmp_path_factory):
+    """Keep the assembly cache out of ~/.cache unless DSPSIM_CACHE_DIR is set (e.g. by CI)."""
+    if "DSPSIM_CACHE_DIR" in os.environ:
+        yield
+        return
+    os.environ["DSPSIM_CACHE_DIR"] = str(tmp_path_factory.mktemp("asmcache"))
+    yield
+    del os.environ["DSPSIM_CACHE_DIR"]
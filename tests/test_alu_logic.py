@@ -1,7 +1,7 @@
 # tests/test_alu_logic.py
 import pytest
 from dspsim import FunctionalSimulator
-from dspsim.assembler import assemble
+from dspsim.asmcache import assemble_cached
 
 def run_program(program_asm: list[str], initial_regs=None):
     """Helper function to assemble, load, and run a program."""
@@ -10,7 +10,7 @@ def run_program(program_asm: list[str], initial_regs=None):
         for r_idx, val in initial_regs.items():
             sim.regs[r_idx] = val
     
-    program = assemble(program_asm)
+    program, _ = assemble_cached(program_asm)
     sim.load_words(sim.pc, program)
     sim.run()
     return sim
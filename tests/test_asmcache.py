@@ -0,0 +1,60 @@
+# tests/test_asmcache.py
+import os
+import pytest
+from dspsim import asmcache
+from dspsim.asmcache import AsmCache, assemble_cached
+from dspsim.assembler import AsmError, assemble_with_labels
+
+SOURCE = ["start:", "ADDI r1, r0, #5", "J start", "end:", "HALT"]
+
+def test_hit_returns_the_same_image_without_assembling(tmp_path, monkeypatch):
+    cache = AsmCache(tmp_path)
+    first = cache.assemble(SOURCE)
+    assert first == assemble_with_labels(SOURCE) and (cache.hits, cache.misses) == (0, 1)
+    monkeypatch.setattr(asmcache, "assemble_with_labels", lambda lines: pytest.fail("re-assembled"))
+    assert AsmCache(tmp_path).assemble("\n".join(SOURCE)) == first
+    assert len(cache.entries()) == 1
+
+def test_read_only_entries_still_hit(tmp_path, monkeypatch):
+    cache = AsmCache(tmp_path)
+    first = cache.assemble(SOURCE)
+    def utime(path):
+        raise PermissionError(13, "Permission denied", str(path))
+    monkeypatch.setattr(asmcache.os, "utime", utime)  # e.g. another user's cache
+    for _ in range(2):
+        assert cache.assemble(SOURCE) == first
+    assert (cache.hits, cache.misses) == (2, 1) and len(cache.entries()) == 1
+
+def test_key_covers_source_and_toolchain(monkeypatch):
+    k = AsmCache.key("HALT")
+    assert AsmCache.key("HALT ") != k
+    monkeypatch.setattr(asmcache, "_TOOLCHAIN", asmcache._TOOLCHAIN + b"next")
+    assert AsmCache.key("HALT") != k
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    cache = AsmCache(tmp_path)
+    programs = [[f"ADDI r1, r0, #{i}"] * 50 + ["HALT"] for i in range(4)]
+    for i, prog in enumerate(programs):
+        cache.assemble(prog)
+        os.utime(cache._path(cache.key("\n".join(prog))), (i, i))  # distinct, ordered mtimes
+    entry = cache.entries()[0][1]
+    cache.assemble(programs[0])            # hit: programs[0] becomes the newest
+    cache.max_bytes = 2 * entry
+    assert cache.evict() == 2
+    left = {p.name for _, _, p in cache.entries()}
+    assert left == {cache.key("\n".join(programs[i])) + ".dspa" for i in (0, 3)}
+
+def test_corrupt_entries_and_errors_are_not_cached(tmp_path):
+    cache = AsmCache(tmp_path)
+    cache.assemble(SOURCE)
+    path = cache.entries()[0][2]
+    path.write_bytes(path.read_bytes()[:-3])
+    assert cache.get(cache.key("\n".join(SOURCE))) is None and not path.exists()
+    with pytest.raises(AsmError):
+        cache.assemble(["BOGUS"])
+    assert cache.entries() == []
+
+def test_unwritable_cache_still_assembles(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("not a directory")
+    assert assemble_cached(SOURCE, AsmCache(blocker / "cache")) == assemble_with_labels(SOURCE)
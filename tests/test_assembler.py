@@ -0,0 +1,99 @@
+# tests/test_assembler.py
+import io
+import tracemalloc
+from array import array
+import pytest
+from dspsim.assembler import AsmError, assemble, assemble_stream, assemble_with_labels
+from dspsim.encoder import enc_i, enc_ri
+from dspsim.isa import MAJ_ADDI, MAJ_HALT, MAJ_J, MAJ_LD32
+
+SOURCE = [
+    "start:",
+    "  LD r1, [r0+data]      ; forward label as a memory offset",
+    "  ADDI r2, r0, #end     ; and as an immediate",
+    "  J end @P1",
+    "loop:",
+    "  ADD r3,r1,r2",
+    "  ST [r3-4], r5",
+    "  CMPI.EQ P1, r3, #0",
+    "  J loop",
+    "end:",
+    "  HALT",
+    "data:",
+]
+
+def test_forward_and_backward_labels():
+    words, labels = assemble_with_labels(SOURCE)
+    assert labels == {"start": 0, "loop": 12, "end": 28, "data": 32}
+    assert words[0] == enc_ri(MAJ_LD32, 1, 0, 32)
+    assert words[1] == enc_ri(MAJ_ADDI, 2, 0, 28)
+    assert words[2] == enc_i(MAJ_J, (28 - 12) >> 2, pred=1)
+    assert words[6] == enc_i(MAJ_J, (12 - 28) >> 2 & 0x3FFF)
+    assert words[7] == enc_i(MAJ_HALT, 0)
+
+def test_stream_from_generator_and_path(tmp_path):
+    src = tmp_path / "prog.asm"
+    src.write_text("\n".join(SOURCE) + "\n")
+    expected = assemble(SOURCE)
+    words, _ = assemble_stream(line for line in SOURCE)
+    assert isinstance(words, array) and words.tolist() == expected
+    assert assemble_stream(str(src))[0].tolist() == expected
+    # appends after whatever the array already holds
+    words, _ = assemble_stream(SOURCE, array('I', [7]))
+    assert words.tolist() == [7] + expected
+
+def test_stream_to_file_is_backpatched_little_endian():
+    out = io.BytesIO(b"HDR!")
+    out.seek(4)
+    assemble_stream(SOURCE, out)
+    data = out.getvalue()
+    assert data[:4] == b"HDR!" and out.tell() == len(data) == 4 + 4 * 8
+    words = [int.from_bytes(data[i:i + 4], "little") for i in range(4, len(data), 4)]
+    assert words == assemble(SOURCE)
+
+def test_backpatch_reaches_flushed_chunks(monkeypatch):
+    from dspsim import assembler
+    monkeypatch.setattr(assembler._FileOutput, "CHUNK", 3)
+    out = io.BytesIO()
+    assemble_stream(SOURCE, out)
+    assert out.getvalue() == b"".join(w.to_bytes(4, "little") for w in assemble(SOURCE))
+
+@pytest.mark.parametrize("lines, message", [
+    (["ADDI r1, r0, #1", "J nowhere"], "line 2: Undefined label 'nowhere'"),
+    (["x:", "x:"], "line 2: Label multiply defined"),
+    (["1x:"], "line 1: Bad label name"),
+    (["ADD r1, r2"], "line 1: ADD needs rd,rs1,rs2"),
+    (["ADDI r1, r40, #1"], "line 1: Register out of range"),
+    (["HALT @P7"], "line 1: Predicate out of range"),
+    ([".word 0x1", ".word zz"], "line 2: Bad .word value"),
+    ([".word 0x100000000"], "line 1: .word value out of range"),
+    (["J fwd", "ADDI r1, r0, #1", "fwd:"], None),
+])
+def test_errors_name_the_line(lines, message):
+    if message is None:
+        assemble(lines)
+        return
+    with pytest.raises(AsmError, match=message):
+        assemble(lines)
+
+def test_memory_does_not_grow_with_line_count():
+    def generated(n):
+        yield "top:"
+        for i in range(n):
+            yield f"  ADDI r1, r1, #{i & 0xFF}"
+        yield "  J top"
+
+    class Discard(io.RawIOBase):
+        def writable(self): return True
+        def seekable(self): return True
+        def write(self, b): return len(b)
+        def seek(self, pos, whence=0): return 0
+        def tell(self): return 0
+
+    tracemalloc.start()
+    try:
+        assemble_stream(generated(50_000), Discard())
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 1 << 20  # one 64K-word chunk plus change, not 50k lines
@@ -0,0 +1,70 @@
+# tests/test_batch.py
+import pytest
+np = pytest.importorskip("numpy")
+from dspsim import FunctionalSimulator
+from dspsim.batch import BatchSimulator
+from dspsim.assembler import assemble
+from dspsim.encoder import enc_i
+from dspsim.isa import MAJ_HALT, MAJ_J
+
+LOOP = assemble([
+    "ADDI r1, r0, 0x100",
+    "LOOP:",
+    "LD r3, [r1+0]",
+    "ADD r2, r2, r3",
+    "ADDI r1, r1, 4",
+    "SUB r5, r2, r4",
+    "J LOOP",
+])
+
+def run_reference(words, mem, r4, max_cycles):
+    sim = FunctionalSimulator(mem_size=len(mem))
+    sim.bus.mem[:] = mem
+    sim.load_words(0x1000, words)
+    sim.regs[4] = r4
+    try:
+        sim.run(entry=0x1000, max_cycles=max_cycles)
+    except RuntimeError as e:
+        return sim, str(e)
+    return sim, None
+
+def test_lockstep_matches_functional_per_instance():
+    n = 8
+    b = BatchSimulator(n, mem_size=0x2000)
+    b.load_words(0x1000, LOOP)
+    rng = np.random.default_rng(1)
+    b.mem[:, 0x100:0x200] = rng.integers(0, 256, size=(n, 0x100), dtype=np.uint8)
+    b.regs[:, 4] = np.arange(n) * 1000
+    mem_before = b.mem.copy()
+    b.run(entry=0x1000, max_cycles=150)
+    for i in range(n):
+        sim, err = run_reference(LOOP, bytes(mem_before[i]), i * 1000, 150)
+        assert b.regs[i].tolist() == sim.regs
+        assert b.pc[i] == sim.pc
+        assert b.cycle_count[i] == sim.cycle_count
+        assert b.errors[i] == err
+
+def test_divergent_instances_are_masked_and_rejoin():
+    b = BatchSimulator(3, mem_size=0x2000)
+    b.load_words(0x1000, assemble([
+        "ADDI r1, r1, 1",
+        "ADDI r2, r2, 1",   # instance 1: J over the next instruction
+        "ADDI r2, r2, 1",
+        "ADDI r3, r3, 1",
+        "HALT",
+    ]))
+    b.load_words(0x1004, [enc_i(MAJ_J, 1)], instances=[1])
+    b.load_words(0x1000, [enc_i(MAJ_HALT, 0)], instances=[2])
+    b.run(entry=0x1000)
+    assert b.regs[:, 1:4].tolist() == [[1, 2, 1], [1, 0, 1], [0, 0, 0]]
+    assert b.cycle_count.tolist() == [5, 4, 1]
+    assert not b.errors
+
+def test_fault_stops_only_that_instance():
+    b = BatchSimulator(2, mem_size=0x2000)
+    b.load_words(0x1000, assemble(["LD r2, [r1+0]", "ADDI r3, r0, #5", "HALT"]))
+    b.regs[1, 1] = 0x4000
+    b.run(entry=0x1000)
+    assert b.regs[:, 3].tolist() == [5, 0]
+    assert list(b.errors) == [1]
+    assert "Execution error at PC=0x1000 (LD)" in b.errors[1]
@@ -0,0 +1,53 @@
+# tests/test_benchmarks.py
+import importlib.util
+import pathlib
+import pytest
+
+BENCH = pathlib.Path(__file__).resolve().parents[1] / "benchmarks" / "bench.py"
+spec = importlib.util.spec_from_file_location("dspsim_bench", BENCH)
+bench = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench)
+
+@pytest.mark.parametrize("engine", ["fast", "cycle", "cycle-l1", "cycle-trace"])
+@pytest.mark.parametrize("kernel", ["fir", "memcpy", "dot", "branchy"])
+def test_kernels_run_for_the_budget(kernel, engine):
+    res = bench.measure(kernel, engine, 500)
+    assert res["cycles"] == 500
+    assert res["instructions"] > 0 and res["inst_per_sec"] > 0
+    assert res["peak_rss_kb"] > 0 and res["startup_s"] >= 0
+
+@pytest.mark.parametrize("engine", ["fast", "cycle"])
+def test_memcpy_and_fir_fill_the_destination_ring(engine):
+    from dspsim import FunctionalSimulator
+    from dspsim.assembler import assemble
+    from dspsim.core_cycle import Core
+
+    src = [(i * 0x9E3779B1) & 0xFFFF for i in range(67)]
+    expected = {"memcpy": src[:64],
+                "fir": [src[i] + 2 * src[i + 1] + 2 * src[i + 2] + src[i + 3] for i in range(64)]}
+    for kernel, want in expected.items():
+        sim = FunctionalSimulator(mem_size=0x10000)
+        source = (bench.KERNEL_DIR / f"{kernel}.asm").read_text().splitlines()
+        sim.load_words(bench.BASE, assemble(source))
+        sim.load_words(0x2000, src)
+        sim.pc = bench.BASE
+        if engine == "cycle":
+            core = Core.from_functional(sim)
+            core.run(max_cycles=3000)
+            out = [core.mem.load32(0x3000 + 4 * i) for i in range(64)]
+        else:
+            with pytest.raises(RuntimeError, match="Max cycles"):
+                sim.run(max_cycles=3000)
+            out = [sim.bus.read32(0x3000 + 4 * i) for i in range(64)]
+            # the buffers share no page with the code, so stores never reach a watched page
+            assert sim.bus.code_pages == {bench.BASE >> 12}
+        assert out == want, kernel
+
+def test_compare_flags_regressions_in_the_right_direction():
+    base = {"results": [{"kernel": "fir", "engine": "fast", "inst_per_sec": 100.0,
+                         "cycles_per_sec": 100.0, "peak_rss_kb": 1000, "startup_s": 0.02}]}
+    cur = {"results": [{"kernel": "fir", "engine": "fast", "inst_per_sec": 85.0,
+                        "cycles_per_sec": 120.0, "peak_rss_kb": 1050, "startup_s": 0.01}]}
+    rows = {r["metric"]: r["regressed"] for r in bench.compare_results(base, cur, 0.10)}
+    assert rows == {"inst_per_sec": True, "cycles_per_sec": False,
+                    "peak_rss_kb": False, "startup_s": False}
@@ -0,0 +1,61 @@
+# tests/test_bus.py
+import pytest
+from dspsim.bus import Bus, MMIO
+
+class Reg(MMIO):
+    """Device that remembers the last write and echoes addr on read."""
+    def __init__(self):
+        self.writes = []
+    def read32(self, addr):
+        return addr ^ 0xFFFFFFFF
+    def write32(self, addr, value):
+        self.writes.append((addr, value))
+
+@pytest.mark.parametrize("backend", ["flat", "paged"])
+def test_ram_words_are_little_endian_and_unaligned_ok(backend):
+    bus = Bus(size=0x4000, backend=backend)
+    bus.write32(0x100, 0x11223344)
+    assert bus.read(0x100, 4) == bytes([0x44, 0x33, 0x22, 0x11])
+    bus.write32(0x203, 0xAABBCCDD)
+    assert bus.read32(0x203) == 0xAABBCCDD
+    bus.write32(0x300, -1)
+    assert bus.read32(0x300) == 0xFFFFFFFF
+
+def test_mmio_dispatch_by_page():
+    bus = Bus(size=0x10000)
+    devs = [Reg() for _ in range(64)]
+    for i, dev in enumerate(devs):
+        bus.map_mmio(0x8000 + 16 * i, 16, dev)
+    bus.write32(0x8000 + 16 * 5 + 4, 7)
+    assert devs[5].writes == [(0x8054, 7)]
+    assert bus.read32(0x83F0) == 0x83F0 ^ 0xFFFFFFFF
+    # the same page outside any device range is plain RAM
+    bus.write32(0x8800, 9)
+    assert bus.read32(0x8800) == 9 and bus.read(0x8800, 4) == bytes([9, 0, 0, 0])
+
+def test_mmio_first_mapping_wins_and_spans_pages():
+    bus = Bus(size=0x10000)
+    first, second = Reg(), Reg()
+    bus.map_mmio(0x0FF0, 0x2000, first)
+    bus.map_mmio(0x1000, 0x10, second)
+    bus.write32(0x1004, 1)
+    bus.write32(0x2FEC, 2)
+    assert first.writes == [(0x1004, 1), (0x2FEC, 2)] and second.writes == []
+
+@pytest.mark.parametrize("mode", ["rw", "cow", "ro"])
+def test_map_file_modes(tmp_path, mode):
+    path = tmp_path / "table.bin"
+    path.write_bytes(bytes(range(16)))
+    bus = Bus(size=0x4000)
+    dev = bus.map_file(0x2000, str(path), mode)
+    assert bus.read32(0x2004) == 0x07060504
+    assert bus.read(0x2008, 4) == bytes([8, 9, 10, 11])
+    if mode == "ro":
+        with pytest.raises(PermissionError):
+            bus.write32(0x2000, 1)
+    else:
+        bus.write32(0x2000, 0xAABBCCDD)
+        assert bus.read32(0x2000) == 0xAABBCCDD
+    dev.close()
+    on_disk = path.read_bytes()[:4]
+    assert on_disk == (bytes([0xDD, 0xCC, 0xBB, 0xAA]) if mode == "rw" else bytes(range(4)))
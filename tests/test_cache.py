@@ -0,0 +1,88 @@
+# tests/test_cache.py
+import pytest
+from dspsim.assembler import assemble
+from dspsim.cache import Cache
+from dspsim.core_cycle import Core, Memory
+
+def test_geometry_and_spec():
+    c = Cache.from_spec("L1D", "8K:2:64:fifo:30")
+    assert (c.size, c.ways, c.line, c.sets, c.policy, c.miss_latency) == (8192, 2, 64, 64, "fifo", 30)
+    assert Cache.from_spec("L1I", "256:1:16").policy == "lru"
+    for bad in ("32K:3:32", "32K:4:24", "32K:4", "32K:4:32:mru", "big:4:32"):
+        with pytest.raises(ValueError):
+            Cache.from_spec("X", bad)
+
+def test_hits_misses_and_lru_eviction():
+    c = Cache("L1D", size=128, ways=2, line=32, miss_latency=10)  # 2 sets
+    assert c.access(0x000) == 10 and c.access(0x01C) == 0     # same line
+    assert c.access(0x040) == 10                              # same set, second way
+    assert c.access(0x000) == 0                               # 0x000 is now most recent
+    assert c.access(0x080) == 10                              # evicts 0x040
+    assert c.contains(0x000) and not c.contains(0x040) and c.contains(0x080)
+    assert (c.hits, c.misses) == (2, 3) and c.miss_rate == pytest.approx(0.6)
+
+def test_fifo_ignores_reuse():
+    c = Cache("L1D", size=128, ways=2, line=32, policy="fifo")
+    c.access(0x000); c.access(0x040); c.access(0x000)
+    c.access(0x080)  # evicts 0x000, the first filled
+    assert not c.contains(0x000) and c.contains(0x040)
+
+def test_random_fills_invalid_ways_first_and_counts_writebacks():
+    c = Cache("L1D", size=64, ways=2, line=32, policy="random")  # one set
+    c.access(0x000, write=True); c.access(0x100)
+    assert c.contains(0x000) and c.contains(0x100)
+    for addr in range(0x200, 0x1200, 0x100):
+        c.access(addr)
+    assert c.writebacks == 1 and c.misses == 18
+    c.reset()
+    assert (c.hits, c.misses, c.writebacks) == (0, 0, 0) and not c.contains(0x000)
+
+def core_with(lines, **caches):
+    mem = Memory(0x10000)
+    mem.load_blob(0x1000, b"".join(w.to_bytes(4, "little") for w in assemble(lines)))
+    mem.store32(0x400, 40)
+    core = Core(mem, **caches)
+    core.pc = 0x1000
+    return core
+
+def test_dcache_miss_lengthens_loads():
+    lines = ["LD r1, [r0+0x400]", "LD r2, [r0+0x404]", "ADD r3, r1, r2", "HALT"]
+    base = core_with(lines).run()
+    dcache = Cache("L1D", size=1024, ways=2, line=32, miss_latency=20)
+    core = core_with(lines, dcache=dcache)
+    stats = core.run()
+    assert core.regs.R[3] == 40
+    # the first load misses (+20); the second hits the same line
+    assert stats.cycles == base.cycles + 20
+    assert (dcache.hits, dcache.misses) == (1, 1)
+
+def test_icache_misses_stall_fetch_once_per_line():
+    lines = ["ADDI r1, r1, #1"] * 16 + ["HALT"]
+    icache = Cache("L1I", size=1024, ways=1, line=32, miss_latency=5)
+    core = core_with(lines, icache=icache)
+    stats = core.run()
+    assert core.regs.R[1] == 16
+    # 17 words over three 32-byte lines
+    assert (icache.misses, icache.hits) == (3, 14)
+    assert stats.stalls["icache"] == 15
+    assert stats.cycles == core_with(lines).run().cycles + 15
+
+def test_icache_lookup_is_not_repeated_for_a_stalled_packet():
+    icache = Cache("L1I", size=1024, ways=1, line=32, miss_latency=5)
+    core = core_with(["LD r1, [r0+0x400]", "ADD r2, r1, r1", "HALT"], icache=icache)
+    core.run()
+    assert icache.accesses == 3
+
+@pytest.mark.parametrize("chunk", [1, 2, 3])
+def test_icache_stall_survives_run_boundaries(chunk):
+    # as with --warmup, --max-cycles or the server's slices: a stall cut short
+    # by max_cycles must still be served in full by the next run()
+    lines = ["ADDI r1, r1, #1"] * 16 + ["HALT"]
+    whole = core_with(lines, icache=Cache("L1I", size=1024, ways=1, line=32, miss_latency=5))
+    ref = whole.run()
+    icache = Cache("L1I", size=1024, ways=1, line=32, miss_latency=5)
+    core = core_with(lines, icache=icache)
+    while core.run(max_cycles=chunk).stop == "max_cycles":
+        pass
+    assert core.cycle == ref.cycles and core.stalls["icache"] == 15
+    assert icache.accesses == whole.icache.accesses
@@ -0,0 +1,98 @@
+# tests/test_cycle_core.py
+from dspsim.assembler import assemble
+from dspsim.core_cycle import Core, Memory
+from dspsim.trace import TraceSink
+
+def make_core(lines, size=0x10000):
+    mem = Memory(size)
+    mem.load_blob(0x1000, b"".join(w.to_bytes(4, "little") for w in assemble(lines)))
+    core = Core(mem)
+    core.pc = 0x1000
+    return core
+
+def test_run_to_halt_commits_everything_and_reports_stats():
+    core = make_core(["ADDI r1, r0, #5", "ADDI r2, r0, #7", "ADD r3, r1, r2", "HALT"])
+    stats = core.run()
+    assert stats.stop == "halt" and core.halted
+    assert stats.instructions == 4 == core.instret
+    assert core.regs.R[1:3] == [5, 7]
+    assert core.rob == []
+    assert core.run().cycles == 0  # already halted
+
+def test_load_sequence_skips_idle_cycles():
+    core = make_core(["LD r1, [r0+0x100]"] * 5 + ["HALT"])
+    core.mem.store32(0x100, 42)
+    steps = 0
+    step = core.step
+    def counting_step():
+        nonlocal steps
+        steps += 1
+        return step()
+    core.step = counting_step
+    stats = core.run()
+    # one LSU with latency 3: loads issue at cycles 0, 3, 6, 9, 12 and the last completes at 15
+    assert (stats.cycles, stats.instructions) == (15, 6)
+    assert stats.stall_cycles == 8 and stats.skipped_cycles == 4
+    assert steps == stats.cycles - stats.skipped_cycles - 1
+    assert core.regs.R[1] == 42
+
+def test_max_cycles_and_until():
+    core = make_core(["ADDI r1, r1, #1"] * 20 + ["HALT"])
+    stats = core.run(max_cycles=4)
+    assert (stats.stop, stats.cycles) == ("max_cycles", 4)
+    stats = core.run(until=0x1000 + 4 * 10)
+    assert stats.stop == "until" and core.pc == 0x1028
+    stats = core.run(until=lambda c: c.instret >= 15)
+    assert stats.stop == "until" and core.instret == 15
+    assert core.run().stop == "halt"
+
+def test_snapshot_keeps_pending_completions():
+    core = make_core(["LD r1, [r0+0x100]", "ADDI r2, r0, #1", "HALT"])
+    core.mem.store32(0x100, 9)
+    core.step()
+    snap = core.snapshot()
+    assert len(snap.rob) == 1
+    child = core.fork(snap)
+    core.run()
+    child.run()
+    assert child.regs.R[:3] == core.regs.R[:3] == [0, 9, 1]
+    assert child.cycle == core.cycle and child.instret == core.instret
+
+class RecordingSink(TraceSink):
+    """Keeps emit_commit's raw arguments instead of formatting them."""
+    def __init__(self, accept=True):
+        super().__init__()
+        self.accept = accept
+        self.commits = []
+
+    def wants(self, cycle, inst):
+        return self.accept
+
+    def emit_commit(self, cycle, inst, regs, deltas, memops):
+        self.commits.append((inst.op, None if regs is None else list(regs[:4]), deltas, memops))
+
+def test_commit_reports_register_deltas_and_memops():
+    core = make_core(["ADDI r1, r0, #5", "LD r2, [r1+0xFB]", "ADDI r1, r1, #1", "HALT"])
+    core.mem.store32(0x100, 42)
+    core.trace = RecordingSink()
+    core.run()
+    # the load completes last: after the second ADDI and after HALT retires at issue
+    assert core.trace.commits == [
+        ("ADDI", [0, 5, 0, 0], ((1, 0, 5),), ()),
+        ("ADDI", [0, 6, 0, 0], ((1, 5, 6),), ()),
+        ("CMPI_0", None, (), ()),
+        ("LD", [0, 6, 42, 0], ((2, 0, 42),), (("LD", 0x100, 42),)),
+    ]
+
+def test_untraced_commit_builds_no_payload(monkeypatch):
+    def forbidden(*args):
+        raise AssertionError("trace payload built without a sink that wants it")
+    monkeypatch.setattr(Core, "regs_snapshot", forbidden)
+    monkeypatch.setattr(TraceSink, "emit_inst", forbidden)
+    monkeypatch.setattr(RecordingSink, "emit_commit", forbidden)
+    lines = ["ADDI r1, r0, #0x100", "LD r2, [r1+0]", "ADD r3, r2, r1", "HALT"]
+    for trace in (None, RecordingSink(accept=False)):
+        core = make_core(lines)
+        core.trace = trace
+        core.run()
+        assert core.regs.R[3] == 0x100
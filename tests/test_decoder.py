@@ -0,0 +1,35 @@
+# tests/test_decoder.py
+import pytest
+from dspsim.decoder import _DISPATCH, DECODE_CACHE_SIZE, decode_fields, decode_word
+from dspsim.encoder import enc_3r, enc_cmpi, enc_i, enc_ri
+from dspsim.inst import Inst
+from dspsim.assembler import assemble
+from dspsim.isa import MAJ_J, MAJ_LD32, MAJ_NOT, MAJ_ST32, MAJ_SUB
+
+@pytest.mark.parametrize("word, expected", [
+    (enc_3r(MAJ_SUB, 3, 1, 2, pred=2), dict(op="SUB", rd=3, rs1=1, rs2=2, imm=None, pred=2)),
+    (enc_ri(MAJ_LD32, 4, 5, -8 & 0x3FFF), dict(op="LD", rd=4, rs1=5, rs2=None, imm=-8)),
+    # ST's value register sits in the rd field and is carried as rs2
+    (enc_ri(MAJ_ST32, 5, 1, 4), dict(op="ST", rd=None, rs1=1, rs2=5, imm=4)),
+    (assemble(["ST [r1+4], r5"])[0], dict(op="ST", rd=None, rs1=1, rs2=5, imm=4)),
+    (enc_i(MAJ_J, -3 & 0x3FFF, end=False), dict(op="J", rd=None, rs1=None, imm=-3, endpkt=False)),
+    (enc_cmpi(1, 7, 9, 5), dict(op="CMPI_5", rd=None, rs1=7, imm=9 | 5 << 5)),
+])
+def test_fields(word, expected):
+    inst = decode_word(word, 0x1000)
+    assert inst.raw == word and inst.pc == 0x1000
+    for name, value in expected.items():
+        assert getattr(inst, name) == value
+
+def test_table_covers_every_major_opcode():
+    assert len(_DISPATCH) == 16
+    assert _DISPATCH[MAJ_NOT] is None and decode_word(enc_i(MAJ_NOT, 0)) is None
+
+def test_decode_is_cached_by_word_with_pc_applied_per_call():
+    word = enc_ri(MAJ_LD32, 1, 2, 12)
+    decode_fields.cache_clear()
+    a, b = decode_word(word, 0x1000), decode_word(word, 0x2000)
+    info = decode_fields.cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (1, 1, DECODE_CACHE_SIZE)
+    assert (a.pc, b.pc) == (0x1000, 0x2000) and a[2:] == b[2:]
+    assert isinstance(a, Inst) and not hasattr(a, "__dict__")
@@ -0,0 +1,66 @@
+# tests/test_elf.py
+import struct
+import pytest
+pytest.importorskip("elftools")
+from dspsim import FunctionalSimulator
+from dspsim.assembler import assemble
+from dspsim.core_cycle import Memory
+from dspsim.elf import ElfImage, ElfLoadError, load_elf
+
+def make_elf(path, text_addr, words, bss_size=0, symbols=()):
+    """Write a minimal ELF32 LE executable: one PT_LOAD segment plus .symtab/.strtab."""
+    text = b"".join(struct.pack("<I", w) for w in words)
+    strtab = b"\0" + b"".join(name.encode() + b"\0" for name, _ in symbols)
+    shstrtab = b"\0.text\0.symtab\0.strtab\0.shstrtab\0"
+    symtab = bytes(16)
+    name_off = 1
+    for name, addr in symbols:
+        # st_name, st_value, st_size, st_info (GLOBAL FUNC), st_other, st_shndx (.text)
+        symtab += struct.pack("<IIIBBH", name_off, addr, 0, 0x12, 0, 1)
+        name_off += len(name) + 1
+    text_off = 52 + 32
+    symtab_off = text_off + len(text)
+    strtab_off = symtab_off + len(symtab)
+    shstr_off = strtab_off + len(strtab)
+    sh_off = shstr_off + len(shstrtab)
+    ehdr = struct.pack("<4sBBBBB7xHHIIIIIHHHHHH", b"\x7fELF", 1, 1, 1, 0, 0,
+                       2, 0, 1, text_addr, 52, sh_off, 0, 52, 32, 1, 40, 5, 4)
+    phdr = struct.pack("<IIIIIIII", 1, text_off, text_addr, text_addr,
+                       len(text), len(text) + bss_size, 5, 0x1000)
+    shdrs = bytes(40)
+    shdrs += struct.pack("<IIIIIIIIII", 1, 1, 6, text_addr, text_off, len(text), 0, 0, 4, 0)
+    shdrs += struct.pack("<IIIIIIIIII", 7, 2, 0, 0, symtab_off, len(symtab), 3, 1, 4, 16)
+    shdrs += struct.pack("<IIIIIIIIII", 15, 3, 0, 0, strtab_off, len(strtab), 0, 0, 1, 0)
+    shdrs += struct.pack("<IIIIIIIIII", 23, 3, 0, 0, shstr_off, len(shstrtab), 0, 0, 1, 0)
+    path.write_bytes(ehdr + phdr + text + symtab + strtab + shstrtab + shdrs)
+    return path
+
+PROGRAM = assemble(["ADDI r1, r0, #5", "J DONE", "ADDI r1, r0, #9", "DONE:", "ADDI r2, r1, #1", "HALT"])
+
+def test_elf_loads_segments_entry_and_symbols(tmp_path):
+    path = make_elf(tmp_path / "prog.elf", 0x4000, PROGRAM, bss_size=0x2000,
+                    symbols=[("_start", 0x4000), ("DONE", 0x400C)])
+    sim = FunctionalSimulator(mem_backend="paged")
+    image = load_elf(str(path), sim.bus)
+    assert image.entry == 0x4000
+    assert [(s.vaddr, s.filesz, s.memsz) for s in image.segments] == [(0x4000, 20, 20 + 0x2000)]
+    assert image.symbols.symbolize(0x4010) == "DONE+0x4"
+    # bss was not materialized
+    assert sim.bus.store.dirty_pages() == 1
+    sim.run(entry=image.entry, max_cycles=100)
+    assert sim.regs[1:3] == [5, 6]
+
+def test_elf_into_cycle_memory(tmp_path):
+    path = make_elf(tmp_path / "prog.elf", 0x1000, PROGRAM)
+    mem = Memory()
+    load_elf(str(path), mem)
+    assert [mem.load32(0x1000 + 4 * i) for i in range(len(PROGRAM))] == PROGRAM
+
+def test_elf_rejects_bad_input(tmp_path):
+    bad = tmp_path / "bad.elf"
+    bad.write_bytes(b"not an elf")
+    with pytest.raises(ElfLoadError):
+        ElfImage(str(bad))
+    big = make_elf(tmp_path / "big.elf", 0x1000, PROGRAM, bss_size=0x10000)
+    with pytest.raises(ElfLoadError, match="does not fit"):
+        load_elf(str(big), Memory(0x2000))
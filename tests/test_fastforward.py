@@ -0,0 +1,94 @@
+# tests/test_fastforward.py
+import pytest
+from dspsim import FunctionalSimulator, JitSimulator
+from dspsim.assembler import assemble
+from dspsim.bus import MMIO
+from dspsim.core_cycle import Core, Memory
+
+# a setup prefix (0x1000-0x100C), then the kernel of interest from 0x1010
+SETUP = [
+    "ADDI r1, r0, #5",
+    "ADDI r2, r2, #3",
+    "ADDI r1, r1, #-1",
+    "ADD r3, r1, r2",
+]
+KERNEL = [
+    "LD r4, [r0+0x400]",
+    "ADD r5, r4, r3",
+    "SUB r6, r5, r1",
+    "HALT",
+]
+
+def booted(cls=FunctionalSimulator, lines=SETUP + KERNEL):
+    sim = cls(mem_size=0x10000)
+    sim.load_words(0x1000, assemble(lines))
+    sim.bus.write32(0x400, 40)
+    sim.pc = 0x1000
+    return sim
+
+def test_run_until_stops_before_pc():
+    sim = booted()
+    assert sim.run_until(0x1010)
+    assert sim.pc == 0x1010 and sim.cycle_count == 4
+    assert sim.regs[1:4] == [4, 3, 7]
+    assert 0x1010 not in sim._icache  # the breakpoint is gone
+    sim.run()
+    assert sim.regs[6] == 43 and sim.cycle_count == 8
+
+@pytest.mark.parametrize("cls", [FunctionalSimulator, JitSimulator])
+def test_run_until_returns_false_on_halt(cls):
+    sim = booted(cls)
+    assert not sim.run_until(0x8000)
+    assert not sim.running and sim.cycle_count == 8
+
+def test_run_until_survives_writes_to_its_page():
+    # the stop page is written before it is reached; the breakpoint must stay
+    sim = booted(lines=["ST [r0+0x1020], r0", "ADDI r1, r0, #1", "ADDI r1, r1, #1", "HALT"])
+    assert sim.run_until(0x100C)
+    assert sim.regs[1] == 2
+
+def test_handoff_matches_a_full_functional_run():
+    ref = booted()
+    ref.run()
+    sim = booted()
+    assert sim.run_until(0x1010)
+    core = Core.from_functional(sim)
+    stats = core.run()
+    assert stats.stop == "halt" and stats.instructions == 4
+    assert core.regs.R == ref.regs
+
+def test_handoff_shares_memory_and_copies_state():
+    sim = booted()
+    sim.run_until(0x100C)
+    sim.pred[2] = False
+    core = Core.from_functional(sim)
+    assert core.mem.mem is sim.bus.mem  # no copy of the flat image
+    assert core.pc == 0x100C and core.regs.P == [True, True, False, True]
+    core.regs.R[7] = 1
+    assert sim.regs[7] == 0
+    core.mem.store32(0x400, 1)
+    assert sim.bus.read32(0x400) == 1
+    paged = FunctionalSimulator(mem_size=1 << 32, mem_backend="paged")
+    assert Memory.from_bus(paged.bus).store is paged.bus.store
+
+def test_handoff_refuses_mmio():
+    sim = booted()
+    sim.bus.map_mmio(0xF000, 4, MMIO())
+    with pytest.raises(ValueError, match="MMIO"):
+        Core.from_functional(sim)
+
+def test_handoff_agrees_on_stores():
+    # ST takes its value from the rd field on every engine, so the Core picks up
+    # exactly where the functional model left memory
+    lines = ["ADDI r1, r0, #0x800", "ADDI r5, r0, #7", "ST [r1+0], r5",
+             "ADDI r5, r5, #1", "ST [r1+4], r5", "HALT"]
+    ref = booted(lines=lines)
+    ref.run()
+    assert [ref.bus.read32(a) for a in (0x800, 0x804, 0xA00)] == [7, 8, 0]
+    for stop in (0x1000, 0x100C):
+        sim = booted(lines=lines)
+        sim.run_until(stop)
+        core = Core.from_functional(sim)
+        assert core.run().stop == "halt"
+        assert core.regs.R == ref.regs
+        assert [core.mem.load32(a) for a in (0x800, 0x804, 0xA00)] == [7, 8, 0]
@@ -2,7 +2,7 @@
 import pytest
 from dspsim import FunctionalSimulator
 from dspsim.encoder import enc_ri, enc_3r, enc_i
-from dspsim.isa import MAJ_ADDI, MAJ_ADD, MAJ_HALT
+from dspsim.isa import MAJ_ADDI, MAJ_ADD, MAJ_HALT, MAJ_J, MAJ_ST
 
 def u32(v): return v & 0xFFFFFFFF
 
@@ -25,4 +25,56 @@ def test_add_reg():
     w2 = enc_i(MAJ_HALT, 0, None, True)
     sim.load_words(0x1000, [w1, w2])
     sim.run(entry=0x1000, max_cycles=100)
-    assert sim.regs[2] == 5
\ No newline at end of file
+    assert sim.regs[2] == 5
+
+def test_negative_imm_and_backward_jump():
+    sim = FunctionalSimulator(mem_size=8192)
+    # ADDI r1, r0, #-5 ; J +1 ; HALT ; J -2 (back to the HALT)
+    sim.load_words(0x1000, [
+        enc_ri(MAJ_ADDI, 1, 0, -5 & 0x3FFF, None, True),
+        enc_i(MAJ_J, 1, None, True),
+        enc_i(MAJ_HALT, 0, None, True),
+        enc_i(MAJ_J, -2 & 0x3FFF, None, True),
+    ])
+    sim.run(entry=0x1000, max_cycles=100)
+    assert sim.regs[1] == u32(-5)
+    assert sim.pc == 0x100C
+
+def test_store_to_code_invalidates_predecoded_insn():
+    sim = FunctionalSimulator(mem_size=8192)
+    sim.regs[1] = 0x1000
+    sim.regs[5] = enc_i(MAJ_HALT, 0, None, True)
+    # loop: ADDI r2, r2, #1 ; ST r5 -> [r1] (overwrites the ADDI) ; J loop
+    sim.load_words(0x1000, [
+        enc_ri(MAJ_ADDI, 2, 2, 1, None, True),
+        enc_ri(MAJ_ST, 5, 1, 0, None, True),
+        enc_i(MAJ_J, -3 & 0x3FFF, None, True),
+    ])
+    sim.run(entry=0x1000, max_cycles=100)
+    assert sim.regs[2] == 1
+    assert sim.pc == 0x1004
+
+def test_host_reload_invalidates_predecoded_insn():
+    sim = FunctionalSimulator(mem_size=8192)
+    sim.load_words(0x1000, [enc_ri(MAJ_ADDI, 1, 0, 1, None, True), enc_i(MAJ_HALT, 0, None, True)])
+    sim.run(entry=0x1000, max_cycles=100)
+    sim.load_words(0x1000, [enc_ri(MAJ_ADDI, 1, 0, 2, None, True)])
+    sim.run(entry=0x1000, max_cycles=100)
+    assert sim.regs[1] == 2
+
+def test_data_stores_beside_code_keep_the_predecoded_insns(monkeypatch):
+    sim = FunctionalSimulator(mem_size=8192)
+    sim.regs[1] = 0x1800  # same 4 KiB page as the loop
+    # loop: ADDI r2, r2, #1 ; ST r2 -> [r1] ; J loop
+    sim.load_words(0x1000, [
+        enc_ri(MAJ_ADDI, 2, 2, 1, None, True),
+        enc_ri(MAJ_ST, 2, 1, 0, None, True),
+        enc_i(MAJ_J, -3 & 0x3FFF, None, True),
+    ])
+    fills = []
+    real_fill = sim._fill
+    monkeypatch.setattr(sim, "_fill", lambda pc: fills.append(pc) or real_fill(pc))
+    with pytest.raises(RuntimeError, match="Max cycles"):
+        sim.run(entry=0x1000, max_cycles=300)
+    assert sim.bus.read32(0x1800) == 100
+    assert fills == [0x1000, 0x1004, 0x1008]  # decoded once, not once per store
@@ -0,0 +1,64 @@
+# tests/test_hazards.py
+import pytest
+from dspsim.assembler import assemble
+from dspsim.core_cycle import Core, Memory
+from dspsim.encoder import enc_3r, enc_ri
+from dspsim.isa import MAJ_ADD, MAJ_ADDI, MAJ_LD
+
+def core_for(words, regs=None):
+    mem = Memory(0x10000)
+    mem.load_blob(0x1000, b"".join(w.to_bytes(4, "little") for w in words))
+    mem.store32(0x100, 40)
+    core = Core(mem)
+    core.pc = 0x1000
+    for i, v in (regs or {}).items():
+        core.regs.write(i, v)
+    return core
+
+def packet(*words):
+    """Clear the EOP bit on all but the last word so they form one packet."""
+    return [w & ~(1 << 24) for w in words[:-1]] + [words[-1]]
+
+HALT = assemble(["HALT"])
+
+def test_load_use_stalls_until_the_load_completes():
+    core = core_for(assemble(["LD r1, [r0+0x100]", "ADD r2, r1, r3", "HALT"]), {3: 2})
+    stats = core.run()
+    assert core.regs.R[2] == 42
+    assert stats.stalls["raw"] == 2 and stats.stall_cycles == 2
+
+def test_independent_loads_wait_for_the_lsu():
+    stats = core_for(assemble(["LD r1, [r0+0x100]", "LD r2, [r0+0x100]", "HALT"])).run()
+    assert stats.stalls["lsu_busy"] == 2 and stats.stalls["raw"] == 0
+
+def test_write_after_write_keeps_program_order():
+    core = core_for(assemble(["LD r1, [r0+0x100]", "ADDI r1, r0, #3", "HALT"]))
+    stats = core.run()
+    assert core.regs.R[1] == 3
+    assert stats.stalls["waw"] == 2
+
+def test_packet_issues_in_one_cycle_and_reads_old_values():
+    words = packet(enc_ri(MAJ_ADDI, 1, 0, 5), enc_3r(MAJ_ADD, 2, 1, 0)) + HALT
+    core = core_for(words, {1: 7})
+    stats = core.run()
+    assert core.regs.R[1:3] == [5, 7]
+    assert stats.cycles == 1 and stats.instructions == 3
+
+def test_packets_lower_cpi():
+    body = [enc_ri(MAJ_ADDI, r, r, 1) for r in range(1, 9)]
+    serial = core_for(body + HALT).run()
+    paired = core_for(sum((packet(body[i], body[i + 1]) for i in range(0, 8, 2)), []) + HALT).run()
+    assert paired.instructions == serial.instructions == 9
+    assert (serial.cycles, paired.cycles) == (8, 4)
+    assert paired.cpi < serial.cpi
+
+def test_packet_needing_more_units_than_exist_is_rejected():
+    words = packet(enc_ri(MAJ_LD, 1, 0, 0x100), enc_ri(MAJ_LD, 2, 0, 0x104)) + HALT
+    with pytest.raises(RuntimeError, match="needs 2 LSU slots"):
+        core_for(words).run()
+
+def test_backward_jump_loops():
+    core = core_for(assemble(["loop:", "ADDI r1, r1, #1", "J loop"]))
+    stats = core.run(max_cycles=20)
+    assert stats.stop == "max_cycles"
+    assert core.regs.R[1] == 10 and stats.instructions == 20
@@ -0,0 +1,82 @@
+# tests/test_jit.py
+import pytest
+from dspsim import FunctionalSimulator, JitSimulator
+from dspsim.assembler import assemble
+from dspsim.encoder import enc_ri, enc_i
+from dspsim.isa import MAJ_ADDI, MAJ_HALT, MAJ_J, MAJ_ST
+
+def run_both(words, initial_regs=None, max_cycles=None):
+    """Run words on the interpreter and the JIT and return both simulators."""
+    sims = []
+    for cls in (FunctionalSimulator, JitSimulator):
+        sim = cls(mem_size=0x10000)
+        for r_idx, val in (initial_regs or {}).items():
+            sim.regs[r_idx] = val
+        sim.load_words(0x1000, words)
+        try:
+            sim.run(entry=0x1000, max_cycles=max_cycles)
+        except RuntimeError as e:
+            sim.error = str(e)
+        sims.append(sim)
+    return sims
+
+def assert_same_state(ref, jit):
+    assert jit.regs == ref.regs
+    assert jit.pc == ref.pc
+    assert jit.cycle_count == ref.cycle_count
+    assert jit.bus.mem == ref.bus.mem
+    assert getattr(jit, "error", None) == getattr(ref, "error", None)
+
+def test_straight_line_matches_interpreter():
+    words = assemble([
+        "ADDI r1, r0, #100",
+        "ADDI r2, r1, -7",
+        "SUB r3, r2, r1",
+        "AND r4, r3, r1",
+        "OR r5, r4, r2",
+        "HALT",
+    ])
+    ref, jit = run_both(words)
+    assert_same_state(ref, jit)
+    assert jit.regs[3] == 0xFFFFFFF9
+
+@pytest.mark.parametrize("max_cycles", [1, 7, 100, 1001])
+def test_self_loop_stops_exactly_at_max_cycles(max_cycles):
+    words = assemble(["ADDI r1, r0, 0x100", "LOOP:", "LD r3, [r1+0]", "ADD r2, r2, r3", "ADDI r4, r4, 1", "J LOOP"])
+    ref, jit = run_both(words, max_cycles=max_cycles)
+    assert_same_state(ref, jit)
+    assert jit.cycle_count == max_cycles
+
+def test_store_into_running_block_is_seen():
+    words = [
+        enc_ri(MAJ_ADDI, 2, 2, 1, None, True),
+        enc_ri(MAJ_ST, 5, 1, 4, None, True),       # overwrite the J below with HALT
+        enc_i(MAJ_J, -3 & 0x3FFF, None, True),
+    ]
+    ref, jit = run_both(words, initial_regs={1: 0x1004, 5: enc_i(MAJ_HALT, 0, None, True)},
+                        max_cycles=100)
+    assert_same_state(ref, jit)
+    assert jit.regs[2] == 1
+
+def test_data_stores_into_the_code_page_keep_the_block(monkeypatch):
+    # the loop stores to 0x1800, in its own 4 KiB page but past its words
+    words = assemble(["ADDI r1, r0, #0x800", "LOOP:", "ADDI r2, r2, #1", "ST [r1+0x1000], r2",
+                      "J LOOP"])
+    ref, jit = run_both(words, max_cycles=301)
+    assert_same_state(ref, jit)
+    sim = JitSimulator(mem_size=0x10000)
+    sim.load_words(0x1000, words)
+    translated = []
+    real = sim._translate
+    monkeypatch.setattr(sim, "_translate", lambda pc: translated.append(pc) or real(pc))
+    with pytest.raises(RuntimeError, match="Max cycles"):
+        sim.run(entry=0x1000, max_cycles=3001)
+    assert sim.bus.read32(0x1800) == 1000
+    assert translated == [0x1000, 0x1004] and sim._code_gen == 0
+
+def test_fault_inside_block_reports_pc_and_syncs_state():
+    words = assemble(["ADDI r1, r0, #1", "ADDI r2, r0, #-4", "LD r3, [r2+0]", "ADDI r4, r0, #9", "HALT"])
+    ref, jit = run_both(words)
+    assert_same_state(ref, jit)
+    assert "Execution error at PC=0x1008 (LD)" in jit.error
+    assert jit.regs[1] == 1 and jit.regs[4] == 0
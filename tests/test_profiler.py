@@ -0,0 +1,67 @@
+# tests/test_profiler.py
+import pytest
+from dspsim import FunctionalSimulator, JitSimulator
+from dspsim.assembler import assemble_with_labels
+from dspsim.profiler import Profile
+from dspsim.symbols import SymbolTable
+
+SOURCE = [
+    "start:",
+    "ADDI r1, r0, #3",
+    "loop:",
+    "ADDI r1, r1, #-1",
+    "ADD r2, r2, r1",
+    "J loop",
+]
+
+def profiled(cls, max_cycles):
+    words, labels = assemble_with_labels(SOURCE)
+    sim = cls(mem_size=0x10000)
+    sim.load_words(0x1000, words)
+    sim.profile = Profile(0x1000, 0x1000 + 4 * len(words))
+    with pytest.raises(RuntimeError, match="Max cycles"):
+        sim.run(entry=0x1000, max_cycles=max_cycles)
+    return sim, SymbolTable(labels).rebased(0x1000)
+
+@pytest.mark.parametrize("cls", [FunctionalSimulator, JitSimulator])
+def test_counts_per_pc_opcode_and_label(cls):
+    sim, symbols = profiled(cls, 10)
+    prof = sim.profile
+    assert dict(prof.pc_counts()) == {0x1000: 1, 0x1004: 3, 0x1008: 3, 0x100C: 3}
+    assert prof.total == 10 == sim.cycle_count
+    assert prof.opcodes[1] == 4 and prof.opcodes[0] == 3 and prof.opcodes[0xD] == 3
+    assert prof.by_symbol(symbols) == [("loop", 9), ("start", 1)]
+    report = prof.report(symbols, top=2)
+    assert "loop" in report and "ADDI" in report and "0x00001004 loop" in report
+
+def test_profiled_run_matches_plain_run():
+    words, _ = assemble_with_labels(SOURCE + ["HALT"])
+    plain = FunctionalSimulator(mem_size=0x10000)
+    plain.load_words(0x1000, words)
+    with pytest.raises(RuntimeError):
+        plain.run(entry=0x1000, max_cycles=50)
+    sim, _ = profiled(FunctionalSimulator, 50)
+    assert sim.regs == plain.regs and sim.pc == plain.pc
+    assert sim.cycle_count == plain.cycle_count
+
+def test_pcs_outside_range_and_unknown_opcode_cycles():
+    sim = FunctionalSimulator(mem_size=0x10000)
+    words, _ = assemble_with_labels(["ADDI r1, r0, #1", "ADDI r2, r0, #2"])
+    sim.load_words(0x1000, words + [0xE0000000])  # JR: unknown to this engine
+    sim.profile = Profile(0x1000, 0x1004)
+    with pytest.raises(RuntimeError, match="Unknown opcode"):
+        sim.run(entry=0x1000)
+    assert sim.profile.outside == {0x1004: 1}
+    assert sim.cycle_count == 3
+    assert sim.profile.by_symbol(None) == [("<no label>", 2)]
+
+def test_opcodes_follow_code_rewritten_between_runs():
+    sim, _ = profiled(FunctionalSimulator, 10)
+    sim.bus.write32(0x1008, assemble_with_labels(["SUB r2, r2, r1"])[0][0])
+    with pytest.raises(RuntimeError, match="Max cycles"):
+        sim.run(max_cycles=6)
+    prof = sim.profile
+    assert prof.counts == [1, 5, 5, 5]
+    # the three ADDs retired before the rewrite stay ADDs
+    assert prof.opcodes[0] == 3 and prof.opcodes[2] == 2
+    assert sum(prof.opcodes) == prof.total == 16
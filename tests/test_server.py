@@ -0,0 +1,144 @@
+# tests/test_server.py
+import asyncio
+import contextlib
+import os
+import socket
+import tempfile
+import threading
+import time
+import pytest
+from dspsim.assembler import assemble
+from dspsim.server import CANCELLED, INVALID_PARAMS, JOB_FAILED, METHOD_NOT_FOUND, Client, RpcError, Server
+
+PROGRAM = "\n".join([
+    "start:",
+    "  LD r3, [r1+0]",
+    "  ADD r2, r2, r3",
+    "  ADDI r4, r0, #7",
+    "  HALT",
+])
+SPIN = "loop:\n  ADDI r1, r1, #1\n  J loop\n"
+
+@contextlib.contextmanager
+def running_server(listen=None, **kwargs):
+    """A Server (on a free localhost port by default) driven by its own loop in a thread."""
+    server = Server(**kwargs)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start(**(listen or {"port": 0})))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    assert ready.wait(60)
+    try:
+        yield server.address
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(30)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+
+@pytest.fixture(scope="module")
+def address():
+    with running_server(workers=2, max_cycles=None) as addr:
+        yield addr
+
+def test_assemble(address):
+    with Client(address) as c:
+        res = c.call("assemble", {"source": PROGRAM})
+    assert res == {"words": assemble(PROGRAM.splitlines()), "labels": {"start": 0}}
+
+@pytest.mark.parametrize("engine", ["fast", "jit", "cycle"])
+def test_run_uses_sweep_case_fields(address, engine):
+    params = {"source": PROGRAM, "engine": engine, "entry": "start",
+              "regs": {"R1": "0x2000", "R2": 5}, "mem": [{"addr": "0x2000", "words": [10]}],
+              "dump": [["0x2000", 1]]}
+    with Client(address) as c:
+        res = c.call("run", params)
+        again = c.call("run", params)  # the warm simulator starts clean every time
+    assert res["stop"] == "halt" and res["error"] is None
+    assert res["regs"][2] == 15 and res["regs"][4] == 7
+    assert res["dump"] == {"0x2000": [10]} and res["instructions"] == 4
+    assert again == res
+
+def test_cycle_budget_is_per_job_and_capped():
+    with running_server(workers=1, max_cycles=20_000) as addr, Client(addr) as c:
+        own = c.call("run", {"source": SPIN, "max_cycles": 1000})
+        capped = c.call("run", {"source": SPIN, "engine": "cycle", "max_cycles": 10 ** 9})
+        default = c.call("run", {"source": SPIN, "engine": "jit"})
+    assert (own["stop"], own["cycles"], own["error"]) == ("max_cycles", 1000, "Max cycles reached")
+    assert (capped["stop"], capped["cycles"]) == ("max_cycles", 20_000)
+    assert default["cycles"] == 20_000
+
+def test_trace_streams_records_in_batches(address):
+    notes = []
+    with Client(address) as c:
+        res = c.call("trace", {"source": PROGRAM, "regs": {"R1": 0x2000}, "batch": 3},
+                     on_notify=notes.append)
+    records = [r for n in notes for r in n["params"]["records"]]
+    assert res["records"] == len(records) == 4
+    assert [len(n["params"]["records"]) for n in notes] == [3, 1]
+    assert [r["op"] for r in records] == ["LD", "ADD", "ADDI", "CMPI_0"]
+    assert {n["method"] for n in notes} == {"trace"}
+
+def test_cancel_running_and_queued_jobs(address):
+    with Client(address) as c:
+        # fill both workers, then queue one more behind them
+        for name in ("a", "b", "queued"):
+            c.send("run", {"source": SPIN, "max_cycles": 10 ** 9}, req_id=name)
+        time.sleep(0.2)
+        for name in ("queued", "a", "b", "nope"):
+            c.send("cancel", {"id": name}, req_id="cancel-" + name)
+        replies = {}
+        while len(replies) < 7:
+            msg = c.receive()
+            replies[msg["id"]] = msg
+    assert [replies["cancel-" + n]["result"]["cancelled"] for n in ("queued", "a", "b", "nope")] == \
+        [True, True, True, False]
+    assert replies["queued"]["error"]["code"] == CANCELLED
+    for name in ("a", "b"):
+        assert replies[name]["result"]["stop"] == "cancelled"
+
+@pytest.mark.parametrize("method, params, code, message", [
+    ("frobnicate", {}, METHOD_NOT_FOUND, "frobnicate"),
+    ("run", {"source": "FOO r1"}, JOB_FAILED, "line 1"),
+    ("run", {"source": PROGRAM, "engine": "warp"}, INVALID_PARAMS, "unknown engine"),
+    ("run", {}, INVALID_PARAMS, "source"),
+    ("run", {"source": PROGRAM, "max_cycles": "lots"}, INVALID_PARAMS, "Invalid params"),
+    ("run", {"source": PROGRAM, "regs": "x"}, INVALID_PARAMS, "'regs' must be"),
+    ("run", {"source": PROGRAM, "regs": {"r40": 1}}, INVALID_PARAMS, "0..31"),
+    ("run", {"source": PROGRAM, "mem": 5}, INVALID_PARAMS, "'mem' must be"),
+    ("trace", {"source": PROGRAM, "dump": {"0x100": 1}}, INVALID_PARAMS, "'dump' must be"),
+])
+def test_errors(address, method, params, code, message):
+    with Client(address) as c:
+        with pytest.raises(RpcError, match=message) as err:
+            c.call(method, params)
+        assert err.value.code == code
+        assert c.call("status")["workers"] == 2  # the connection is still usable
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_unix_socket_path_is_only_replaced_if_it_is_a_socket():
+    with tempfile.TemporaryDirectory(dir="/tmp") as tmp:  # short: sun_path is ~100 bytes
+        path = os.path.join(tmp, "s.sock")
+        with open(path, "w") as f:
+            f.write("not a socket")
+        with pytest.raises(FileExistsError, match="not a socket"):
+            asyncio.run(Server(workers=1).start(path))
+        with open(path) as f:
+            assert f.read() == "not a socket"
+        os.unlink(path)
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)  # left behind by a server that died
+        stale.close()
+        with running_server({"path": path}, workers=1) as addr, Client(addr) as c:
+            assert addr == "unix:" + path and c.call("status")["workers"] == 1
+            # the path is taken over while the server runs: close() must leave it alone
+            os.unlink(path)
+            with open(path, "w") as f:
+                f.write("someone else's")
+        assert os.path.isfile(path)
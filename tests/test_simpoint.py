@@ -0,0 +1,92 @@
+# tests/test_simpoint.py
+import io
+import pytest
+np = pytest.importorskip("numpy")
+from dspsim import FunctionalSimulator
+from dspsim.assembler import assemble
+from dspsim.core_cycle import Core
+from dspsim import simpoint as sp
+
+# a load-heavy straight-line phase (0x1000-0x2770), then an ALU loop forever
+TWO_PHASES = assemble(["LD r1, [r0+0x400]", "ADD r2, r2, r1"] * 1500 + [
+    "loop:",
+    "ADDI r3, r3, #1",
+    "ADD r4, r3, r3",
+    "SUB r5, r4, r3",
+    "J loop",
+])
+# read-modify-write of one counter, then stores walking a 256-word ring at 0x800
+STORES = assemble(["ADDI r6, r0, #0x3FC"] + [
+    "LD r1, [r0+0x400]", "ADDI r1, r1, #1", "ST [r0+0x400], r1"] * 1000 + [
+    "ADDI r3, r3, #4", "AND r4, r3, r6", "ST [r4+0x800], r3"] * 2000 + ["HALT"])
+
+def make_sim(words=TWO_PHASES):
+    def make():
+        sim = FunctionalSimulator(mem_size=0x10000)
+        sim.load_words(0x1000, words)
+        sim.pc = 0x1000
+        return sim
+    return make
+
+def test_bbvs_count_instructions_per_block_and_interval():
+    sim = make_sim(assemble(["ADDI r1, r0, #1", "loop:", "ADDI r1, r1, #1", "J loop"]))()
+    prof = sp.collect_bbvs(sim, interval=5, max_instructions=12)
+    assert prof.lengths == [5, 5, 2] and not prof.halted
+    assert sim.cycle_count == 12 == prof.instructions
+    # the first block runs from entry through the first J; later ones start at the loop
+    assert prof.vectors[0] == {0x1000: 3, 0x1004: 2}
+    assert prof.vectors[1] == {0x1004: 5}
+    out = io.StringIO()
+    prof.write_bb(out)
+    assert out.getvalue().splitlines()[0] == "T:1:3 :2:2 "
+
+def test_bbvs_stop_at_halt():
+    prof = sp.collect_bbvs(make_sim(assemble(["ADDI r1, r0, #1"] * 7 + ["HALT"]))(), interval=3)
+    assert prof.halted and prof.lengths == [3, 3, 2]
+
+def test_clustering_separates_phases():
+    prof = sp.collect_bbvs(make_sim()(), interval=500, max_instructions=12000)
+    points, weights, sizes = sp.choose_points(prof, samples=2)
+    assert sum(sizes) == 24 and abs(sum(weights) - 1) < 1e-9
+    phase = {p.interval: p.cluster for p in points}
+    # intervals 0-5 are all loads, 7+ all loop: never in the same phase
+    early = {phase[i] for i in phase if i < 6}
+    late = {phase[i] for i in phase if i > 6}
+    assert early and late and not early & late
+    assert sum(p.representative for p in points) == len(weights)
+
+def test_estimate_matches_full_detailed_run():
+    n = 12000
+    est = sp.estimate(make_sim(), 500, max_instructions=n, samples=2, warmup=50)
+    core = Core.from_functional(make_sim()())
+    full = core.run(until=lambda c: c.instret >= n)
+    assert est.instructions == n
+    assert est.cpi_error is not None
+    assert abs(est.cpi - full.cpi) <= max(est.cpi_error, 0.01)
+    assert est.detailed_instructions < n / 2
+
+def test_checkpoints_carry_stored_state_into_the_core():
+    ref = make_sim(STORES)()
+    ref.run()
+    ring = [ref.bus.read32(a) for a in range(0x800, 0xC00, 4)]
+    assert ref.bus.read32(0x400) == 1000 and ring[1:3] == [7172, 7176]
+    # a checkpoint half way through the counter phase, and one in the ring loop
+    for start, counter in ((1501, 500), (6001, 1000)):
+        sim = make_sim(STORES)()
+        sp._advance(sim, start)
+        assert sim.bus.read32(0x400) == counter
+        core = Core.from_functional(sim.fork())
+        assert core.run().stop == "halt"
+        assert core.regs.R == ref.regs
+        assert core.mem.load32(0x400) == 1000
+        assert [core.mem.load32(a) for a in range(0x800, 0xC00, 4)] == ring
+
+def test_estimate_matches_full_detailed_run_with_stores():
+    est = sp.estimate(make_sim(STORES), 500, samples=2, warmup=50)
+    full = Core.from_functional(make_sim(STORES)()).run()
+    assert est.instructions == full.instructions == 9002
+    assert abs(est.cpi - full.cpi) <= max(est.cpi_error, 0.01)
+
+def test_single_sample_has_no_error_estimate():
+    est = sp.estimate(make_sim(), 500, max_instructions=6000, samples=1)
+    assert est.cpi_error is None and len(est.points) == est.k
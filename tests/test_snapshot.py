@@ -0,0 +1,97 @@
+# tests/test_snapshot.py
+import struct
+import pytest
+from dspsim import FunctionalSimulator, JitSimulator
+from dspsim.assembler import assemble
+from dspsim.core_cycle import Core, Memory
+
+PROGRAM = assemble([
+    "LD r3, [r1+0]",
+    "ADD r2, r2, r3",
+    "ST [r1+4], r0",
+    "HALT",
+])
+
+def booted(cls=FunctionalSimulator):
+    sim = cls()
+    sim.load_words(0x1000, PROGRAM)
+    sim.bus.write32(0x2000, 40)
+    sim.regs[1] = 0x2000
+    sim.pc = 0x1000
+    return sim
+
+@pytest.mark.parametrize("cls", [FunctionalSimulator, JitSimulator])
+def test_fork_runs_independent_what_ifs(cls):
+    sim = booted(cls)
+    snap = sim.snapshot()
+    results = []
+    for r0 in (1, 2, 3):
+        child = sim.fork(snap)
+        child.regs[0] = r0
+        child.run()
+        results.append((child.regs[2], child.bus.read32(0x2004)))
+        assert type(child) is cls
+    assert results == [(40, 1), (40, 2), (40, 3)]
+    # the parent and its snapshot are untouched
+    assert sim.bus.read32(0x2004) == 0
+    assert sim.pc == 0x1000 and sim.regs[2] == 0
+
+def test_restore_rewinds_registers_memory_and_code():
+    sim = booted()
+    snap = sim.snapshot()
+    sim.regs[0] = 9
+    sim.run()
+    assert sim.bus.read32(0x2004) == 9
+    sim.bus.write32(0x1004, 0)       # patch code after it was predecoded
+    sim.restore(snap)
+    assert sim.bus.read32(0x2004) == 0
+    assert (sim.regs[0], sim.pc, sim.cycle_count) == (0, 0x1000, 0)
+    sim.run()
+    assert sim.regs[2] == 40 and sim.cycle_count == 4
+
+def test_fork_shares_pages_until_written():
+    sim = booted()
+    child = sim.fork()
+    assert child.bus.mem is None and child.bus.store.base is sim.bus.store.base
+    child.run()
+    # only the data page was copied; 16 MB was never duplicated
+    assert child.bus.store.dirty_pages() == 1
+    assert sim.bus.store.dirty_pages() == 0
+
+def test_cycle_core_snapshot_roundtrip():
+    mem = Memory()
+    mem.load_blob(0x1000, b"".join(struct.pack("<I", w) for w in PROGRAM))
+    core = Core(mem)
+    core.pc = 0x1000
+    core.step()
+    snap = core.snapshot()
+    child = core.fork(snap)
+    for _ in range(3):
+        core.step()
+    child.mem.store32(0x3000, 7)
+    assert core.mem.load32(0x3000) == 0
+    core.restore(snap)
+    assert (core.pc, core.cycle) == (child.pc, child.cycle) == (snap.pc, snap.cycle)
+    assert [fu.busy_until for fu in core._all_fus()] == [fu.busy_until for fu in child._all_fus()]
+
+def test_paged_backend_is_sparse_over_4gib():
+    sim = FunctionalSimulator(mem_size=1 << 32, mem_backend="paged")
+    sim.load_words(0x1000, PROGRAM)
+    sim.bus.write(0xFFFFFFF8, bytes(range(1, 9)))
+    sim.regs[1] = 0xFFFFFFF8
+    sim.run(entry=0x1000)
+    assert sim.regs[2] == 0x04030201
+    assert sim.bus.read(0xFFFFFFF8, 8) == bytes(range(1, 5)) + bytes(4)
+    assert sim.bus.mem is None and sim.bus.store.dirty_pages() == 2
+
+def test_paged_matches_flat_across_page_boundaries():
+    flat, paged = Memory(0x3000), Memory(0x3000, backend="paged")
+    for mem in (flat, paged):
+        mem.load_blob(0xFFE, bytes(range(1, 9)))
+        mem.store32(0x1FFE, 0x11223344)
+    for addr in (0xFFC, 0xFFE, 0x1000, 0x1FFC, 0x1FFE):
+        assert paged.load32(addr) == flat.load32(addr)
+    with pytest.raises(IndexError):
+        paged.load32(0x2FFE)
+    with pytest.raises(ValueError):
+        Memory(backend="sparse")
@@ -0,0 +1,68 @@
+# tests/test_startup.py
+import os
+import subprocess
+import sys
+import time
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+# Runs the CLI, then reports which of the heavy modules it loaded
+SCRIPT = """
+import sys
+from dspsim.cli import cli
+try:
+    cli(sys.argv[1:], prog_name="dspsim")
+except SystemExit as e:
+    assert not e.code, e.code
+heavy = ("dspsim.core", "dspsim.jit", "dspsim.core_cycle", "dspsim.trace", "dspsim.disassembler",
+         "dspsim.sweep", "dspsim.elf", "dspsim.server", "numpy", "rich")
+sys.stderr.write("\\n" + repr(sorted(m for m in heavy if m in sys.modules)))
+"""
+# Seconds a command may take on top of `python -c "import click"` (best of a few runs).
+# Importing everything eagerly cost about 0.2 s here.
+BUDGET = {"--version": 0.1, "asm": 0.1, "run": 0.15}
+COMMANDS = [
+    (["--version"], []),
+    (["asm", "{prog}"], []),
+    (["run", "--asm", "{prog}"], ["dspsim.core"]),
+]
+
+@pytest.fixture(scope="module")
+def env(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("startup")
+    (tmp / "prog.asm").write_text("ADDI r1, r0, #100\nADDI r2, r1, #50\nHALT\n")
+    env = dict(os.environ, PYTHONPATH=SRC, DSPSIM_CACHE_DIR=str(tmp / "cache"))
+    return env, str(tmp / "prog.asm")
+
+def start(args, env, code=SCRIPT):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code, *args], env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - t0
+    assert proc.returncode == 0, proc.stderr
+    return elapsed, proc.stderr
+
+@pytest.mark.parametrize("args, loaded", COMMANDS, ids=[c[0][0] for c in COMMANDS])
+def test_commands_load_only_what_they_use(env, args, loaded):
+    env, prog = env
+    _, err = start([a.format(prog=prog) for a in args], env)
+    assert err.splitlines()[-1] == repr(loaded)
+
+@pytest.mark.parametrize("args", [c[0] for c in COMMANDS], ids=[c[0][0] for c in COMMANDS])
+def test_start_up_time_budget(env, args):
+    env, prog = env
+    args = [a.format(prog=prog) for a in args]
+    base = min(start([], env, "import click")[0] for _ in range(3))
+    best = min(start(args, env)[0] for _ in range(3))
+    assert best - base < BUDGET[args[0]], f"dspsim {' '.join(args)}: {best - base:.3f}s over bare click"
+
+def test_lazy_package_attributes():
+    import dspsim
+    from dspsim import cli, sweep, trace
+    from dspsim.core_cycle import Core
+
+    assert dspsim.CycleSimulator is Core
+    assert set(dspsim.__all__) <= set(dir(dspsim))
+    with pytest.raises(AttributeError, match="no attribute 'Simulator'"):
+        dspsim.Simulator  # noqa: B018
+    # the CLI's option choices mirror the modules it no longer imports up front
+    assert cli.ENGINES == sweep.ENGINES and cli.COMPRESSIONS == tuple(trace.COMPRESSIONS)
@@ -0,0 +1,30 @@
+# tests/test_sweep.py
+import pytest
+from dspsim.assembler import assemble
+from dspsim.sweep import sweep
+
+PROGRAM = assemble([
+    "LD r3, [r1+0]",
+    "ADD r2, r2, r3",
+    "ST [r1+4], r0",
+    "HALT",
+])
+
+CASES = [
+    {"id": "a", "regs": {"R1": "0x2000", "R2": 5}, "mem": [{"addr": "0x2000", "words": [10]}]},
+    {"id": "b", "regs": [0, 0x2000, 1], "mem": [{"addr": 0x2000, "hex": "07000000"}],
+     "engine": "jit", "dump": [["0x2000", 2]]},
+    {"id": "c", "max_cycles": 2},
+    {"id": "d", "engine": "bogus"},
+]
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sweep_runs_every_case(jobs):
+    results = {r["id"]: r for r in sweep(PROGRAM, CASES, jobs=jobs, chunksize=1)}
+    assert sorted(results) == ["a", "b", "c", "d"]
+    assert results["a"]["regs"][2] == 15 and results["a"]["error"] is None
+    assert results["b"]["regs"][2] == 8
+    assert results["b"]["dump"] == {"0x2000": [7, 0]}
+    assert results["c"]["error"] == "Max cycles reached"
+    assert results["c"]["cycles"] == 2
+    assert "unknown engine" in results["d"]["error"]
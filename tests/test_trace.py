@@ -0,0 +1,103 @@
+# tests/test_trace.py
+import json
+import pytest
+from dspsim.assembler import assemble
+from dspsim.decoder import decode_word
+from dspsim.inst import Inst
+from dspsim.trace import BinaryTraceSink, TraceFilter, TraceSink, read_binary_trace
+
+PROGRAM = assemble(["ADDI r1, r0, #5", "ADDI r2, r0, #-3", "ADD r3, r1, r2",
+                    "LD r4, [r3+8]", "ST [r1+4], r2", "J 0", "HALT"])
+
+def emit_program(sink, rounds=20):
+    """Feed sink the call shapes core_cycle.Core produces: commits, memops and empty NOPs."""
+    regs = [0] * 8
+    for n in range(rounds):
+        for i, word in enumerate(PROGRAM):
+            inst = decode_word(word, 0x1000 + 4 * i)
+            before = {f"R{r}": v for r, v in enumerate(regs)}
+            memops = []
+            if inst.rd is not None and inst.rd < 8:
+                regs[inst.rd] = (regs[inst.rd] + 7 * n + i) & 0xFFFFFFFF
+            if inst.op in ("LD", "ST"):
+                memops.append({"type": inst.op, "addr": hex(0x2000 + 4 * i), "value": hex(n)})
+            if inst.op == "J":
+                sink.emit_inst(10 * n + i, inst, {}, {}, [])
+                continue
+            sink.emit_inst(10 * n + i, inst, before, {f"R{r}": v for r, v in enumerate(regs)}, memops)
+    sink.close()
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_binary_trace_dumps_to_the_json_trace(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    emit_program(TraceSink(str(tmp_path / "t.jsonl")))
+    # a tiny chunk size exercises records spread over many chunks
+    emit_program(BinaryTraceSink(str(tmp_path / "t.bin"), compression=compression, chunk_size=64))
+    expected = [json.loads(ln) for ln in (tmp_path / "t.jsonl").read_text().splitlines()]
+    assert expected and list(read_binary_trace(str(tmp_path / "t.bin"))) == expected
+    assert (tmp_path / "t.bin").stat().st_size < (tmp_path / "t.jsonl").stat().st_size / 4
+
+def test_binary_trace_records_deltas_and_memops(tmp_path):
+    sink = BinaryTraceSink(str(tmp_path / "t.bin"))
+    st = Inst(raw=0xC0000000, pc=0x1004, op="ST32", rs1=1, rs2=2, imm=-4)
+    regs = {f"R{i}": 0 for i in range(8)}
+    sink.emit_inst(7, st, regs, dict(regs, R2=9),
+                   [{"type": "ST", "addr": "0x2000", "value": "0x9"}])
+    sink.emit_inst(8, Inst(raw=0xF0000000, pc=0x1008, op="HALT"), {}, {}, [])
+    sink.close()
+    first, second = read_binary_trace(str(tmp_path / "t.bin"))
+    assert first["imm"] == -4 and first["rd"] is None and first["pc"] == "0x1004"
+    assert first["regs_after"]["R2"] == "0x9" and first["regs_before"]["R2"] == "0x0"
+    assert first["memops"] == [{"type": "ST", "addr": "0x2000", "value": "0x9"}]
+    assert second["op"] == "HALT" and second["regs_before"] == {} and second["imm"] is None
+
+def test_rejects_foreign_files(tmp_path):
+    (tmp_path / "x.bin").write_bytes(b"not a trace at all")
+    with pytest.raises(ValueError, match="not a dspsim binary trace"):
+        list(read_binary_trace(str(tmp_path / "x.bin")))
+
+def kept(flt, insts):
+    return [i for i, (cycle, inst) in enumerate(insts) if flt.wants(cycle, inst)]
+
+STREAM = [(2 * n, decode_word(PROGRAM[n % len(PROGRAM)], 0x1000 + 4 * (n % len(PROGRAM))))
+          for n in range(28)]
+
+def test_filter_windows_count_every_offered_instruction():
+    assert kept(TraceFilter(start_inst=3, stop_inst=6), STREAM) == [3, 4, 5]
+    assert kept(TraceFilter(start_cycle=10, stop_cycle=16), STREAM) == [5, 6, 7]
+    flt = TraceFilter(start_inst=20)
+    kept(flt, STREAM)
+    assert flt.seen == len(STREAM)
+
+def test_filter_pc_op_mem_and_sampling():
+    assert kept(TraceFilter(pc_ranges=[(0x1004, 0x100C)]), STREAM[:7]) == [1, 2]
+    assert kept(TraceFilter(ops=["add"]), STREAM[:7]) == [2]
+    assert kept(TraceFilter(mem_only=True), STREAM[:7]) == [3, 4]
+    assert kept(TraceFilter(mem_only=True, sample_every=3), STREAM) == [3, 11, 24]
+    with pytest.raises(ValueError):
+        TraceFilter(sample_every=0)
+
+def test_sinks_expose_their_filter(tmp_path):
+    flt = TraceFilter(ops=["J"])
+    sink = BinaryTraceSink(str(tmp_path / "t.bin"), filter=flt)
+    for cycle, inst in STREAM:
+        if sink.wants(cycle, inst):
+            sink.emit_inst(cycle, inst, {}, {}, [])
+    sink.close()
+    assert [r["op"] for r in read_binary_trace(str(tmp_path / "t.bin"))] == ["J"] * 4
+    assert TraceSink().wants(0, STREAM[0][1])
+
+def test_cli_run_finishes_the_trace_when_the_run_fails(tmp_path):
+    from click.testing import CliRunner
+
+    from dspsim.cli import cli
+
+    prog = tmp_path / "fault.asm"
+    prog.write_text("ADDI r1, r0, #1\nADDI r3, r0, #-4\nLD r4, [r3+0]\nHALT\n")
+    out = tmp_path / "fault.trace"
+    result = CliRunner().invoke(cli, ["run", "--asm", str(prog), "--engine", "cycle", "--no-cache",
+                                      "--trace", "--trace-format", "bin", "--trace-file", str(out)])
+    assert result.exit_code != 0
+    # the records committed before the fault made it to disk
+    assert [r["op"] for r in read_binary_trace(str(out))][:2] == ["ADDI", "ADDI"]